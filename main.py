@@ -1,5 +1,10 @@
 # Import assert
+import time
+
+_STARTED_AT = time.perf_counter()
+
 import asyncio
+import sys
 
 
 # Import Libary aiogram
@@ -12,6 +17,25 @@ from src.utils.logging import write_logs
 # Import all libary
 from src.config.config import settings
 from src.utils.localization import init_default_messages
+from src.utils.publisher import publisher
+from src.utils.scheduler import scheduler
+from src.utils.charts import start_chart_workers, shutdown_chart_workers
+from src.utils.activity_history import (
+    start_activity_snapshots,
+    stop_activity_snapshots,
+)
+from src.utils.tasks import wait_background_tasks
+from src.utils.assets import assets
+from src.utils.maintenance import start_maintenance, stop_maintenance
+from src.database.replica import replica
+from src.utils.bot_session import create_bot_session
+from src.middlewares.throttling import ThrottlingMiddleware
+from src.middlewares.language import LanguageMiddleware
+from src.handlers.survey_questions.questions import (
+    QUESTIONS,
+    seed_default_survey,
+    reload_surveys,
+)
 
 from src.handlers.common import router as common_router
 from src.handlers.callback import router as callback_router
@@ -19,10 +43,23 @@ from src.handlers.survey_questions.survey import router as survey_router
 from src.handlers.admin import router as admin_router
 
 # from handlers.callback import router as callback_router
-from src.database.settings_data import init_db
+from src.database.settings_data import (
+    SCHEMA_VERSION,
+    init_db,
+    get_schema_meta,
+    set_schema_meta,
+)
+from src.database.migrations import (
+    sync_schema,
+    migrate_survey_answers,
+    backfill_completed_at,
+)
 
 # Enable logging
 
+# Run the whole startup but exit right before polling (see src/utils/startup_profile.py)
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+
 
 async def routers(dp, bot):
     routers = [
@@ -34,28 +71,86 @@ async def routers(dp, bot):
 
     for router in routers:
         dp.include_router(router)
+
+    # One instance for both event types so they share per-user limits
+    throttling = ThrottlingMiddleware()
+    dp.message.outer_middleware(throttling)
+    dp.callback_query.outer_middleware(throttling)
+
+    # Registered after throttling, so dropped updates never touch FSM storage
+    language = LanguageMiddleware()
+    dp.message.outer_middleware(language)
+    dp.callback_query.outer_middleware(language)
+
+    startup_time = time.perf_counter() - _STARTED_AT
+    await write_logs("info", f"Startup finished in {startup_time:.3f}s")
+    if PROFILE_STARTUP:
+        print(f"time-to-first-poll: {startup_time:.3f}s")
+        return
+
     await dp.start_polling(bot)
 
 
 # Start main
 async def main() -> None:
 
-    await init_db()
-    await init_default_messages()  # Initialize localization messages
+    # One SELECT decides whether DDL, migrations and seeding are needed
+    schema_meta = await get_schema_meta()
+    if schema_meta.get("schema_version") != str(SCHEMA_VERSION):
+        if PROFILE_STARTUP:
+            # Profiling must not change the database; migrate with a normal start
+            await write_logs(
+                "error",
+                f"Database schema is not v{SCHEMA_VERSION}, start the bot normally "
+                "before profiling",
+            )
+            return
+        await init_db()
+        await sync_schema()
+        await migrate_survey_answers(list(QUESTIONS.values()))
+        await backfill_completed_at()
+        await set_schema_meta({"schema_version": str(SCHEMA_VERSION)})
+    else:
+        await write_logs("info", f"Database schema v{SCHEMA_VERSION} is up to date")
+
+    # Initialize localization messages (not in profile mode: seeding writes to the DB)
+    if not PROFILE_STARTUP:
+        await init_default_messages(schema_meta.get("localization_seed"))
+        await seed_default_survey(schema_meta.get("survey_seed"))
+    await reload_surveys()  # Compile survey definitions and their keyboards
+    await assets.load()  # Fails fast if a file from content/ is missing
 
     try:
         bot = Bot(
             token=settings.config.bot_token,
+            session=create_bot_session(),  # Connection pool, timeouts and retries
             # default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
         )
         dp = Dispatcher(storage=MemoryStorage())
-        await bot.delete_webhook(drop_pending_updates=True)
+        # Profile mode stops before anything that talks to Telegram or writes
+        # to the DB: dropping pending updates, flushing the channel outbox,
+        # firing due mailings and the background loops
+        if not PROFILE_STARTUP:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await publisher.start(bot)  # Channel posts queue
+            await scheduler.start(bot)  # Scheduled mailings
+            start_activity_snapshots()  # Daily activity history
+            start_maintenance()  # Archival of abandoned surveys
+            replica.start()  # Heartbeat for the read replica lag check
+            start_chart_workers()  # Spawn the chart process and import matplotlib
 
         await write_logs("info", f"Bot is ready to work")
 
         # start routers
         await routers(dp, bot)
     finally:
+        await wait_background_tasks()  # Let pending survey saves finish
+        await stop_activity_snapshots()
+        await stop_maintenance()
+        await replica.stop()
+        await scheduler.stop()
+        await publisher.stop()
+        shutdown_chart_workers()
         # Закрываем сессию бота при завершении
         await bot.session.close()
 
@@ -14,6 +14,19 @@ class Config:
     admins: Admins
     DATABASE_URL: str
     ADMIN_PASSWORD: str  # Изменено с List[int] на str
+    SCHEDULE_UTC_OFFSET: int = 3  # Часовой пояс расписания рассылок (МСК)
+    SURVEY_ARCHIVE_DAYS: int = 30  # Через сколько дней брошенный опрос уходит в архив
+    DATABASE_PARTITIONING: bool = False  # Помесячные секции user_surveys/user_activity (MySQL, экспериментально)
+    PARTITION_RETENTION_MONTHS: int = 24  # Сколько месяцев секции хранятся в рабочих таблицах
+    DATABASE_REPLICA_URL: str = ""  # Реплика для отчетов и выгрузок; пусто — только основная БД
+    REPLICA_MAX_LAG_SECONDS: int = 30  # При большем отставании отчеты читают основную БД
+    BOT_CONNECTION_LIMIT: int = 100  # Одновременных соединений с Bot API
+    BOT_DNS_CACHE_TTL: int = 300  # Кэш DNS api.telegram.org, секунд
+    BOT_KEEPALIVE_TIMEOUT: float = 30  # Простой соединения до закрытия, секунд
+    BOT_REQUEST_TIMEOUT: float = 15  # Таймаут обычного запроса, секунд
+    BOT_UPLOAD_TIMEOUT: float = 120  # Таймаут загрузки файла, секунд
+    BOT_RETRY_ATTEMPTS: int = 3  # Повторы при сетевых ошибках и 5xx
+    BOT_RETRY_BACKOFF: float = 0.5  # Базовая задержка перед повтором, секунд
 
 
 @dataclass
@@ -59,6 +72,19 @@ def get_settings(path: str = None) -> Settings:
             ),
             ADMIN_PASSWORD=env.str("ADMIN_PASSWORD"),
             DATABASE_URL=env.str("DATABASE_URL"),
+            SCHEDULE_UTC_OFFSET=env.int("SCHEDULE_UTC_OFFSET", 3),
+            SURVEY_ARCHIVE_DAYS=env.int("SURVEY_ARCHIVE_DAYS", 30),
+            DATABASE_PARTITIONING=env.bool("DATABASE_PARTITIONING", False),
+            PARTITION_RETENTION_MONTHS=env.int("PARTITION_RETENTION_MONTHS", 24),
+            DATABASE_REPLICA_URL=env.str("DATABASE_REPLICA_URL", ""),
+            REPLICA_MAX_LAG_SECONDS=env.int("REPLICA_MAX_LAG_SECONDS", 30),
+            BOT_CONNECTION_LIMIT=env.int("BOT_CONNECTION_LIMIT", 100),
+            BOT_DNS_CACHE_TTL=env.int("BOT_DNS_CACHE_TTL", 300),
+            BOT_KEEPALIVE_TIMEOUT=env.float("BOT_KEEPALIVE_TIMEOUT", 30),
+            BOT_REQUEST_TIMEOUT=env.float("BOT_REQUEST_TIMEOUT", 15),
+            BOT_UPLOAD_TIMEOUT=env.float("BOT_UPLOAD_TIMEOUT", 120),
+            BOT_RETRY_ATTEMPTS=env.int("BOT_RETRY_ATTEMPTS", 3),
+            BOT_RETRY_BACKOFF=env.float("BOT_RETRY_BACKOFF", 0.5),
         ),
     )
 
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete, insert
+
+from src.utils.logging import write_logs
+from .settings_data import create_session, ArchivedSurvey, SurveyAnswer, UserSurvey
+
+# Сколько опросов переносится в одной транзакции
+ARCHIVE_BATCH_SIZE = 500
+# Пауза между пачками, чтобы не занимать БД надолго
+ARCHIVE_BATCH_PAUSE = 0.5
+
+
+async def _archive_batch(cutoff: datetime, batch_size: int) -> int:
+    """Переносит в архив одну пачку брошенных опросов в одной транзакции.
+
+    Returns:
+        int: Количество перенесенных опросов.
+    """
+    async with create_session() as session:
+        # Блокировка строк не дает пользователю дописать опрос, пока он переносится
+        surveys = (
+            await session.execute(
+                select(
+                    UserSurvey.id,
+                    UserSurvey.user_id,
+                    UserSurvey.definition_id,
+                    UserSurvey.created_at,
+                )
+                .where(
+                    UserSurvey.survey_completed == False,
+                    UserSurvey.created_at < cutoff,
+                )
+                .order_by(UserSurvey.created_at)
+                .limit(batch_size)
+                .with_for_update()
+            )
+        ).all()
+        if not surveys:
+            return 0
+
+        survey_ids = [survey.id for survey in surveys]
+        answers = {survey_id: [] for survey_id in survey_ids}
+        answer_rows = await session.execute(
+            select(
+                SurveyAnswer.survey_id,
+                SurveyAnswer.question_idx,
+                SurveyAnswer.option_idx,
+                SurveyAnswer.free_text,
+            )
+            .where(SurveyAnswer.survey_id.in_(survey_ids))
+            .order_by(SurveyAnswer.survey_id, SurveyAnswer.question_idx)
+        )
+        for survey_id, question_idx, option_idx, free_text in answer_rows:
+            answers[survey_id].append([question_idx, option_idx, free_text])
+
+        now = datetime.utcnow()
+        await session.execute(
+            insert(ArchivedSurvey),
+            [
+                {
+                    "id": survey.id,
+                    "user_id": survey.user_id,
+                    "definition_id": survey.definition_id,
+                    "created_at": survey.created_at,
+                    "archived_at": now,
+                    "answers": json.dumps(answers[survey.id]),
+                }
+                for survey in surveys
+            ],
+        )
+        # Ответы удаляются явно: SQLite не выполняет ON DELETE CASCADE без PRAGMA,
+        # а в секционированной MySQL внешнего ключа нет вовсе (см. partitions.py)
+        await session.execute(
+            delete(SurveyAnswer).where(SurveyAnswer.survey_id.in_(survey_ids))
+        )
+        await session.execute(delete(UserSurvey).where(UserSurvey.id.in_(survey_ids)))
+
+    return len(surveys)
+
+
+async def archive_abandoned_surveys(
+    older_than: timedelta,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause: float = ARCHIVE_BATCH_PAUSE,
+) -> int:
+    """Переносит незавершенные опросы старше older_than в archived_surveys.
+
+    Опросы обрабатываются пачками по batch_size в отдельных транзакциях
+    с паузой между ними, поэтому блокировки короткие и обработка
+    пользователей не останавливается даже при большом накоплении.
+    Ответы опросов удаляются явно, а не каскадом: после секционирования
+    user_surveys внешнего ключа survey_answers на нее нет.
+
+    Args:
+        older_than (timedelta): Возраст, после которого опрос считается брошенным.
+        batch_size (int): Размер пачки.
+        pause (float): Пауза между пачками в секундах.
+
+    Returns:
+        int: Количество перенесенных опросов.
+    """
+    cutoff = datetime.utcnow() - older_than
+    total = 0
+    while True:
+        archived = await _archive_batch(cutoff, batch_size)
+        total += archived
+        if archived < batch_size:
+            break
+        await asyncio.sleep(pause)
+
+    await write_logs(
+        "info",
+        f"Archived {total} abandoned surveys started before {cutoff:%Y-%m-%d %H:%M}",
+    )
+    return total
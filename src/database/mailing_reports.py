@@ -0,0 +1,68 @@
+import json
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from src.utils.logging import write_logs
+from .settings_data import create_session, create_read_only_session, MailingReport
+
+
+async def save_mailing_report(
+    metrics,
+    result,
+    created_by: Optional[int] = None,
+    scheduled_id: Optional[int] = None,
+) -> Optional[int]:
+    """Сохраняет метрики завершенной рассылки.
+
+    Args:
+        metrics (MailingMetrics): Собранные метрики.
+        result (MailingResult): Итоги рассылки.
+        created_by (Optional[int]): Администратор, запустивший рассылку.
+        scheduled_id (Optional[int]): Запланированная рассылка, если есть.
+
+    Returns:
+        Optional[int]: Идентификатор отчета или None при ошибке.
+    """
+    try:
+        async with create_session() as session:
+            report = MailingReport(
+                scheduled_id=scheduled_id,
+                created_by=created_by,
+                started_at=metrics.started_at,
+                finished_at=metrics.finished_at,
+                successful=result.successful,
+                failed=result.failed,
+                blocked=result.blocked,
+                retries=metrics.retries,
+                flood_wait_seconds=metrics.flood_wait,
+                metrics=json.dumps(metrics.to_dict(), separators=(",", ":")),
+            )
+            session.add(report)
+            await session.flush()
+            return report.id
+    except Exception as e:
+        await write_logs("error", f"Error saving mailing report: {str(e)}")
+        return None
+
+
+async def get_mailing_report(report_id: int) -> Optional[MailingReport]:
+    """Возвращает отчет о рассылке по идентификатору."""
+    async with create_read_only_session() as session:
+        return await session.get(MailingReport, report_id)
+
+
+async def get_recent_mailing_reports(limit: int = 10) -> List[MailingReport]:
+    """Возвращает последние отчеты о рассылках, новые первыми.
+
+    Args:
+        limit (int): Сколько отчетов вернуть.
+
+    Returns:
+        List[MailingReport]: Отчеты.
+    """
+    async with create_read_only_session() as session:
+        result = await session.execute(
+            select(MailingReport).order_by(MailingReport.id.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
@@ -0,0 +1,229 @@
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select, insert, update, exists, text, inspect
+from sqlalchemy.schema import CreateColumn
+
+from src.utils.logging import write_logs
+from .settings_data import Base, engine, create_session, UserSurvey, SurveyAnswer
+
+# Имя представления с прежней "широкой" структурой user_surveys
+COMPAT_VIEW_NAME = "user_surveys_wide"
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _sql_literal(value: str) -> str:
+    """Экранирует строку для подстановки в DDL представления."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _build_compat_view_sql(questions: Sequence) -> str:
+    """Строит SQL представления, собирающего ответы обратно в одну строку.
+
+    Args:
+        questions (Sequence): Вопросы опроса в порядке их индексов.
+
+    Returns:
+        str: Запрос CREATE VIEW.
+    """
+    columns = []
+    for question_idx, question in enumerate(questions):
+        if question.options:
+            cases = " ".join(
+                f"WHEN {option_idx} THEN {_sql_literal(option)}"
+                for option_idx, option in enumerate(question.options)
+            )
+            value = f"CASE a.option_idx {cases} ELSE a.free_text END"
+        else:
+            value = "a.free_text"
+        columns.append(
+            f"MAX(CASE WHEN a.question_idx = {question_idx} THEN {value} END) "
+            f"AS {question.field_name}"
+        )
+
+    return (
+        f"CREATE VIEW {COMPAT_VIEW_NAME} AS "
+        "SELECT s.id, s.user_id, s.survey_completed, s.created_at, "
+        + ", ".join(columns)
+        + " FROM user_surveys s LEFT JOIN survey_answers a ON a.survey_id = s.id "
+        "GROUP BY s.id, s.user_id, s.survey_completed, s.created_at"
+    )
+
+
+def _add_missing_schema(sync_conn) -> List[str]:
+    """Добавляет в существующие таблицы недостающие колонки и индексы.
+
+    create_all создает только отсутствующие таблицы, поэтому новые колонки
+    моделей добавляются в уже созданные таблицы через ALTER TABLE.
+
+    Args:
+        sync_conn: Синхронное соединение SQLAlchemy.
+
+    Returns:
+        List[str]: Список добавленных объектов схемы.
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+                sync_conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+                )
+                added.append(f"{table.name}.{column.name}")
+
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(sync_conn)
+                added.append(f"{table.name}.{index.name}")
+
+    return added
+
+
+async def sync_schema() -> None:
+    """Приводит существующие таблицы к текущим моделям."""
+    try:
+        async with engine.begin() as conn:
+            added = await conn.run_sync(_add_missing_schema)
+        if added:
+            await write_logs("info", f"Schema updated: {', '.join(added)}")
+    except Exception as e:
+        await write_logs("error", f"Error syncing database schema: {str(e)}")
+        raise
+
+
+def answer_to_row(
+    survey_id: int, question_idx: int, options: Optional[List[str]], answer: str
+) -> dict:
+    """Преобразует текстовый ответ в строку таблицы survey_answers.
+
+    Args:
+        survey_id (int): Идентификатор опроса.
+        question_idx (int): Индекс вопроса.
+        options (Optional[List[str]]): Варианты ответа вопроса.
+        answer (str): Текст ответа.
+
+    Returns:
+        dict: Значения колонок survey_answers.
+    """
+    if options and answer in options:
+        return {
+            "survey_id": survey_id,
+            "question_idx": question_idx,
+            "option_idx": options.index(answer),
+            "free_text": None,
+        }
+    return {
+        "survey_id": survey_id,
+        "question_idx": question_idx,
+        "option_idx": None,
+        "free_text": answer,
+    }
+
+
+async def create_compat_view(questions: Sequence) -> None:
+    """Пересоздает представление user_surveys_wide.
+
+    Args:
+        questions (Sequence): Вопросы опроса в порядке их индексов.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP VIEW IF EXISTS {COMPAT_VIEW_NAME}"))
+        await conn.execute(text(_build_compat_view_sql(questions)))
+
+
+async def backfill_survey_answers(questions: Sequence) -> int:
+    """Переносит ответы из колонок user_surveys в таблицу survey_answers.
+
+    Обрабатывает опросы пачками по BACKFILL_BATCH_SIZE и пропускает уже
+    перенесенные, поэтому повторный запуск безопасен.
+
+    Args:
+        questions (Sequence): Вопросы опроса в порядке их индексов.
+
+    Returns:
+        int: Количество перенесенных ответов.
+    """
+    migrated = 0
+    last_id = 0
+
+    while True:
+        async with create_session() as session:
+            stmt = (
+                select(UserSurvey)
+                .where(
+                    UserSurvey.id > last_id,
+                    ~exists().where(SurveyAnswer.survey_id == UserSurvey.id),
+                )
+                .order_by(UserSurvey.id)
+                .limit(BACKFILL_BATCH_SIZE)
+            )
+            surveys = (await session.execute(stmt)).scalars().all()
+            if not surveys:
+                break
+
+            rows = []
+            for survey in surveys:
+                for question_idx, question in enumerate(questions):
+                    answer = getattr(survey, question.field_name, None)
+                    if answer is not None:
+                        rows.append(
+                            answer_to_row(
+                                survey.id, question_idx, question.options, answer
+                            )
+                        )
+
+            if rows:
+                await session.execute(insert(SurveyAnswer), rows)
+            migrated += len(rows)
+            last_id = surveys[-1].id
+
+    return migrated
+
+
+async def migrate_survey_answers(questions: Sequence) -> None:
+    """Переводит хранение ответов на таблицу survey_answers.
+
+    Args:
+        questions (Sequence): Вопросы опроса в порядке их индексов.
+    """
+    try:
+        migrated = await backfill_survey_answers(questions)
+        await create_compat_view(questions)
+        await write_logs(
+            "info", f"Survey answers migration finished, rows backfilled: {migrated}"
+        )
+    except Exception as e:
+        await write_logs("error", f"Error migrating survey answers: {str(e)}")
+        raise
+
+
+async def backfill_completed_at() -> None:
+    """Заполняет completed_at для опросов, завершенных до появления колонки.
+
+    Точное время завершения неизвестно, поэтому берется время создания
+    опроса: для недельных когорт этого достаточно.
+    """
+    try:
+        async with create_session() as session:
+            result = await session.execute(
+                update(UserSurvey)
+                .where(
+                    UserSurvey.survey_completed == True,
+                    UserSurvey.completed_at.is_(None),
+                )
+                .values(completed_at=UserSurvey.created_at)
+            )
+        await write_logs(
+            "info", f"Backfilled completed_at for {result.rowcount} surveys"
+        )
+    except Exception as e:
+        await write_logs("error", f"Error backfilling completed_at: {str(e)}")
+        raise
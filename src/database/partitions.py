@@ -0,0 +1,459 @@
+"""Помесячное секционирование user_surveys и user_activity в MySQL (экспериментально).
+
+Таблицы делятся на секции RANGE COLUMNS по created_at/date: одна секция
+на месяц и секция pmax для всего, что позже. Запросы статистики фильтруют
+по диапазону этих колонок, поэтому MySQL читает только нужные месяцы.
+Задача обслуживания заранее создает будущие секции и убирает устаревшие:
+секции user_activity удаляются (итоги дней хранятся в activity_snapshots),
+секции user_surveys переносятся в отдельные таблицы user_surveys_pYYYYMM,
+а ответы этих опросов — из survey_answers в survey_answers_pYYYYMM.
+
+MySQL не поддерживает внешние ключи у секционированных таблиц, поэтому
+при включении они удаляются, а первичный ключ дополняется колонкой секций.
+После этого ссылочную целостность БД больше не проверяет: ON DELETE
+CASCADE для survey_answers не работает, и каждый код, удаляющий или
+переносящий опросы, обязан сам обработать их ответы (так делают
+_archive_partition и archive_abandoned_surveys).
+
+Функция экспериментальная: отсечение секций проверено только по коду
+запросов, перед включением в продакшене выполните --explain на копии БД.
+
+Запуск из корня проекта:
+    python -m src.database.partitions --enable   # однократно секционировать таблицы
+    python -m src.database.partitions --run      # обслужить секции сейчас
+    python -m src.database.partitions --explain  # проверить отсечение секций
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+
+from src.config.config import settings
+from src.utils.logging import write_logs
+from .settings_data import engine
+from .using_data import activity_for_day, completed_surveys_between
+
+# На сколько месяцев вперед создаются пустые секции
+PARTITION_MONTHS_AHEAD = 3
+# Сколько строк зависимой таблицы удаляется за один запрос при переносе секции
+DEPENDENT_DELETE_BATCH = 10000
+MAXVALUE_PARTITION = "pmax"
+_PARTITION_NAME = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    """Таблица с помесячными секциями.
+
+    Атрибуты:
+        name (str): Имя таблицы.
+        column (str): Колонка DATETIME, по которой строятся секции.
+        archive (bool): Переносить устаревшие секции в отдельные таблицы,
+            а не удалять.
+        dependents (Tuple[Tuple[str, str], ...]): Таблицы, ссылающиеся на
+            строки секций, и их колонка со ссылкой на id. Их строки
+            переносятся в архив вместе с секцией.
+    """
+
+    name: str
+    column: str
+    archive: bool
+    dependents: Tuple[Tuple[str, str], ...] = ()
+
+
+PARTITIONED_TABLES = (
+    # Завершенные опросы — это лиды, старые секции только переносятся
+    PartitionedTable(
+        "user_surveys",
+        "created_at",
+        archive=True,
+        dependents=(("survey_answers", "survey_id"),),
+    ),
+    PartitionedTable("user_activity", "date", archive=False),
+)
+
+
+def add_months(month: date, count: int) -> date:
+    """Сдвигает первое число месяца на count месяцев."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Имя секции месяца, например p202610."""
+    return f"p{month:%Y%m}"
+
+
+def _partition_ddl(month: date) -> str:
+    upper = add_months(month, 1).isoformat()
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{upper}')"
+
+
+def _month_range(first: date, last: date) -> List[date]:
+    months = []
+    while first <= last:
+        months.append(first)
+        first = add_months(first, 1)
+    return months
+
+
+def is_partitioning_supported() -> bool:
+    """Секционирование реализовано только для MySQL."""
+    return engine.dialect.name == "mysql"
+
+
+async def get_partition_months(conn, table: PartitionedTable) -> Optional[List[date]]:
+    """Возвращает месяцы секций таблицы.
+
+    Returns:
+        Optional[List[date]]: Первые числа месяцев (без pmax) или None,
+            если таблица не секционирована.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+            "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+        ),
+        {"table": table.name},
+    )
+    names = result.scalars().all()
+    if not names:
+        return None
+
+    months = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match[1]), int(match[2]), 1))
+    return months
+
+
+def _foreign_keys(sync_conn, table_name: str) -> List[Tuple[str, str]]:
+    """Внешние ключи таблицы и ссылающиеся на нее: (таблица, имя ключа)."""
+    inspector = inspect(sync_conn)
+    keys = []
+    for owner in inspector.get_table_names():
+        for foreign_key in inspector.get_foreign_keys(owner):
+            if foreign_key.get("name") and table_name in (
+                owner,
+                foreign_key["referred_table"],
+            ):
+                keys.append((owner, foreign_key["name"]))
+    return keys
+
+
+async def enable_partitioning(table: PartitionedTable, now: datetime) -> bool:
+    """Секционирует таблицу помесячно.
+
+    Таблица перестраивается целиком и на это время блокируется для
+    записи, поэтому преобразование запускается вручную, а не при старте.
+
+    Args:
+        table (PartitionedTable): Таблица.
+        now (datetime): Текущее время UTC.
+
+    Returns:
+        bool: False, если таблица уже секционирована.
+    """
+    async with engine.begin() as conn:
+        if await get_partition_months(conn, table) is not None:
+            return False
+
+        for owner, key_name in await conn.run_sync(_foreign_keys, table.name):
+            await conn.execute(text(f"ALTER TABLE {owner} DROP FOREIGN KEY {key_name}"))
+
+        # Колонка секций входит в первичный ключ и не может быть NULL
+        await conn.execute(
+            text(
+                f"UPDATE {table.name} SET {table.column} = UTC_TIMESTAMP() "
+                f"WHERE {table.column} IS NULL"
+            )
+        )
+        await conn.execute(
+            text(
+                f"ALTER TABLE {table.name} DROP PRIMARY KEY, "
+                f"ADD PRIMARY KEY (id, {table.column})"
+            )
+        )
+
+        oldest = (
+            await conn.execute(text(f"SELECT MIN({table.column}) FROM {table.name}"))
+        ).scalar()
+        current = now.date().replace(day=1)
+        first = oldest.date().replace(day=1) if oldest else current
+        months = _month_range(first, add_months(current, PARTITION_MONTHS_AHEAD))
+        partitions = [_partition_ddl(month) for month in months]
+        partitions.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        await conn.execute(
+            text(
+                f"ALTER TABLE {table.name} PARTITION BY RANGE COLUMNS({table.column}) "
+                f"({', '.join(partitions)})"
+            )
+        )
+
+    await write_logs(
+        "info", f"Table {table.name} partitioned into {len(months)} monthly partitions"
+    )
+    return True
+
+
+async def _archive_dependents(conn, table: PartitionedTable, month: date) -> None:
+    """Переносит строки зависимых таблиц, ссылающиеся на архив секции.
+
+    Без внешних ключей MySQL не удалит их каскадно, и после переноса
+    секции они остались бы в рабочей таблице без своих опросов. Строки
+    копируются в таблицу <dependent>_pYYYYMM и удаляются пачками;
+    повторный запуск ничего не дублирует.
+    """
+    archive_name = f"{table.name}_{partition_name(month)}"
+    for dependent, column in table.dependents:
+        dependent_archive = f"{dependent}_{partition_name(month)}"
+        # CREATE TABLE ... LIKE не копирует внешние ключи
+        await conn.execute(
+            text(f"CREATE TABLE IF NOT EXISTS {dependent_archive} LIKE {dependent}")
+        )
+        await conn.execute(
+            text(
+                f"INSERT IGNORE INTO {dependent_archive} SELECT * FROM {dependent} "
+                f"WHERE {column} IN (SELECT id FROM {archive_name})"
+            )
+        )
+        moved = 0
+        while True:
+            result = await conn.execute(
+                text(
+                    f"DELETE FROM {dependent} "
+                    f"WHERE {column} IN (SELECT id FROM {archive_name}) "
+                    f"LIMIT {DEPENDENT_DELETE_BATCH}"
+                )
+            )
+            moved += result.rowcount
+            if result.rowcount < DEPENDENT_DELETE_BATCH:
+                break
+        await write_logs(
+            "info", f"Moved {moved} rows of {dependent} to {dependent_archive}"
+        )
+
+
+async def _archive_partition(conn, table: PartitionedTable, month: date) -> bool:
+    """Переносит секцию в отдельную таблицу обменом секций (без копирования строк).
+
+    Строки зависимых таблиц (ответы опросов) переносятся следом, см.
+    _archive_dependents.
+
+    Returns:
+        bool: False, если таблица архива уже существует и секция не тронута.
+    """
+    archive_name = f"{table.name}_{partition_name(month)}"
+    exists = (
+        await conn.execute(
+            text(
+                "SELECT COUNT(*) FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ),
+            {"table": archive_name},
+        )
+    ).scalar()
+    if exists:
+        # Повторный обмен вернул бы строки обратно; разбирается вручную.
+        # Зависимые строки переносятся, если прошлый запуск прервался до этого
+        await _archive_dependents(conn, table, month)
+        await write_logs(
+            "warning", f"Archive table {archive_name} already exists, partition kept"
+        )
+        return False
+
+    await conn.execute(text(f"CREATE TABLE {archive_name} LIKE {table.name}"))
+    await conn.execute(text(f"ALTER TABLE {archive_name} REMOVE PARTITIONING"))
+    await conn.execute(
+        text(
+            f"ALTER TABLE {table.name} EXCHANGE PARTITION {partition_name(month)} "
+            f"WITH TABLE {archive_name}"
+        )
+    )
+    await _archive_dependents(conn, table, month)
+    return True
+
+
+async def maintain_partitions(
+    table: PartitionedTable, now: datetime, retention_months: int
+) -> Optional[Tuple[List[date], List[date]]]:
+    """Создает будущие секции и убирает устаревшие.
+
+    Args:
+        table (PartitionedTable): Таблица.
+        now (datetime): Текущее время UTC.
+        retention_months (int): Сколько месяцев секции остаются в таблице.
+
+    Returns:
+        Optional[Tuple[List[date], List[date]]]: Добавленные и убранные месяцы
+            или None, если таблица не секционирована.
+    """
+    async with engine.begin() as conn:
+        months = await get_partition_months(conn, table)
+        if months is None:
+            return None
+
+        current = now.date().replace(day=1)
+        first_new = add_months(max(months), 1) if months else current
+        added = _month_range(first_new, add_months(current, PARTITION_MONTHS_AHEAD))
+        if added:
+            # pmax пуст, пока будущие секции создаются заранее, поэтому это быстро
+            partitions = [_partition_ddl(month) for month in added]
+            partitions.append(
+                f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)"
+            )
+            await conn.execute(
+                text(
+                    f"ALTER TABLE {table.name} REORGANIZE PARTITION "
+                    f"{MAXVALUE_PARTITION} INTO ({', '.join(partitions)})"
+                )
+            )
+
+        expire_before = add_months(current, -retention_months)
+        removed = []
+        for month in months:
+            if month >= expire_before:
+                break
+            if table.archive and not await _archive_partition(conn, table, month):
+                break
+            await conn.execute(
+                text(f"ALTER TABLE {table.name} DROP PARTITION {partition_name(month)}")
+            )
+            removed.append(month)
+
+    return added, removed
+
+
+async def maintain_all_partitions(now: Optional[datetime] = None) -> None:
+    """Обслуживает секции всех таблиц из PARTITIONED_TABLES."""
+    if not is_partitioning_supported():
+        await write_logs(
+            "warning", "DATABASE_PARTITIONING is only supported for MySQL"
+        )
+        return
+
+    now = now or datetime.utcnow()
+    for table in PARTITIONED_TABLES:
+        result = await maintain_partitions(
+            table, now, settings.config.PARTITION_RETENTION_MONTHS
+        )
+        if result is None:
+            await write_logs(
+                "warning",
+                f"Table {table.name} is not partitioned, "
+                "run python -m src.database.partitions --enable",
+            )
+            continue
+
+        added, removed = result
+        action = "archived" if table.archive else "dropped"
+        await write_logs(
+            "info",
+            f"Partitions of {table.name}: added "
+            f"{', '.join(map(partition_name, added)) or 'none'}, {action} "
+            f"{', '.join(map(partition_name, removed)) or 'none'}",
+        )
+
+
+async def explain_pruning(now: datetime) -> bool:
+    """Проверяет через EXPLAIN, что запросы статистики читают не все секции.
+
+    Returns:
+        bool: True, если во всех запросах сработало отсечение секций.
+    """
+    surveys, activity = PARTITIONED_TABLES
+    checks = {
+        "weekly surveys": (
+            surveys,
+            completed_surveys_between(now - timedelta(days=7), now),
+        ),
+        "monthly surveys": (
+            surveys,
+            completed_surveys_between(now - timedelta(days=30), now),
+        ),
+        "daily activity": (activity, activity_for_day(now.date())),
+    }
+
+    pruned_all = True
+    async with engine.connect() as conn:
+        for name, (table, stmt) in checks.items():
+            months = await get_partition_months(conn, table)
+            if months is None:
+                print(f"{name:<16} table {table.name} is not partitioned")
+                pruned_all = False
+                continue
+
+            compiled = stmt.compile(dialect=conn.dialect)
+            params = tuple(compiled.params[key] for key in compiled.positiontup)
+            rows = (
+                await conn.exec_driver_sql(f"EXPLAIN {compiled}", params)
+            ).mappings().all()
+            used = [
+                partition
+                for row in rows
+                if row["table"] == table.name and row["partitions"]
+                for partition in row["partitions"].split(",")
+            ]
+
+            total = len(months) + 1  # Вместе с pmax
+            pruned = len(used) < total
+            pruned_all = pruned_all and pruned
+            print(
+                f"{name:<16} {'OK  ' if pruned else 'FULL'} "
+                f"{len(used)}/{total} partitions: {', '.join(used) or '-'}"
+            )
+
+    return pruned_all
+
+
+async def _run(args: argparse.Namespace) -> int:
+    if not is_partitioning_supported():
+        print("Partitioning is only supported for MySQL")
+        return 1
+
+    now = datetime.utcnow()
+    try:
+        if args.enable:
+            for table in PARTITIONED_TABLES:
+                enabled = await enable_partitioning(table, now)
+                print(f"{table.name}: {'partitioned' if enabled else 'already partitioned'}")
+        if args.run:
+            await maintain_all_partitions(now)
+        if args.explain and not await explain_pruning(now):
+            return 1
+        return 0
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Секционирование таблиц MySQL (экспериментально)"
+    )
+    parser.add_argument(
+        "--enable", action="store_true", help="Секционировать таблицы (однократно)"
+    )
+    parser.add_argument(
+        "--run", action="store_true", help="Создать будущие и убрать устаревшие секции"
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Проверить отсечение секций в запросах статистики",
+    )
+    args = parser.parse_args()
+    if not (args.enable or args.run or args.explain):
+        parser.error("укажите --enable, --run или --explain")
+    sys.exit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
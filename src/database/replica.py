@@ -0,0 +1,185 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncGenerator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.config.config import settings
+from src.utils.logging import write_logs
+from .settings_data import (
+    SchemaMeta,
+    create_engine_for_url,
+    create_read_only_session,
+    set_schema_meta,
+)
+
+# Ключ schema_meta, в который основная БД пишет текущее время
+HEARTBEAT_KEY = "replica_heartbeat"
+# Как часто основная БД обновляет heartbeat, секунд
+HEARTBEAT_INTERVAL = 5
+# Как долго переиспользуется результат проверки отставания, секунд
+LAG_CHECK_INTERVAL = 10
+# Сколько ждать ответа реплики при проверке; недоступная реплика не должна
+# задерживать отчеты на полный таймаут соединения драйвера
+LAG_CHECK_TIMEOUT = 2
+
+
+class ReplicaRouter:
+    """Направляет сессии отчетов на реплику, пока она не отстает.
+
+    Отставание измеряется по heartbeat: основная БД раз в HEARTBEAT_INTERVAL
+    секунд записывает текущее время в schema_meta, а роутер читает эту
+    запись с реплики. Способ не требует прав на SHOW REPLICA STATUS и
+    одинаково работает для любой схемы репликации. Результат проверки
+    кэшируется на LAG_CHECK_INTERVAL секунд, поэтому отчеты не добавляют
+    лишних запросов.
+    """
+
+    def __init__(self, url: Optional[str], max_lag: float):
+        """
+        Args:
+            url (Optional[str]): URL реплики; пустое значение отключает роутинг.
+            max_lag (float): Допустимое отставание реплики в секундах.
+        """
+        self._max_lag = max_lag
+        self._engine = create_engine_for_url(url) if url else None
+        self._sessions = (
+            sessionmaker(self._engine, class_=AsyncSession, expire_on_commit=False)
+            if self._engine is not None
+            else None
+        )
+        self._healthy = False
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Настроена ли реплика."""
+        return self._engine is not None
+
+    async def get_lag(self) -> Optional[float]:
+        """Возвращает отставание реплики в секундах.
+
+        Returns:
+            Optional[float]: Отставание или None, если heartbeat еще не
+                дошел до реплики.
+        """
+        async with self._engine.connect() as connection:
+            value = (
+                await connection.execute(
+                    select(SchemaMeta.value).where(SchemaMeta.key == HEARTBEAT_KEY)
+                )
+            ).scalar()
+        if value is None:
+            return None
+        age = (datetime.utcnow() - datetime.fromisoformat(value)).total_seconds()
+        # Heartbeat обновляется с периодом HEARTBEAT_INTERVAL, поэтому
+        # такой возраст записи — норма и отставанием не считается
+        return max(0.0, age - HEARTBEAT_INTERVAL)
+
+    async def is_usable(self) -> bool:
+        """Можно ли сейчас читать с реплики."""
+        if not self.enabled:
+            return False
+        if self._is_fresh():
+            return self._healthy
+
+        async with self._lock:
+            # Пока ждали блокировку, проверку мог выполнить другой запрос
+            if self._is_fresh():
+                return self._healthy
+            try:
+                lag = await asyncio.wait_for(self.get_lag(), LAG_CHECK_TIMEOUT)
+                healthy = lag is not None and lag <= self._max_lag
+                reason = "no heartbeat" if lag is None else f"lag {lag:.1f}s"
+            except asyncio.TimeoutError:
+                healthy = False
+                reason = f"no response in {LAG_CHECK_TIMEOUT}s"
+            except Exception as e:
+                healthy = False
+                reason = f"error: {str(e)}"
+
+            if healthy != self._healthy or self._checked_at is None:
+                await write_logs(
+                    "info" if healthy else "warning",
+                    f"Read replica {'in use' if healthy else 'bypassed'} ({reason})",
+                )
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+        return self._healthy
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._checked_at is not None
+            and time.monotonic() - self._checked_at < LAG_CHECK_INTERVAL
+        )
+
+    @asynccontextmanager
+    async def session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Сессия реплики; ничего не фиксирует, так как используется только для чтения."""
+        async with self._sessions() as session:
+            try:
+                yield session
+            except Exception as e:
+                await write_logs("error", f"Ошибка сессии реплики: {str(e)}")
+                raise
+            finally:
+                await session.close()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            try:
+                await set_schema_meta({HEARTBEAT_KEY: datetime.utcnow().isoformat()})
+            except Exception as e:
+                await write_logs("error", f"Error writing replica heartbeat: {str(e)}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def start(self) -> None:
+        """Запускает запись heartbeat в основную БД, если реплика настроена."""
+        if self.enabled and self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(
+                self._heartbeat_loop(), name="replica-heartbeat"
+            )
+
+    async def stop(self) -> None:
+        """Останавливает heartbeat и закрывает соединения с репликой."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        if self._engine is not None:
+            await self._engine.dispose()
+
+
+replica = ReplicaRouter(
+    settings.config.DATABASE_REPLICA_URL,
+    settings.config.REPLICA_MAX_LAG_SECONDS,
+)
+
+
+@asynccontextmanager
+async def create_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Создает сессию для отчетов и выгрузок.
+
+    Сессия открывается на реплике, если она настроена и отстает не больше
+    REPLICA_MAX_LAG_SECONDS, иначе — на основной БД через
+    create_read_only_session. В обоих случаях сессия не вызывает commit,
+    поэтому использовать ее можно только для чтения.
+
+    Yields:
+        AsyncSession: Сессия базы данных.
+    """
+    if await replica.is_usable():
+        async with replica.session() as session:
+            yield session
+    else:
+        async with create_read_only_session() as session:
+            yield session
@@ -0,0 +1,148 @@
+import json
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from sqlalchemy import select, func, or_, Select
+
+from src.utils.logging import write_logs
+from .settings_data import create_read_only_session, User, UserSurvey, SurveyAnswer
+from .replica import create_read_session
+
+# Размер страницы при выборке получателей
+SEGMENT_PAGE_SIZE = 1000
+# Сколько секунд размер аудитории считается актуальным
+AUDIENCE_CACHE_TTL = 300
+
+# Сегмент описывается словарем, который можно хранить в FSM и в БД:
+#   {"kind": "all"}
+#   {"kind": "completed"}
+#   {"kind": "inactive", "days": 30}
+#   {"kind": "answer", "definition_id": 1, "question_idx": 1, "option_idx": 0}
+#   {"kind": "text_answer", "definition_id": 1, "question_idx": 3, "text": "Москва"}
+SegmentSpec = Dict
+
+_audience_cache: Dict[str, Tuple[int, float]] = {}
+
+
+def _definition_filter(definition_id: Optional[int]):
+    """Опросы, созданные до появления определений, относятся к опросу по умолчанию."""
+    return or_(
+        UserSurvey.definition_id == definition_id, UserSurvey.definition_id.is_(None)
+    )
+
+
+def build_segment_query(segment: SegmentSpec) -> Select:
+    """Компилирует описание сегмента в один запрос идентификаторов пользователей.
+
+    Каждый вид сегмента опирается на индекс: users.survey_completed,
+    users.last_activity или survey_answers(question_idx, option_idx).
+
+    Args:
+        segment (SegmentSpec): Описание сегмента.
+
+    Returns:
+        Select: Запрос, возвращающий user_id.
+
+    Raises:
+        ValueError: Если вид сегмента неизвестен.
+    """
+    kind = segment.get("kind", "all")
+
+    if kind == "all":
+        return select(User.user_id)
+
+    if kind == "completed":
+        return select(User.user_id).where(User.survey_completed == True)
+
+    if kind == "inactive":
+        border = datetime.utcnow() - timedelta(days=segment.get("days", 30))
+        return select(User.user_id).where(User.last_activity < border)
+
+    if kind == "answer":
+        answered = (
+            select(UserSurvey.user_id)
+            .join(SurveyAnswer, SurveyAnswer.survey_id == UserSurvey.id)
+            .where(
+                SurveyAnswer.question_idx == segment["question_idx"],
+                SurveyAnswer.option_idx == segment["option_idx"],
+                UserSurvey.survey_completed == True,
+                _definition_filter(segment.get("definition_id")),
+            )
+        )
+        return select(User.user_id).where(User.user_id.in_(answered))
+
+    if kind == "text_answer":
+        answered = (
+            select(UserSurvey.user_id)
+            .join(SurveyAnswer, SurveyAnswer.survey_id == UserSurvey.id)
+            .where(
+                SurveyAnswer.question_idx == segment["question_idx"],
+                SurveyAnswer.option_idx.is_(None),
+                SurveyAnswer.free_text.contains(segment["text"], autoescape=True),
+                _definition_filter(segment.get("definition_id")),
+            )
+        )
+        return select(User.user_id).where(User.user_id.in_(answered))
+
+    raise ValueError(f"Unknown segment kind: {kind}")
+
+
+async def iter_segment_user_ids(segment: SegmentSpec) -> AsyncIterator[int]:
+    """Выдает идентификаторы пользователей сегмента страницами по user_id.
+
+    Каждая страница — короткий запрос по первичному ключу (keyset-пагинация),
+    поэтому соединение не удерживается на все время рассылки.
+
+    Args:
+        segment (SegmentSpec): Описание сегмента.
+
+    Yields:
+        int: Идентификатор пользователя.
+    """
+    query = build_segment_query(segment)
+    last_user_id = None
+
+    while True:
+        stmt = query.order_by(User.user_id).limit(SEGMENT_PAGE_SIZE)
+        if last_user_id is not None:
+            stmt = stmt.where(User.user_id > last_user_id)
+
+        async with create_read_only_session() as session:
+            user_ids = (await session.execute(stmt)).scalars().all()
+
+        for user_id in user_ids:
+            yield user_id
+
+        if len(user_ids) < SEGMENT_PAGE_SIZE:
+            return
+        last_user_id = user_ids[-1]
+
+
+async def count_segment(segment: SegmentSpec, use_cache: bool = True) -> Optional[int]:
+    """Возвращает размер аудитории сегмента, кэшируя результат.
+
+    Args:
+        segment (SegmentSpec): Описание сегмента.
+        use_cache (bool): Можно ли вернуть ранее посчитанное значение.
+
+    Returns:
+        Optional[int]: Количество пользователей или None при ошибке.
+    """
+    cache_key = json.dumps(segment, sort_keys=True)
+    cached = _audience_cache.get(cache_key)
+    if use_cache and cached and time.time() - cached[1] < AUDIENCE_CACHE_TTL:
+        return cached[0]
+
+    try:
+        async with create_read_session() as session:
+            stmt = select(func.count()).select_from(
+                build_segment_query(segment).subquery()
+            )
+            count = (await session.execute(stmt)).scalar() or 0
+    except Exception as e:
+        await write_logs("error", f"Error counting segment {cache_key}: {str(e)}")
+        return None
+
+    _audience_cache[cache_key] = (count, time.time())
+    return count
@@ -1,15 +1,27 @@
+import asyncio
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, List, Optional, Sequence, Union
 from datetime import datetime
+import hashlib
+import json
 
 from sqlalchemy import (
+    event,
+    make_url,
+    select,
     BigInteger,
     String,
+    Text,
+    Date,
     DateTime,
     ForeignKey,
     Integer,
+    SmallInteger,
     Boolean,
+    Float,
+    Index,
 )
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, mapped_column, relationship
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
@@ -18,11 +30,80 @@ from src.config.config import settings
 
 Base = declarative_base()
 
-# Устанавливаем URL базы данных на файл в текущем каталоге
-# db_file_path = os.path.join(os.path.dirname(__file__), "database.db")
-engine = create_async_engine(
-    settings.config.DATABASE_URL, echo=True, pool_pre_ping=True
+# Версия схемы: увеличивайте при любом изменении моделей или миграций,
+# иначе при запуске DDL и миграции будут пропущены
+SCHEMA_VERSION = 9
+
+# SQLite: настройки соединения для режима WAL
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 МБ
+    "PRAGMA cache_size=-65536",  # 64 МБ
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",  # Ожидание блокировки другим процессом, мс
 )
+# SQLite: соединений в пуле (в режиме WAL чтения идут параллельно) и сколько
+# секунд сессия ждет свободное соединение
+SQLITE_POOL_SIZE = 5
+SQLITE_POOL_TIMEOUT = 60
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def _is_sqlite_file(url: str) -> bool:
+    database_url = make_url(url)
+    if database_url.get_backend_name() != "sqlite":
+        return False
+    return database_url.database not in (None, "", ":memory:")
+
+
+def create_engine_for_url(url: str):
+    """Создает движок с настройками под диалект БД.
+
+    Для файла SQLite включается WAL: читающие соединения пула работают
+    параллельно с пишущим. Записи внутри процесса упорядочивает
+    create_session (см. _sqlite_write_lock).
+
+    Args:
+        url (str): URL базы данных.
+
+    Returns:
+        AsyncEngine: Асинхронный движок SQLAlchemy.
+    """
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_async_engine(url, echo=True, pool_pre_ping=True)
+
+    if not _is_sqlite_file(url):
+        sqlite_engine = create_async_engine(url, echo=True)
+    else:
+        sqlite_engine = create_async_engine(
+            url,
+            echo=True,
+            pool_size=SQLITE_POOL_SIZE,
+            max_overflow=0,
+            pool_timeout=SQLITE_POOL_TIMEOUT,
+        )
+    event.listen(sqlite_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return sqlite_engine
+
+
+engine = create_engine_for_url(settings.config.DATABASE_URL)
+
+# SQLite допускает одного писателя. Сессии записи внутри процесса ждут эту
+# блокировку, а не "database is locked"; чтения ее не берут
+_sqlite_write_lock: Optional[asyncio.Lock] = (
+    asyncio.Lock() if _is_sqlite_file(settings.config.DATABASE_URL) else None
+)
+# Задача, которая держит блокировку. Хранится задача, а не ContextVar:
+# задачи, созданные внутри сессии записи, копируют контекст и иначе
+# считали бы блокировку своей
+_write_lock_owner: Optional[asyncio.Task] = None
 
 
 class UserActivity(Base):
@@ -51,6 +132,32 @@ class UserActivity(Base):
     monthly_surveys = mapped_column(Integer, default=0)
 
 
+class ActivitySnapshot(Base):
+    """Модель для хранения итоговой статистики активности за прошедший день.
+
+    Снимок делается из строки user_activity после окончания дня и больше
+    не меняется, поэтому история за любой период читается одним запросом
+    по диапазону первичного ключа.
+
+    Атрибуты:
+        day (date): День (UTC).
+        daily_active_users (int): Активных пользователей за день.
+        weekly_active_users (int): Активных пользователей за 7 дней.
+        monthly_active_users (int): Активных пользователей за 30 дней.
+        daily_surveys (int): Пройденных опросов за день.
+        new_users (int): Новых пользователей за день.
+    """
+
+    __tablename__ = "activity_snapshots"
+
+    day = mapped_column(Date, primary_key=True)
+    daily_active_users = mapped_column(Integer, default=0)
+    weekly_active_users = mapped_column(Integer, default=0)
+    monthly_active_users = mapped_column(Integer, default=0)
+    daily_surveys = mapped_column(Integer, default=0)
+    new_users = mapped_column(Integer, default=0)
+
+
 class User(Base):
     """Модель для хранения информации о пользователе и ответах на опросы.
 
@@ -73,18 +180,83 @@ class User(Base):
     first_name = mapped_column(String(255))
     last_name = mapped_column(String(255))
     first_seen = mapped_column(DateTime, default=datetime.utcnow)
-    last_activity = mapped_column(DateTime, default=datetime.utcnow)
-    survey_completed = mapped_column(Boolean, default=False)
+    last_activity = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    survey_completed = mapped_column(Boolean, default=False, index=True)
     active_days = mapped_column(Integer, default=1)
     last_active_date = mapped_column(DateTime, default=datetime.utcnow)
 
 
+class SurveyDefinition(Base):
+    """Модель для хранения определения опроса.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор опроса.
+        slug (str): Короткое имя опроса, используемое в callback_data.
+        title (str): Название опроса.
+        is_active (bool): Доступен ли опрос пользователям.
+    """
+
+    __tablename__ = "survey_definitions"
+
+    id = mapped_column(Integer, primary_key=True)
+    slug = mapped_column(String(50), unique=True)
+    title = mapped_column(String(255), nullable=True)
+    is_active = mapped_column(Boolean, default=True)
+
+
+class SurveyQuestion(Base):
+    """Модель для хранения вопроса опроса.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор вопроса.
+        definition_id (int): Внешний ключ, ссылающийся на опрос.
+        position (int): Позиция вопроса в опросе.
+        key (str): Ключ текста вопроса в локализации.
+        field_name (str): Имя поля для сохранения ответа.
+        next_position (int): Позиция следующего вопроса или None для последнего.
+        checkpoint_key (str): Ключ сообщения промежуточной точки после вопроса.
+    """
+
+    __tablename__ = "survey_questions"
+
+    id = mapped_column(Integer, primary_key=True)
+    definition_id = mapped_column(
+        Integer, ForeignKey("survey_definitions.id"), index=True
+    )
+    position = mapped_column(SmallInteger)
+    key = mapped_column(String(255))
+    field_name = mapped_column(String(255))
+    next_position = mapped_column(SmallInteger, nullable=True)
+    checkpoint_key = mapped_column(String(255), nullable=True)
+
+
+class SurveyOption(Base):
+    """Модель для хранения варианта ответа на вопрос опроса.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор варианта.
+        question_id (int): Внешний ключ, ссылающийся на вопрос.
+        position (int): Позиция варианта в списке.
+        text (str): Текст варианта ответа.
+        weight (int): Вес варианта в оценке лида (NULL — 0).
+    """
+
+    __tablename__ = "survey_options"
+
+    id = mapped_column(Integer, primary_key=True)
+    question_id = mapped_column(Integer, ForeignKey("survey_questions.id"), index=True)
+    position = mapped_column(SmallInteger)
+    text = mapped_column(String(255))
+    weight = mapped_column(SmallInteger, nullable=True)
+
+
 class UserSurvey(Base):
     """Модель для хранения ответов пользователей на опросы.
 
     Атрибуты:
         id (int): Уникальный идентификатор ответа на опрос.
         user_id (int): Внешний ключ, ссылающийся на пользователя.
+        definition_id (int): Внешний ключ, ссылающийся на определение опроса.
         has_business (str): Указывает, есть ли у пользователя бизнес.
         region (str): Регион пользователя.
         is_under_25 (str): Указывает, младше ли пользователь 25 лет.
@@ -98,12 +270,17 @@ class UserSurvey(Base):
         investment_readiness (str): Готовность пользователя инвестировать.
         survey_completed (bool): Указывает, завершен ли опрос.
         created_at (datetime): Временная метка, когда был создан опрос.
+        completed_at (datetime): Временная метка завершения опроса.
+        lead_score (int): Оценка лида, рассчитанная при завершении опроса.
     """
 
     __tablename__ = "user_surveys"
 
     id = mapped_column(Integer, primary_key=True)
     user_id = mapped_column(BigInteger, ForeignKey("users.user_id"))
+    definition_id = mapped_column(
+        Integer, ForeignKey("survey_definitions.id"), nullable=True
+    )
     has_business = mapped_column(String(255), nullable=True)
     region = mapped_column(String(255), nullable=True)
     is_under_25 = mapped_column(String(255), nullable=True)
@@ -117,10 +294,167 @@ class UserSurvey(Base):
     investment_readiness = mapped_column(String(255), nullable=True)
     survey_completed = mapped_column(Boolean, default=False)
     created_at = mapped_column(DateTime, default=datetime.utcnow)
+    completed_at = mapped_column(DateTime, nullable=True)
+    lead_score = mapped_column(SmallInteger, nullable=True)
 
     # Связь с пользователем
     user = relationship("User", backref="surveys")
 
+    __table_args__ = (
+        Index("ix_user_surveys_user_completed", "user_id", "survey_completed"),
+        Index("ix_user_surveys_user_completed_at", "user_id", "completed_at"),
+        # "Лучшие лиды за день": диапазон по completed_at, оценка берется из индекса
+        Index("ix_user_surveys_completed_at_score", "completed_at", "lead_score"),
+        # Поиск брошенных опросов для архивации: диапазон по created_at
+        Index("ix_user_surveys_completed_created", "survey_completed", "created_at"),
+    )
+
+
+class SurveyAnswer(Base):
+    """Модель для нормализованного хранения ответов на вопросы опроса.
+
+    Одна строка — один ответ. Варианты из кнопок хранятся индексом,
+    свободный текст (например, регион) — в free_text.
+
+    Атрибуты:
+        survey_id (int): Внешний ключ, ссылающийся на опрос.
+        question_idx (int): Индекс вопроса в опросе.
+        option_idx (int): Индекс выбранного варианта или None для текстового ответа.
+        free_text (str): Текстовый ответ, если вопрос без вариантов.
+    """
+
+    __tablename__ = "survey_answers"
+
+    survey_id = mapped_column(
+        Integer, ForeignKey("user_surveys.id", ondelete="CASCADE"), primary_key=True
+    )
+    question_idx = mapped_column(SmallInteger, primary_key=True)
+    option_idx = mapped_column(SmallInteger, nullable=True)
+    free_text = mapped_column(String(255), nullable=True)
+
+    __table_args__ = (
+        Index("ix_survey_answers_question_option", "question_idx", "option_idx"),
+    )
+
+
+class ArchivedSurvey(Base):
+    """Модель для хранения брошенных незавершенных опросов.
+
+    Опросы переносятся сюда из user_surveys фоновой задачей, чтобы рабочая
+    таблица оставалась небольшой. Ответы хранятся одним JSON.
+
+    Атрибуты:
+        id (int): Идентификатор опроса в user_surveys.
+        user_id (int): Идентификатор пользователя.
+        definition_id (int): Определение опроса.
+        created_at (datetime): Время начала опроса.
+        archived_at (datetime): Время переноса в архив.
+        answers (str): JSON-список [question_idx, option_idx, free_text].
+    """
+
+    __tablename__ = "archived_surveys"
+
+    id = mapped_column(Integer, primary_key=True, autoincrement=False)
+    user_id = mapped_column(BigInteger, index=True)
+    definition_id = mapped_column(Integer, nullable=True)
+    created_at = mapped_column(DateTime)
+    archived_at = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    answers = mapped_column(Text)
+
+
+class ChannelOutbox(Base):
+    """Модель для хранения очереди постов в канал до их отправки.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор записи.
+        chat_id (int): Идентификатор канала.
+        text (str): Текст поста.
+        created_at (datetime): Время постановки в очередь.
+        failed_at (datetime): Когда Telegram окончательно отклонил пост
+            (TelegramBadRequest, TelegramForbiddenError); такие посты больше
+            не отправляются и остаются в таблице для ручного разбора.
+        error (str): Текст ошибки отклонения.
+    """
+
+    __tablename__ = "channel_outbox"
+
+    id = mapped_column(Integer, primary_key=True)
+    chat_id = mapped_column(BigInteger)
+    text = mapped_column(Text)
+    created_at = mapped_column(DateTime, default=datetime.utcnow)
+    failed_at = mapped_column(DateTime, nullable=True)
+    error = mapped_column(String(255), nullable=True)
+
+
+class ScheduledMailing(Base):
+    """Модель для хранения отложенных и повторяющихся рассылок.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор задания.
+        mailing (str): JSON с исходным сообщением (чат, id сообщений, кнопка).
+        segment (str): JSON с описанием сегмента получателей.
+        next_run_at (datetime): Время следующего запуска (UTC).
+        cron (str): Выражение cron для повторяющейся рассылки или None.
+        spread_minutes (int): Окно в минутах, на которое растягивается отправка.
+        status (str): active, done или cancelled.
+        created_by (int): Администратор, создавший задание.
+        created_at (datetime): Время создания задания.
+        last_run_at (datetime): Время последнего запуска.
+    """
+
+    __tablename__ = "scheduled_mailings"
+
+    id = mapped_column(Integer, primary_key=True)
+    mailing = mapped_column(Text)
+    segment = mapped_column(Text)
+    next_run_at = mapped_column(DateTime)
+    cron = mapped_column(String(100), nullable=True)
+    spread_minutes = mapped_column(Integer, default=0)
+    status = mapped_column(String(20), default="active")
+    created_by = mapped_column(BigInteger)
+    created_at = mapped_column(DateTime, default=datetime.utcnow)
+    last_run_at = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_scheduled_mailings_status_next_run", "status", "next_run_at"),
+    )
+
+
+class MailingReport(Base):
+    """Модель для хранения метрик доставки рассылки.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор отчета.
+        scheduled_id (int): Запланированная рассылка, если отправка была по расписанию.
+        created_by (int): Администратор, запустивший рассылку.
+        started_at (datetime): Начало отправки.
+        finished_at (datetime): Окончание отправки.
+        successful (int): Доставлено сообщений.
+        failed (int): Ошибок отправки.
+        blocked (int): Пользователей, заблокировавших бота.
+        retries (int): Повторных попыток.
+        flood_wait_seconds (float): Суммарное ожидание flood limit.
+        metrics (str): JSON со счетчиками по секундам, гистограммой задержек и ошибками.
+    """
+
+    __tablename__ = "mailing_reports"
+
+    id = mapped_column(Integer, primary_key=True)
+    scheduled_id = mapped_column(Integer, nullable=True)
+    created_by = mapped_column(BigInteger, nullable=True)
+    started_at = mapped_column(DateTime, index=True)
+    finished_at = mapped_column(DateTime)
+    successful = mapped_column(Integer, default=0)
+    failed = mapped_column(Integer, default=0)
+    blocked = mapped_column(Integer, default=0)
+    retries = mapped_column(Integer, default=0)
+    flood_wait_seconds = mapped_column(Float, default=0)
+    metrics = mapped_column(Text)
+
+    @property
+    def metrics_data(self) -> Dict:
+        return json.loads(self.metrics)
+
 
 class Localization(Base):
     """Модель для хранения локализованных сообщений.
@@ -142,6 +476,22 @@ class Localization(Base):
     message = mapped_column(String(1000))
 
 
+class SchemaMeta(Base):
+    """Модель для хранения версии схемы и хэшей начальных данных.
+
+    Атрибуты:
+        key (str): Имя параметра (schema_version, localization_seed, ...).
+        value (str): Значение параметра.
+        updated_at (datetime): Время последнего изменения.
+    """
+
+    __tablename__ = "schema_meta"
+
+    key = mapped_column(String(50), primary_key=True)
+    value = mapped_column(String(255))
+    updated_at = mapped_column(DateTime, default=datetime.utcnow)
+
+
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -166,12 +516,102 @@ async def init_db():
         raise
 
 
+async def get_schema_meta() -> Dict[str, str]:
+    """Читает версию схемы и хэши начальных данных одним запросом.
+
+    Returns:
+        Dict[str, str]: Параметры схемы; пустой словарь, если таблицы еще нет.
+    """
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(SchemaMeta.key, SchemaMeta.value))
+            return {key: value for key, value in result.all()}
+    except Exception:
+        return {}
+
+
+async def set_schema_meta(values: Dict[str, str]) -> None:
+    """Сохраняет параметры схемы.
+
+    Args:
+        values (Dict[str, str]): Параметры для сохранения.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"key": key, "value": value, "updated_at": now} for key, value in values.items()
+    ]
+    async with create_session() as session:
+        await session.execute(
+            upsert(SchemaMeta, rows, ["key"], ["value", "updated_at"])
+        )
+
+
+def upsert(
+    model,
+    rows: Union[Dict, List[Dict]],
+    keys: Sequence[str],
+    update: Sequence[str] = (),
+):
+    """Строит вставку с обновлением при конфликте для текущей БД.
+
+    В отличие от session.merge (SELECT, затем INSERT или UPDATE) это один
+    атомарный запрос без гонки между проверкой и вставкой:
+    MySQL — INSERT ... ON DUPLICATE KEY UPDATE,
+    SQLite и PostgreSQL — INSERT ... ON CONFLICT.
+
+    Args:
+        model: Модель SQLAlchemy.
+        rows (Union[Dict, List[Dict]]): Значения одной строки или список строк.
+        keys (Sequence[str]): Колонки уникального ключа, по которому ищется конфликт.
+        update (Sequence[str]): Колонки, которые обновляются у существующей
+            строки; если пусто, существующая строка не меняется.
+
+    Returns:
+        Insert: Запрос для session.execute.
+    """
+    dialect = engine.dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(model).values(rows)
+        # Присваивание ключа самому себе — "ничего не делать" без INSERT IGNORE,
+        # который скрывал бы и другие ошибки
+        columns = update or keys[:1]
+        return stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in columns}
+        )
+
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(model).values(rows)
+        if not update:
+            return stmt.on_conflict_do_nothing(index_elements=list(keys))
+        return stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: stmt.excluded[column] for column in update},
+        )
+
+    raise NotImplementedError(f"Upsert is not supported for {dialect}")
+
+
+def seed_hash(payload) -> str:
+    """Считает хэш начальных данных для сравнения с сохраненным.
+
+    Args:
+        payload: JSON-сериализуемые начальные данные.
+
+    Returns:
+        str: SHA-256 в шестнадцатеричном виде.
+    """
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
 @asynccontextmanager
 async def create_session() -> AsyncGenerator[AsyncSession, None]:
     """Создает новую сессию базы данных.
 
     Эта функция предоставляет асинхронный контекстный менеджер для сессий базы данных.
     Она фиксирует сессию, если все прошло успешно, откатывает в случае ошибки и закрывает сессию.
+    Для файла SQLite сессии выполняются по одной (см. _sqlite_write_lock).
 
     Yields:
         AsyncSession: Сессия базы данных.
@@ -179,6 +619,50 @@ async def create_session() -> AsyncGenerator[AsyncSession, None]:
     Raises:
         Exception: Если произошла ошибка во время управления сессией.
     """
+    global _write_lock_owner
+    if _sqlite_write_lock is None:
+        async with _committing_session() as session:
+            yield session
+        return
+
+    if _write_lock_owner is not None and _write_lock_owner is asyncio.current_task():
+        # Вложенная сессия не может ждать блокировку, которую держит внешняя
+        await write_logs("warning", "Nested database session inside a write session")
+        async with _committing_session() as session:
+            yield session
+        return
+
+    async with _sqlite_write_lock:
+        _write_lock_owner = asyncio.current_task()
+        try:
+            async with _committing_session() as session:
+                yield session
+        finally:
+            _write_lock_owner = None
+
+
+@asynccontextmanager
+async def create_read_only_session() -> AsyncGenerator[AsyncSession, None]:
+    """Создает сессию основной БД только для чтения.
+
+    Изменения в ней не фиксируются, а для SQLite она не ждет очереди записи,
+    поэтому долгие отчеты не задерживают сохранение ответов.
+
+    Yields:
+        AsyncSession: Сессия базы данных.
+    """
+    async with async_session() as session:
+        try:
+            yield session
+        except Exception as e:
+            await write_logs("error", f"Ошибка сессии базы данных: {str(e)}")
+            raise
+        finally:
+            await session.close()
+
+
+@asynccontextmanager
+async def _committing_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         try:
             yield session
@@ -0,0 +1,118 @@
+from datetime import date, datetime, time, timedelta
+from typing import List
+
+from sqlalchemy import select, func
+
+from src.utils.logging import write_logs
+from .settings_data import (
+    create_session,
+    upsert,
+    ActivitySnapshot,
+    User,
+    UserActivity,
+)
+from .replica import create_read_session
+
+
+def _as_date(value) -> date:
+    """Приводит результат func.date() к date (SQLite возвращает строку)."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+async def take_activity_snapshots(until: date) -> int:
+    """Сохраняет снимки активности за завершенные дни, которых еще нет.
+
+    Берутся дни после последнего снимка и строго до until; для каждого
+    дня копируется последняя строка user_activity и добавляется число
+    новых пользователей.
+
+    Args:
+        until (date): Первый день, который еще не завершен (обычно сегодня UTC).
+
+    Returns:
+        int: Количество сохраненных снимков.
+    """
+    async with create_session() as session:
+        last_day = (
+            await session.execute(select(func.max(ActivitySnapshot.day)))
+        ).scalar()
+
+        end = datetime.combine(until, time.min)
+        stmt = (
+            select(UserActivity)
+            .where(UserActivity.date < end)
+            .order_by(UserActivity.id)
+        )
+        if last_day is not None:
+            stmt = stmt.where(
+                UserActivity.date >= datetime.combine(last_day, time.min) + timedelta(days=1)
+            )
+
+        rows_by_day = {}
+        for row in (await session.execute(stmt)).scalars():
+            rows_by_day[row.date.date()] = row  # Последняя строка за день — итоговая
+
+        if not rows_by_day:
+            return 0
+
+        first_seen_day = func.date(User.first_seen)
+        new_users_stmt = (
+            select(first_seen_day, func.count())
+            .where(
+                User.first_seen >= datetime.combine(min(rows_by_day), time.min),
+                User.first_seen < end,
+            )
+            .group_by(first_seen_day)
+        )
+        new_users = {
+            _as_date(day): count
+            for day, count in (await session.execute(new_users_stmt)).all()
+        }
+
+        snapshot_columns = [
+            "daily_active_users",
+            "weekly_active_users",
+            "monthly_active_users",
+            "daily_surveys",
+            "new_users",
+        ]
+        await session.execute(
+            upsert(
+                ActivitySnapshot,
+                [
+                    {
+                        "day": day,
+                        "daily_active_users": row.daily_active_users,
+                        "weekly_active_users": row.weekly_active_users,
+                        "monthly_active_users": row.monthly_active_users,
+                        "daily_surveys": row.daily_surveys,
+                        "new_users": new_users.get(day, 0),
+                    }
+                    for day, row in rows_by_day.items()
+                ],
+                ["day"],
+                snapshot_columns,
+            )
+        )
+
+    await write_logs("info", f"Saved {len(rows_by_day)} activity snapshots")
+    return len(rows_by_day)
+
+
+async def get_activity_history(days: int = 90) -> List[ActivitySnapshot]:
+    """Возвращает снимки активности за последние дни одним запросом.
+
+    Args:
+        days (int): Глубина истории в днях.
+
+    Returns:
+        List[ActivitySnapshot]: Снимки в порядке возрастания дня.
+    """
+    since = datetime.utcnow().date() - timedelta(days=days)
+    async with create_read_session() as session:
+        result = await session.execute(
+            select(ActivitySnapshot)
+            .where(ActivitySnapshot.day >= since)
+            .order_by(ActivitySnapshot.day)
+        )
+        return list(result.scalars().all())
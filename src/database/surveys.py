@@ -0,0 +1,243 @@
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import select
+
+from src.utils.logging import write_logs
+from .settings_data import (
+    create_session,
+    create_read_only_session,
+    SurveyDefinition,
+    SurveyQuestion,
+    SurveyOption,
+)
+
+# Вариант ответа: (текст, вес в оценке лида)
+OptionRow = Tuple[str, int]
+SurveyRows = Tuple[SurveyDefinition, List[SurveyQuestion], Dict[int, List[OptionRow]]]
+
+
+async def load_survey_definitions() -> List[SurveyRows]:
+    """Загружает все активные опросы вместе с вопросами и вариантами ответа.
+
+    Выполняет по одному запросу на каждую таблицу, без запросов в цикле.
+
+    Returns:
+        List[SurveyRows]: Для каждого опроса — определение, вопросы
+            в порядке позиций и варианты ответа по id вопроса.
+    """
+    async with create_read_only_session() as session:
+        definitions = (
+            (
+                await session.execute(
+                    select(SurveyDefinition).where(SurveyDefinition.is_active == True)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        if not definitions:
+            return []
+
+        definition_ids = [definition.id for definition in definitions]
+        questions = (
+            (
+                await session.execute(
+                    select(SurveyQuestion)
+                    .where(SurveyQuestion.definition_id.in_(definition_ids))
+                    .order_by(SurveyQuestion.definition_id, SurveyQuestion.position)
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+        question_ids = [question.id for question in questions]
+        options = (
+            (
+                await session.execute(
+                    select(SurveyOption)
+                    .where(SurveyOption.question_id.in_(question_ids))
+                    .order_by(SurveyOption.question_id, SurveyOption.position)
+                )
+            )
+            .scalars()
+            .all()
+            if question_ids
+            else []
+        )
+
+    options_by_question: Dict[int, List[OptionRow]] = {}
+    for option in options:
+        options_by_question.setdefault(option.question_id, []).append(
+            (option.text, option.weight or 0)
+        )
+
+    questions_by_definition: Dict[int, List[SurveyQuestion]] = {}
+    for question in questions:
+        questions_by_definition.setdefault(question.definition_id, []).append(question)
+
+    return [
+        (
+            definition,
+            questions_by_definition.get(definition.id, []),
+            options_by_question,
+        )
+        for definition in definitions
+    ]
+
+
+async def seed_survey(slug: str, title: str, questions: Sequence) -> bool:
+    """Создает опрос в базе данных, если опроса с таким slug еще нет.
+
+    Существующее определение не перезаписывается, чтобы не затирать
+    изменения, внесенные в базе данных; в нем только заполняются веса
+    вариантов, которые еще не заданы. Если оно отличается от questions,
+    в лог пишется предупреждение со списком расхождений.
+
+    Args:
+        slug (str): Короткое имя опроса.
+        title (str): Название опроса.
+        questions (Sequence[dict]): Вопросы в порядке следования (словари
+            с ключами key, field_name, options, weights, next_position,
+            checkpoint_key).
+
+    Returns:
+        bool: True, если определение в БД совпадает с questions
+            (создано сейчас или уже было таким же).
+    """
+    async with create_session() as session:
+        existing = (
+            await session.execute(
+                select(SurveyDefinition.id).where(SurveyDefinition.slug == slug)
+            )
+        ).scalar_one_or_none()
+        if existing is not None:
+            await _fill_missing_weights(session, existing, questions)
+            differences = await _diff_definition(session, existing, questions)
+            if differences:
+                await write_logs(
+                    "warning",
+                    f"Survey definition '{slug}' in the database differs from the "
+                    f"code and was not updated: {'; '.join(differences)}",
+                )
+            return not differences
+
+        definition = SurveyDefinition(slug=slug, title=title, is_active=True)
+        session.add(definition)
+        await session.flush()
+
+        question_rows = []
+        for position, question in enumerate(questions):
+            row = SurveyQuestion(
+                definition_id=definition.id,
+                position=position,
+                key=question["key"],
+                field_name=question["field_name"],
+                next_position=question["next_position"],
+                checkpoint_key=question["checkpoint_key"],
+            )
+            session.add(row)
+            question_rows.append(row)
+        await session.flush()
+
+        for row, question in zip(question_rows, questions):
+            weights = question.get("weights") or []
+            for position, text in enumerate(question["options"] or []):
+                session.add(
+                    SurveyOption(
+                        question_id=row.id,
+                        position=position,
+                        text=text,
+                        weight=weights[position] if position < len(weights) else 0,
+                    )
+                )
+
+        await session.commit()
+        await write_logs("info", f"Survey definition '{slug}' seeded")
+    return True
+
+
+async def _fill_missing_weights(
+    session, definition_id: int, questions: Sequence
+) -> None:
+    """Проставляет веса по умолчанию вариантам, у которых вес еще не задан."""
+    rows = (
+        await session.execute(
+            select(SurveyOption, SurveyQuestion.position)
+            .join(SurveyQuestion, SurveyQuestion.id == SurveyOption.question_id)
+            .where(
+                SurveyQuestion.definition_id == definition_id,
+                SurveyOption.weight.is_(None),
+            )
+        )
+    ).all()
+
+    for option, question_position in rows:
+        if question_position >= len(questions):
+            continue
+        weights = questions[question_position].get("weights") or []
+        option.weight = (
+            weights[option.position] if option.position < len(weights) else 0
+        )
+
+    if rows:
+        await write_logs("info", f"Filled default weights for {len(rows)} options")
+
+
+async def _diff_definition(
+    session, definition_id: int, questions: Sequence
+) -> List[str]:
+    """Сравнивает сохраненное определение с вопросами из кода.
+
+    Returns:
+        List[str]: Описания расхождений; пустой список, если они совпадают.
+    """
+    stored = (
+        (
+            await session.execute(
+                select(SurveyQuestion)
+                .where(SurveyQuestion.definition_id == definition_id)
+                .order_by(SurveyQuestion.position)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    options = (
+        (
+            await session.execute(
+                select(SurveyOption)
+                .where(SurveyOption.question_id.in_([q.id for q in stored]))
+                .order_by(SurveyOption.question_id, SurveyOption.position)
+            )
+        )
+        .scalars()
+        .all()
+        if stored
+        else []
+    )
+    options_by_question: Dict[int, List[OptionRow]] = {}
+    for option in options:
+        options_by_question.setdefault(option.question_id, []).append(
+            (option.text, option.weight or 0)
+        )
+
+    differences = []
+    if len(stored) != len(questions):
+        differences.append(f"{len(stored)} questions instead of {len(questions)}")
+    for row, question in zip(stored, questions):
+        weights = question.get("weights") or []
+        expected_options = [
+            (text, weights[idx] if idx < len(weights) else 0)
+            for idx, text in enumerate(question["options"] or [])
+        ]
+        if (
+            row.key != question["key"]
+            or row.field_name != question["field_name"]
+            or row.next_position != question["next_position"]
+            or row.checkpoint_key != question["checkpoint_key"]
+        ):
+            differences.append(f"question {row.position} ({row.key})")
+        elif options_by_question.get(row.id, []) != expected_options:
+            differences.append(f"options of question {row.position} ({row.key})")
+    return differences
@@ -1,11 +1,48 @@
 import json
 import os
-from datetime import datetime, timedelta
-from sqlalchemy import select, and_, func
-from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, and_, or_, func
+from typing import List, Optional, Sequence, Tuple
 from src.utils.formater import format_user_survey_results
+from src.utils.lead_scoring import compute_lead_score
 from src.utils.logging import write_logs
-from .settings_data import User, create_session, UserSurvey, UserActivity
+from .settings_data import (
+    User,
+    create_session,
+    create_read_only_session,
+    upsert,
+    UserSurvey,
+    UserActivity,
+    SurveyAnswer,
+)
+from .replica import create_read_session
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Возвращает полуинтервал [начало дня, начало следующего дня).
+
+    Фильтр по диапазону вместо func.date(column) == day использует индекс
+    по колонке и отсечение секций в секционированных таблицах.
+    """
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def activity_for_day(day: date):
+    """Запрос строки user_activity за день."""
+    start, end = day_bounds(day)
+    return select(UserActivity).where(
+        UserActivity.date >= start, UserActivity.date < end
+    )
+
+
+def completed_surveys_between(since: datetime, until: datetime):
+    """Запрос количества завершенных опросов, начатых в [since, until]."""
+    return select(func.count(UserSurvey.id)).where(
+        UserSurvey.created_at >= since,
+        UserSurvey.created_at <= until,
+        UserSurvey.survey_completed == True,
+    )
 
 
 # Обновляем create_session с новым URL
@@ -15,7 +52,7 @@ async def get_all_users() -> List[User]:
     Returns:
         List[User]: Список всех пользователей
     """
-    async with create_session() as session:
+    async with create_read_only_session() as session:
         try:
             result = await session.execute(select(User))
             return result.scalars().all()
@@ -33,7 +70,7 @@ async def get_user_by_id(json_data: str) -> Optional[User]:
     Returns:
         Optional[User]: Объект User, если пользователь найден, иначе None.
     """
-    async with create_session() as session:
+    async with create_read_only_session() as session:
         try:
             params = json.loads(json_data)
             user_id = params.get("user_id")
@@ -54,7 +91,7 @@ async def check_existing_user(user_id: int) -> Optional[User]:
     Returns:
         Optional[User]: Объект User, если пользователь существует, иначе None.
     """
-    async with create_session() as session:
+    async with create_read_only_session() as session:
         try:
             stmt = select(User).where(User.user_id == user_id)
             result = await session.execute(stmt)
@@ -73,7 +110,10 @@ async def add_user_if_not_exists(user_data: dict):
     async with create_session() as session:
         try:
             user_id = user_data["user_id"]
-            existing_user = await check_existing_user(user_id)
+            # Проверка в той же сессии: вложенная сессия ждала бы единственное
+            # соединение SQLite, занятое этой
+            existing_stmt = select(User.user_id).where(User.user_id == user_id)
+            existing_user = (await session.execute(existing_stmt)).scalar_one_or_none()
             if existing_user is None:
                 new_user = User(
                     user_id=user_id,
@@ -94,33 +134,93 @@ async def add_user_if_not_exists(user_data: dict):
             await write_logs("error", f"Error adding user: {str(e)}")
 
 
-async def save_survey_answer(user_id: int, field_name: str, answer: str):
+def open_survey_query(
+    user_id: int, definition_id: Optional[int], include_legacy: bool = False
+):
+    """Строит запрос последнего незавершенного опроса пользователя.
+
+    Args:
+        user_id (int): Идентификатор пользователя.
+        definition_id (Optional[int]): Идентификатор определения опроса.
+        include_legacy (bool): Учитывать ли опросы без definition_id, начатые
+            до появления определений; они относятся к опросу по умолчанию.
+    """
+    stmt = (
+        select(UserSurvey)
+        .where(UserSurvey.user_id == user_id, UserSurvey.survey_completed == False)
+        .order_by(UserSurvey.created_at.desc())
+        .limit(1)
+    )
+    if definition_id is None:
+        return stmt
+    if include_legacy:
+        return stmt.where(
+            or_(
+                UserSurvey.definition_id == definition_id,
+                UserSurvey.definition_id.is_(None),
+            )
+        )
+    return stmt.where(UserSurvey.definition_id == definition_id)
+
+
+async def save_survey_answer(
+    user_id: int,
+    field_name: str,
+    answer: str,
+    question_idx: Optional[int] = None,
+    option_idx: Optional[int] = None,
+    definition_id: Optional[int] = None,
+    include_legacy: bool = False,
+):
     """Сохраняет ответ пользователя на вопрос опроса.
 
+    Если передан question_idx, ответ также записывается в нормализованную
+    таблицу survey_answers (индекс варианта либо свободный текст).
+
     Args:
         user_id (int): Идентификатор пользователя.
         field_name (str): Имя поля, в которое будет сохранен ответ.
         answer (str): Ответ пользователя.
+        question_idx (Optional[int]): Индекс вопроса в опросе.
+        option_idx (Optional[int]): Индекс выбранного варианта ответа.
+        definition_id (Optional[int]): Идентификатор определения опроса.
+        include_legacy (bool): Продолжать ли опрос без definition_id, начатый
+            до появления определений (только для опроса по умолчанию).
     """
     async with create_session() as session:
         try:
             # Get or create survey for user
-            stmt = (
-                select(UserSurvey)
-                .where(
-                    UserSurvey.user_id == user_id, UserSurvey.survey_completed == False
-                )
-                .order_by(UserSurvey.created_at.desc())
+            result = await session.execute(
+                open_survey_query(user_id, definition_id, include_legacy)
             )
-            result = await session.execute(stmt)
             survey = result.scalar_one_or_none()
 
             if not survey:
-                survey = UserSurvey(user_id=user_id)
+                survey = UserSurvey(user_id=user_id, definition_id=definition_id)
                 session.add(survey)
+            elif survey.definition_id is None:
+                survey.definition_id = definition_id
+
+            # Update the specific field (только для опросов с колонкой в user_surveys)
+            if field_name in UserSurvey.__table__.columns:
+                setattr(survey, field_name, answer)
+
+            if question_idx is not None:
+                await session.flush()  # Нужен survey.id для новой записи
+                await session.execute(
+                    upsert(
+                        SurveyAnswer,
+                        {
+                            "survey_id": survey.id,
+                            "question_idx": question_idx,
+                            "option_idx": option_idx,
+                            "free_text": answer if option_idx is None else None,
+                        },
+                        ["survey_id", "question_idx"],
+                        ["option_idx", "free_text"],
+                    )
+                )
 
-            # Update the specific field
-            setattr(survey, field_name, answer)
             await session.commit()
 
         except Exception as e:
@@ -139,10 +239,9 @@ async def update_user_activity(user_id: int):
             today = now.date()
 
             # Получаем или создаем запись активности за сегодня
-            activity_stmt = select(UserActivity).where(
-                func.date(UserActivity.date) == today
-            )
-            activity = (await session.execute(activity_stmt)).scalar_one_or_none()
+            activity = (
+                await session.execute(activity_for_day(today))
+            ).scalar_one_or_none()
 
             if not activity:
                 activity = UserActivity(
@@ -161,7 +260,7 @@ async def update_user_activity(user_id: int):
                     select(User).where(
                         and_(
                             User.user_id == user_id,
-                            func.date(User.last_activity) == today,
+                            User.last_activity >= day_bounds(today)[0],
                         )
                     )
                 )
@@ -187,30 +286,13 @@ async def update_user_activity(user_id: int):
 
             # Получаем количество завершенных опросов
             daily_surveys = await session.execute(
-                select(func.count(UserSurvey.id)).where(
-                    and_(
-                        func.date(UserSurvey.created_at) == today,
-                        UserSurvey.survey_completed == True,
-                    )
-                )
+                completed_surveys_between(day_bounds(today)[0], now)
             )
             weekly_surveys = await session.execute(
-                select(func.count(UserSurvey.id)).where(
-                    and_(
-                        UserSurvey.created_at >= week_ago,
-                        UserSurvey.created_at <= now,
-                        UserSurvey.survey_completed == True,
-                    )
-                )
+                completed_surveys_between(week_ago, now)
             )
             monthly_surveys = await session.execute(
-                select(func.count(UserSurvey.id)).where(
-                    and_(
-                        UserSurvey.created_at >= month_ago,
-                        UserSurvey.created_at <= now,
-                        UserSurvey.survey_completed == True,
-                    )
-                )
+                completed_surveys_between(month_ago, now)
             )
 
             # Обновляем статистику
@@ -255,22 +337,32 @@ async def get_or_create_user(user_id: int, username: str) -> User:
                 session.add(user)
                 await session.commit()
                 await write_logs("info", f"Created new user with ID {user_id}")
-
-            # Обновляем активность пользователя
-            await update_user_activity(user_id)
-
-            return user
         except Exception as e:
             await write_logs("error", f"Error in get_or_create_user: {str(e)}")
             raise
 
+    # Активность обновляется в своей сессии после закрытия текущей
+    await update_user_activity(user_id)
+    return user
+
 
-async def finalize_survey(user_id: int, username: str) -> Optional[str]:
+async def finalize_survey(
+    user_id: int,
+    username: str,
+    questions: Sequence,
+    definition_id: Optional[int] = None,
+    include_legacy: bool = False,
+) -> Optional[str]:
     """Завершает опрос пользователя и отправляет результаты в канал.
 
     Args:
         user_id (int): Идентификатор пользователя.
         username (str): Имя пользователя.
+        questions (Sequence): Вопросы опроса в порядке их индексов
+            (объекты с атрибутами key и options).
+        definition_id (Optional[int]): Идентификатор определения опроса.
+        include_legacy (bool): Завершать ли опрос без definition_id, начатый
+            до появления определений (только для опроса по умолчанию).
 
     Returns:
         Optional[str]: Форматированные результаты опроса, если опрос завершен, иначе None.
@@ -281,73 +373,97 @@ async def finalize_survey(user_id: int, username: str) -> Optional[str]:
             today = now.date()
 
             # Получаем данные опроса пользователя
-            stmt = (
-                select(UserSurvey)
-                .where(
-                    UserSurvey.user_id == user_id, UserSurvey.survey_completed == False
-                )
-                .order_by(UserSurvey.created_at.desc())
+            result = await session.execute(
+                open_survey_query(user_id, definition_id, include_legacy)
             )
-            result = await session.execute(stmt)
             survey = result.scalar_one_or_none()
+            if survey is None:
+                return None
 
-            if survey:
-                # Отмечаем опрос как завершенный
-                survey.survey_completed = True
-                survey.completed_at = now
-
-                # Получаем и обновляем пользователя
-                user_stmt = select(User).where(User.user_id == user_id)
-                user = (await session.execute(user_stmt)).scalar_one_or_none()
-                if user:
-                    user.survey_completed = True
-                    user.last_activity = now
-
-                    # Обновляем счетчик дней активности
-                    if (
-                        not user.last_active_date
-                        or user.last_active_date.date() != today
-                    ):
-                        user.active_days += 1
-                        user.last_active_date = now
-
-                # Получаем или создаем запись активности за сегодня
-                activity_stmt = select(UserActivity).where(
-                    func.date(UserActivity.date) == today
-                )
-                activity = (await session.execute(activity_stmt)).scalar_one_or_none()
+            # Ответы нужны и для оценки лида, и для поста в канал
+            answers_stmt = select(SurveyAnswer).where(
+                SurveyAnswer.survey_id == survey.id
+            )
+            rows = {
+                row.question_idx: row
+                for row in (await session.execute(answers_stmt)).scalars()
+            }
+            lead_score = compute_lead_score(
+                questions,
+                {idx: row.option_idx for idx, row in rows.items()},
+            )
 
-                if activity:
-                    # Увеличиваем счетчик опросов за день
-                    activity.daily_surveys += 1
-                else:
-                    # Создаем новую запись активности
-                    activity = UserActivity(
-                        date=now,
-                        daily_active_users=1,
-                        daily_surveys=1,
-                        weekly_active_users=1,
-                        weekly_surveys=1,
-                        monthly_active_users=1,
-                        monthly_surveys=1,
-                    )
-                    session.add(activity)
+            # Отмечаем опрос как завершенный
+            survey.survey_completed = True
+            survey.completed_at = now
+            survey.lead_score = lead_score
+
+            # Получаем и обновляем пользователя
+            user_stmt = select(User).where(User.user_id == user_id)
+            user = (await session.execute(user_stmt)).scalar_one_or_none()
+            if user:
+                user.survey_completed = True
+                user.last_activity = now
+
+                # Обновляем счетчик дней активности
+                if (
+                    not user.last_active_date
+                    or user.last_active_date.date() != today
+                ):
+                    user.active_days += 1
+                    user.last_active_date = now
 
-                await session.commit()
+            # Получаем или создаем запись активности за сегодня
+            activity = (
+                await session.execute(activity_for_day(today))
+            ).scalar_one_or_none()
 
-                # Форматируем результаты опроса
-                user_results = await format_user_survey_results(
-                    user_id, username or "Без username", survey
+            if activity:
+                # Увеличиваем счетчик опросов за день
+                activity.daily_surveys += 1
+            else:
+                # Создаем новую запись активности
+                activity = UserActivity(
+                    date=now,
+                    daily_active_users=1,
+                    daily_surveys=1,
+                    weekly_active_users=1,
+                    weekly_surveys=1,
+                    monthly_active_users=1,
+                    monthly_surveys=1,
                 )
-                return user_results
+                session.add(activity)
 
-            return None
+            await session.commit()
+
+            # Ответы в порядке вопросов для поста в канал
+            answers = []
+            for question_idx, question in enumerate(questions):
+                row = rows.get(question_idx)
+                if row is None:
+                    answers.append(None)
+                elif row.option_idx is not None and row.option_idx < len(
+                    question.options
+                ):
+                    answers.append(question.options[row.option_idx])
+                else:
+                    answers.append(row.free_text)
 
         except Exception as e:
             await write_logs("error", f"Error finalizing survey: {str(e)}")
             await session.rollback()
             return None
 
+    # Локализация может открыть свою сессию, поэтому пост форматируется
+    # после закрытия текущей
+    return await format_user_survey_results(
+        user_id,
+        username or "Без username",
+        tuple(question.key for question in questions),
+        answers,
+        lead_score=lead_score,
+    )
+
 
 async def get_user_survey(user_id: int) -> Optional[UserSurvey]:
     """Получает последний завершенный опрос пользователя.
@@ -358,7 +474,7 @@ async def get_user_survey(user_id: int) -> Optional[UserSurvey]:
     Returns:
         Optional[UserSurvey]: Объект опроса или None, если опрос не найден.
     """
-    async with create_session() as session:
+    async with create_read_only_session() as session:
         try:
             # Получаем самый последний завершенный опрос
             stmt = (
@@ -377,3 +493,39 @@ async def get_user_survey(user_id: int) -> Optional[UserSurvey]:
         except Exception as e:
             await write_logs("error", f"Error getting user survey: {str(e)}")
             return None
+
+
+async def get_top_leads(since: datetime, limit: int = 10) -> List[tuple]:
+    """Получает опросы с наибольшей оценкой лида, завершенные после since.
+
+    Запрос читает диапазон индекса (completed_at, lead_score) и сортирует
+    только опросы за этот период.
+
+    Args:
+        since (datetime): Начало периода (UTC).
+        limit (int): Сколько лидов вернуть.
+
+    Returns:
+        List[tuple]: Строки (user_id, username, lead_score, completed_at).
+    """
+    async with create_read_session() as session:
+        try:
+            stmt = (
+                select(
+                    UserSurvey.user_id,
+                    User.username,
+                    UserSurvey.lead_score,
+                    UserSurvey.completed_at,
+                )
+                .join(User, User.user_id == UserSurvey.user_id)
+                .where(
+                    UserSurvey.completed_at >= since,
+                    UserSurvey.lead_score.is_not(None),
+                )
+                .order_by(UserSurvey.lead_score.desc(), UserSurvey.completed_at)
+                .limit(limit)
+            )
+            return list((await session.execute(stmt)).all())
+        except Exception as e:
+            await write_logs("error", f"Error getting top leads: {str(e)}")
+            return []
@@ -5,29 +5,151 @@ from src.utils.logging import write_logs
 from src.keyboards.inlinebutton import (
     new_message,
     get_admin_keyboard,
+    MailingSegmentCallback,
+    ScheduledMailingCallback,
+    MailingReportCallback,
+    get_report_keyboard,
 )
 from src.utils.localization import get_message
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 import os
+import sys
+import asyncio
+import importlib
+from types import ModuleType
 from aiogram.types import (
+    BufferedInputFile,
     FSInputFile,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
-    MessageEntity,
 )
-from src.utils.user_statistics import (
-    get_user_statistics,
-    generate_user_statistics_excel,
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from aiogram.exceptions import TelegramBadRequest
+from src.database.settings_data import seed_hash
+from src.database.segments import SegmentSpec, count_segment
+from src.handlers.survey_questions.questions import get_survey
+from datetime import datetime, time
+from src.utils.cron import CronSchedule
+from src.database.mailing_reports import (
+    get_mailing_report,
+    get_recent_mailing_reports,
 )
-from src.utils.statistics import (
-    get_time_based_statistics,
-    generate_time_statistics_excel,
-)
-from src.database.using_data import get_all_users
+from src.utils.activity_history import HISTORY_DAYS, get_activity_chart
+from src.utils.charts import render_in_process, render_mailing_chart
+from src.utils.mailing import run_mailing
+from src.utils.mailing_metrics import format_report_summary, metrics_to_csv
+from src.utils.lead_scoring import lead_label
+from src.database.using_data import get_top_leads
+from src.utils.scheduler import scheduler, local_to_utc, utc_to_local, next_cron_run
+from src.utils.tasks import run_in_background
+from src.utils.stats_cache import StaleWhileRevalidate
 
 router = Router(name=__name__)
 
+# Модули отчетов тянут pandas, numpy и openpyxl и нужны только администратору
+REPORT_MODULES = (
+    "src.utils.statistics",
+    "src.utils.user_statistics",
+    "src.utils.cohorts",
+)
+
+
+async def import_report_module(module_name: str) -> ModuleType:
+    """
+    Импортирует модуль отчетов при первом обращении.
+
+    Первый импорт выполняется в отдельном потоке, чтобы загрузка pandas
+    не блокировала обработку обновлений других пользователей.
+
+    Args:
+        module_name (str): Полное имя модуля.
+
+    Returns:
+        ModuleType: Загруженный модуль.
+    """
+    module = sys.modules.get(module_name)
+    if module is None:
+        module = await asyncio.to_thread(importlib.import_module, module_name)
+    return module
+
+
+async def preload_report_modules() -> None:
+    """Заранее загружает модули отчетов после входа администратора."""
+    for module_name in REPORT_MODULES:
+        await import_report_module(module_name)
+
+
+# Через сколько секунд статистика активности пересчитывается в фоне
+ACTIVITY_STATS_TTL = 300
+
+
+@dataclass
+class ActivityReport:
+    """
+    Снимок статистики активности вместе с Excel отчетом.
+
+    Атрибуты:
+        stats (Dict): Результат get_time_based_statistics.
+        fingerprint (str): Хэш stats; отчет пересобирается только при его смене.
+        excel (Optional[bytes]): Содержимое Excel отчета или None при ошибке.
+        filename (str): Имя файла отчета для Telegram.
+        computed_at (datetime): Время последнего расчета (UTC).
+        file_id (Optional[str]): file_id уже отправленного отчета в Telegram.
+    """
+
+    stats: Dict
+    fingerprint: str
+    excel: Optional[bytes]
+    filename: str
+    computed_at: datetime
+    file_id: Optional[str] = None
+
+
+async def load_activity_report(
+    previous: Optional[ActivityReport],
+) -> Optional[ActivityReport]:
+    """
+    Считает статистику активности и собирает Excel отчет.
+
+    Если цифры не изменились с прошлого расчета, отчет не пересобирается,
+    а вместе с ним сохраняется file_id: Telegram не загружает файл заново.
+
+    Args:
+        previous (Optional[ActivityReport]): Предыдущий снимок из кэша.
+
+    Returns:
+        Optional[ActivityReport]: Новый снимок или None, если статистики нет.
+    """
+    statistics = await import_report_module("src.utils.statistics")
+    stats = await statistics.get_time_based_statistics()
+    if not stats:
+        return None
+
+    now = datetime.utcnow()
+    fingerprint = seed_hash(stats)
+    if previous and previous.fingerprint == fingerprint and previous.excel:
+        previous.computed_at = now
+        return previous
+
+    excel, filename = None, f"bot_statistics_{now:%Y%m%d_%H%M%S}.xlsx"
+    excel_path = await statistics.generate_time_statistics_excel(stats)
+    if excel_path:
+        try:
+            with open(excel_path, "rb") as file:
+                excel = file.read()
+            filename = os.path.basename(excel_path)
+        finally:
+            os.remove(excel_path)
+
+    return ActivityReport(stats, fingerprint, excel, filename, now)
+
+
+activity_report_cache: StaleWhileRevalidate[ActivityReport] = StaleWhileRevalidate(
+    load_activity_report, ttl=ACTIVITY_STATS_TTL, name="activity-report"
+)
+
 
 class AdminStates(StatesGroup):
     WAITING_PASSWORD = State()
@@ -36,6 +158,82 @@ class AdminStates(StatesGroup):
     WAITING_MAILING_BUTTONS = State()
     WAITING_BUTTON_TEXT = State()
     WAITING_BUTTON_URL = State()
+    WAITING_SEGMENT_REGION = State()
+    WAITING_MAILING_CONFIRM = State()
+    WAITING_SCHEDULE_TIME = State()
+    WAITING_SCHEDULE_SPREAD = State()
+
+
+# Варианты окна, на которое растягивается запланированная рассылка (минуты)
+SPREAD_CHOICES = ((0, "Сразу"), (30, "30 мин"), (60, "1 час"), (180, "3 часа"))
+
+
+async def get_segment_presets() -> Dict[str, Tuple[str, SegmentSpec]]:
+    """
+    Возвращает предустановленные сегменты рассылки.
+
+    Сегменты по ответам привязываются к индексам вопросов и вариантов
+    текущей версии опроса, поэтому строятся при каждом обращении.
+
+    Returns:
+        Dict[str, Tuple[str, SegmentSpec]]: Имя сегмента -> (подпись, описание).
+    """
+    presets: Dict[str, Tuple[str, SegmentSpec]] = {
+        "all": ("👥 Все пользователи", {"kind": "all"}),
+        "completed": ("✅ Прошли опрос", {"kind": "completed"}),
+    }
+
+    survey = await get_survey()
+    if survey:
+        for question in survey.states:
+            if question.field_name == "is_under_25" and "Да" in question.options:
+                presets["under_25"] = (
+                    "🎓 Младше 25 лет",
+                    {
+                        "kind": "answer",
+                        "definition_id": survey.id,
+                        "question_idx": question.index,
+                        "option_idx": question.options.index("Да"),
+                    },
+                )
+
+    presets["inactive_30"] = (
+        "💤 Неактивны 30+ дней",
+        {"kind": "inactive", "days": 30},
+    )
+    return presets
+
+
+async def get_region_segment(region: str) -> Optional[SegmentSpec]:
+    """
+    Строит сегмент пользователей, в ответе о регионе которых есть подстрока.
+
+    Args:
+        region (str): Часть названия региона.
+
+    Returns:
+        Optional[SegmentSpec]: Описание сегмента или None, если в опросе
+            нет вопроса о регионе.
+    """
+    survey = await get_survey()
+    if not survey:
+        return None
+
+    for question in survey.states:
+        if question.field_name == "region":
+            return {
+                "kind": "text_answer",
+                "definition_id": survey.id,
+                "question_idx": question.index,
+                "text": region,
+            }
+    return None
+
+
+async def warm_audience_cache() -> None:
+    """Заранее считает размеры предустановленных сегментов."""
+    for _, segment in (await get_segment_presets()).values():
+        await count_segment(segment, use_cache=False)
 
 
 @router.message(Command("admin"))
@@ -77,6 +275,9 @@ async def handle_password_input(message: types.Message, state: FSMContext):
             message, await get_message("admin_msg"), await get_admin_keyboard()
         )
         await state.clear()
+        run_in_background(preload_report_modules(), name="preload-report-modules")
+        run_in_background(warm_audience_cache(), name="warm-audience-cache")
+        run_in_background(activity_report_cache.get(), name="warm-activity-report")
     else:
         await write_logs("warning", f"Wrong password attempt by {user_id}")
         await new_message(message, await get_message("wrong_password"), None)
@@ -103,10 +304,11 @@ async def process_activity_stats_button(callback_query: types.CallbackQuery):
         await write_logs("info", f"Activity stats request from admin {user_id}")
         await callback_query.answer("⏳ Подготовка статистики активности...")
 
-        # Получаем статистику
-        stats = await get_time_based_statistics()
+        # Последний снимок отдается сразу, устаревший обновляется в фоне
+        report = await activity_report_cache.get()
 
-        if stats:
+        if report:
+            stats = report.stats
             stats_text = (
                 "📊 Статистика активности бота:\n\n"
                 f"За последние 24 часа:\n"
@@ -120,57 +322,48 @@ async def process_activity_stats_button(callback_query: types.CallbackQuery):
                 f"📝 Пройдено опросов: {stats['monthly']['surveys']}\n\n"
                 f"Всего:\n"
                 f"👤 Пользователей: {stats['total']['users']}\n"
-                f"📝 Пройдено опросов: {stats['total']['surveys']}"
+                f"📝 Пройдено опросов: {stats['total']['surveys']}\n\n"
+                f"🕒 Данные на {utc_to_local(report.computed_at):%d.%m.%Y %H:%M}"
             )
 
-            try:
-                # Генерируем Excel отчет
-                excel_path = await generate_time_statistics_excel()
-                if excel_path:
-                    # Отправляем статистику
-                    await callback_query.message.edit_text(
-                        stats_text, reply_markup=await get_admin_keyboard()
-                    )
+            if report.excel is None:
+                await callback_query.message.edit_text(
+                    stats_text + "\n\n⚠️ Ошибка при создании Excel отчета",
+                    reply_markup=await get_admin_keyboard(),
+                )
+                return
+
+            await callback_query.message.edit_text(
+                stats_text, reply_markup=await get_admin_keyboard()
+            )
 
+            try:
+                sent = None
+                if report.file_id:
                     try:
-                        # Отправляем Excel файл
-                        doc = FSInputFile(excel_path)
-                        await callback_query.message.answer_document(
-                            doc, caption="📊 Статистика активности бота"
+                        sent = await callback_query.message.answer_document(
+                            report.file_id, caption="📊 Статистика активности бота"
                         )
-                        await write_logs(
-                            "info",
-                            f"Activity statistics Excel report sent to admin {user_id}",
-                        )
-                    except Exception as e:
-                        await write_logs("error", f"Error sending Excel file: {str(e)}")
-                        await callback_query.message.answer(
-                            "❌ Ошибка при отправке Excel файла"
-                        )
-                    finally:
-                        # Удаляем временный файл
-                        try:
-                            if os.path.exists(excel_path):
-                                os.remove(excel_path)
-                                await write_logs(
-                                    "info",
-                                    f"Temporary Excel file removed: {excel_path}",
-                                )
-                        except Exception as e:
-                            await write_logs(
-                                "error",
-                                f"Error removing temporary Excel file: {str(e)}",
-                            )
-                else:
-                    await callback_query.message.edit_text(
-                        stats_text + "\n\n⚠️ Ошибка при создании Excel отчета",
-                        reply_markup=await get_admin_keyboard(),
+                    except TelegramBadRequest:
+                        report.file_id = None
+
+                if sent is None:
+                    # Файл загружается только один раз на каждую версию данных
+                    sent = await callback_query.message.answer_document(
+                        BufferedInputFile(report.excel, filename=report.filename),
+                        caption="📊 Статистика активности бота",
                     )
+                    if sent.document:
+                        report.file_id = sent.document.file_id
+
+                await write_logs(
+                    "info",
+                    f"Activity statistics Excel report sent to admin {user_id}",
+                )
             except Exception as e:
-                await write_logs("error", f"Error in Excel report generation: {str(e)}")
-                await callback_query.message.edit_text(
-                    stats_text + "\n\n❌ Ошибка при создании Excel отчета",
-                    reply_markup=await get_admin_keyboard(),
+                await write_logs("error", f"Error sending Excel file: {str(e)}")
+                await callback_query.message.answer(
+                    "❌ Ошибка при отправке Excel файла"
                 )
         else:
             await write_logs("warning", "No activity statistics data available")
@@ -194,6 +387,119 @@ async def process_activity_stats_button(callback_query: types.CallbackQuery):
         )
 
 
+@router.callback_query(lambda c: c.data == "admin_activity_history")
+async def process_activity_history_button(callback_query: types.CallbackQuery):
+    """
+    Отправляет график DAU/WAU/MAU и опросов по дням.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+    """
+    if callback_query.from_user.id not in settings.config.admins.admins:
+        await callback_query.answer("У вас нет прав администратора")
+        return
+    await callback_query.answer()
+
+    try:
+        png = await get_activity_chart()
+        if png is None:
+            await callback_query.message.answer(
+                "История активности появится после первого завершенного дня",
+                reply_markup=await get_admin_keyboard(),
+            )
+            return
+
+        await callback_query.message.answer_photo(
+            BufferedInputFile(png, filename="activity_history.png"),
+            caption=f"📉 Активность за {HISTORY_DAYS} дней",
+            reply_markup=await get_admin_keyboard(),
+        )
+    except Exception as e:
+        await write_logs("error", f"Error sending activity history: {str(e)}")
+        await callback_query.message.answer(
+            "❌ Не удалось построить график", reply_markup=await get_admin_keyboard()
+        )
+
+
+@router.callback_query(lambda c: c.data == "admin_cohorts")
+async def process_cohorts_button(callback_query: types.CallbackQuery):
+    """
+    Отправляет Excel отчет с удержанием недельных когорт.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+    """
+    user_id = callback_query.from_user.id
+    if user_id not in settings.config.admins.admins:
+        await callback_query.answer("У вас нет прав администратора")
+        return
+    await callback_query.answer("⏳ Считаю когорты...")
+
+    excel_path = None
+    try:
+        cohorts = await import_report_module("src.utils.cohorts")
+        excel_path = await cohorts.generate_cohort_excel()
+        if not excel_path:
+            await callback_query.message.answer(
+                "❌ Нет данных для отчета по когортам",
+                reply_markup=await get_admin_keyboard(),
+            )
+            return
+
+        await callback_query.message.answer_document(
+            FSInputFile(excel_path),
+            caption=(
+                f"📆 Удержание когорт за {cohorts.COHORT_WEEKS} недель: "
+                f"возврат и завершение опроса в неделях W+0..W+{cohorts.RETENTION_WEEKS}"
+            ),
+            reply_markup=await get_admin_keyboard(),
+        )
+        await write_logs("info", f"Cohort report sent to admin {user_id}")
+    except Exception as e:
+        await write_logs("error", f"Error sending cohort report: {str(e)}")
+        await callback_query.message.answer("❌ Ошибка при создании отчета по когортам")
+    finally:
+        if excel_path and os.path.exists(excel_path):
+            os.remove(excel_path)
+
+
+@router.callback_query(lambda c: c.data == "admin_top_leads")
+async def process_top_leads_button(callback_query: types.CallbackQuery):
+    """
+    Показывает лидов с наибольшей оценкой среди опросов, завершенных сегодня.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+    """
+    if callback_query.from_user.id not in settings.config.admins.admins:
+        await callback_query.answer("У вас нет прав администратора")
+        return
+    await callback_query.answer()
+
+    # "Сегодня" считается в часовом поясе администратора
+    local_today = utc_to_local(datetime.utcnow()).date()
+    leads = await get_top_leads(local_to_utc(datetime.combine(local_today, time.min)))
+
+    if not leads:
+        await callback_query.message.answer(
+            "Сегодня еще никто не завершил опрос",
+            reply_markup=await get_admin_keyboard(),
+        )
+        return
+
+    lines = [f"🔥 Лучшие лиды за {local_today:%d.%m.%Y}:\n"]
+    for place, (user_id, username, score, completed_at) in enumerate(leads, 1):
+        name = f"@{username}" if username else f"id {user_id}"
+        lines.append(
+            f"{place}. {name} — {score} ({lead_label(score)}), "
+            f"{utc_to_local(completed_at):%H:%M}"
+        )
+
+    await callback_query.message.answer(
+        "\n".join(lines), reply_markup=await get_admin_keyboard()
+    )
+
+
 @router.callback_query(lambda c: c.data == "admin_user_stats")
 async def process_user_stats_button(callback_query: types.CallbackQuery):
     """
@@ -215,8 +521,10 @@ async def process_user_stats_button(callback_query: types.CallbackQuery):
         await write_logs("info", f"User stats request from admin {user_id}")
         await callback_query.answer("⏳ Подготовка статистики пользователей...")
 
+        user_statistics = await import_report_module("src.utils.user_statistics")
+
         # Генерируем Excel отчет
-        excel_path = await generate_user_statistics_excel()
+        excel_path = await user_statistics.generate_user_statistics_excel()
         if excel_path:
             try:
                 # Отправляем Excel файл
@@ -296,105 +604,53 @@ async def process_mailing_button(
     await state.set_state(AdminStates.WAITING_MAILING_MEDIA)
     await callback_query.message.edit_text(
         "📨 Отправьте сообщение для рассылки.\n"
-        "Это может быть:\n"
-        "- Текст\n"
-        "- Фото\n"
-        "- Видео\n"
-        "- Голосовое сообщение",
+        "Это может быть любое сообщение: текст, фото, видео, альбом,\n"
+        "документ, GIF или голосовое сообщение",
         reply_markup=await get_admin_keyboard(),
     )
     await callback_query.answer()
 
 
+# Части альбома приходят отдельными обновлениями: media_group_id -> message_id
+_album_parts: Dict[str, List[int]] = {}
+# Сколько секунд ждать остальные части альбома после первой
+ALBUM_COLLECT_DELAY = 1.0
+
+
 @router.message(AdminStates.WAITING_MAILING_MEDIA)
 async def handle_mailing_content(message: types.Message, state: FSMContext):
     """
     Обрабатывает контент для рассылки.
+
+    Сохраняется только ссылка на исходное сообщение: при рассылке оно
+    копируется через copyMessage, поэтому поддерживается любой тип контента.
     
     Args:
         message (types.Message): Сообщение, содержащее контент для рассылки.
         state (FSMContext): Контекст состояния для управления состоянием.
     """
     try:
-        # Сохраняем информацию о сообщении
-        mailing_data = {}
-
-        if message.text:
-            mailing_data["type"] = "text"
-            mailing_data["content"] = message.text
-            # Сохраняем entities как список словарей
-            if message.entities:
-                mailing_data["entities"] = [
-                    {
-                        "type": entity.type,
-                        "offset": entity.offset,
-                        "length": entity.length,
-                        "url": entity.url,
-                        "user": entity.user,
-                        "language": entity.language,
-                        "custom_emoji_id": entity.custom_emoji_id,
-                    }
-                    for entity in message.entities
-                ]
-        elif message.photo:
-            mailing_data["type"] = "photo"
-            mailing_data["content"] = message.photo[-1].file_id
-            mailing_data["caption"] = message.caption
-            if message.caption_entities:
-                mailing_data["caption_entities"] = [
-                    {
-                        "type": entity.type,
-                        "offset": entity.offset,
-                        "length": entity.length,
-                        "url": entity.url,
-                        "user": entity.user,
-                        "language": entity.language,
-                        "custom_emoji_id": entity.custom_emoji_id,
-                    }
-                    for entity in message.caption_entities
-                ]
-        elif message.video:
-            mailing_data["type"] = "video"
-            mailing_data["content"] = message.video.file_id
-            mailing_data["caption"] = message.caption
-            if message.caption_entities:
-                mailing_data["caption_entities"] = [
-                    {
-                        "type": entity.type,
-                        "offset": entity.offset,
-                        "length": entity.length,
-                        "url": entity.url,
-                        "user": entity.user,
-                        "language": entity.language,
-                        "custom_emoji_id": entity.custom_emoji_id,
-                    }
-                    for entity in message.caption_entities
-                ]
-        elif message.voice:
-            mailing_data["type"] = "voice"
-            mailing_data["content"] = message.voice.file_id
-            mailing_data["caption"] = message.caption
-            if message.caption_entities:
-                mailing_data["caption_entities"] = [
-                    {
-                        "type": entity.type,
-                        "offset": entity.offset,
-                        "length": entity.length,
-                        "url": entity.url,
-                        "user": entity.user,
-                        "language": entity.language,
-                        "custom_emoji_id": entity.custom_emoji_id,
-                    }
-                    for entity in message.caption_entities
-                ]
+        if message.media_group_id:
+            parts = _album_parts.get(message.media_group_id)
+            if parts is not None:
+                # Альбом обрабатывает обработчик первой части
+                parts.append(message.message_id)
+                return
+
+            _album_parts[message.media_group_id] = [message.message_id]
+            await asyncio.sleep(ALBUM_COLLECT_DELAY)
+            message_ids = sorted(_album_parts.pop(message.media_group_id))
         else:
-            await message.answer(
-                "❌ Неподдерживаемый тип сообщения. Пожалуйста, отправьте текст, фото, видео или голосовое сообщение."
-            )
-            return
+            message_ids = [message.message_id]
 
-        # Сохраняем данные в состояние
-        await state.update_data(mailing=mailing_data)
+        await state.update_data(
+            mailing={"from_chat_id": message.chat.id, "message_ids": message_ids}
+        )
+
+        if len(message_ids) > 1:
+            # Telegram не прикрепляет кнопки к альбомам
+            await ask_mailing_segment(message, state)
+            return
 
         # Спрашиваем про кнопки
         await state.set_state(AdminStates.WAITING_MAILING_BUTTONS)
@@ -445,7 +701,8 @@ async def process_no_buttons(callback_query: types.CallbackQuery, state: FSMCont
         callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
         state (FSMContext): Контекст состояния для управления состоянием.
     """
-    await send_mailing(callback_query.message, state)
+    await ask_mailing_segment(callback_query.message, state)
+    await callback_query.answer()
 
 
 @router.callback_query(lambda c: c.data == "cancel_buttons")
@@ -459,7 +716,8 @@ async def process_cancel_buttons(
         callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
         state (FSMContext): Контекст состояния для управления состоянием.
     """
-    await send_mailing(callback_query.message, state)
+    await ask_mailing_segment(callback_query.message, state)
+    await callback_query.answer()
 
 
 @router.message(AdminStates.WAITING_BUTTON_TEXT)
@@ -499,125 +757,465 @@ async def handle_button_url(message: types.Message, state: FSMContext):
     mailing_data["button"] = {"text": button_text, "url": message.text}
 
     await state.update_data(mailing=mailing_data)
-    await send_mailing(message, state)
+    await ask_mailing_segment(message, state)
 
 
-async def send_mailing(message: types.Message, state: FSMContext):
+async def ask_mailing_segment(message: types.Message, state: FSMContext):
     """
-    Отправляет рассылку всем пользователям.
-    
+    Предлагает выбрать аудиторию рассылки.
+
+    Размеры сегментов берутся из кэша, поэтому клавиатура появляется
+    без полного пересчета аудитории.
+
     Args:
-        message (types.Message): Сообщение, содержащее контент для рассылки.
+        message (types.Message): Сообщение, в чат которого отправляется выбор.
         state (FSMContext): Контекст состояния для управления состоянием.
     """
-    try:
-        state_data = await state.get_data()
-        mailing_data = state_data["mailing"]
+    presets = await get_segment_presets()
+    counts = await asyncio.gather(
+        *(count_segment(segment) for _, segment in presets.values())
+    )
 
-        # Получаем всех пользователей
-        users = await get_all_users()
+    rows = []
+    for (name, (title, _)), count in zip(presets.items(), counts):
+        label = f"{title} ({count})" if count is not None else title
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=label,
+                    callback_data=MailingSegmentCallback(name=name).pack(),
+                )
+            ]
+        )
+    rows.append(
+        [
+            InlineKeyboardButton(
+                text="📍 По региону",
+                callback_data=MailingSegmentCallback(name="region").pack(),
+            )
+        ]
+    )
 
-        # Создаем клавиатуру, если есть кнопка
-        keyboard = None
-        if "button" in mailing_data:
-            keyboard = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text=mailing_data["button"]["text"],
-                            url=mailing_data["button"]["url"],
-                        )
-                    ]
-                ]
+    await state.set_state(AdminStates.WAITING_MAILING_CONFIRM)
+    await message.answer(
+        "Кому отправить рассылку?",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=rows),
+    )
+
+
+async def confirm_mailing_segment(
+    message: types.Message, state: FSMContext, title: str, segment: SegmentSpec
+):
+    """
+    Сохраняет выбранный сегмент и показывает размер аудитории перед отправкой.
+
+    Args:
+        message (types.Message): Сообщение, в чат которого отправляется запрос.
+        state (FSMContext): Контекст состояния для управления состоянием.
+        title (str): Подпись сегмента.
+        segment (SegmentSpec): Описание сегмента.
+    """
+    count = await count_segment(segment)
+    await state.update_data(segment=segment)
+    await state.set_state(AdminStates.WAITING_MAILING_CONFIRM)
+    await message.answer(
+        f"Аудитория: {title}\n"
+        f"Получателей: {count if count is not None else 'неизвестно'}\n\n"
+        "Начать рассылку?",
+        reply_markup=InlineKeyboardMarkup(
+            inline_keyboard=[
+                [
+                    InlineKeyboardButton(
+                        text="🚀 Отправить", callback_data="confirm_mailing"
+                    ),
+                    InlineKeyboardButton(
+                        text="⏰ Запланировать", callback_data="schedule_mailing"
+                    ),
+                ],
+                [
+                    InlineKeyboardButton(
+                        text="❌ Отмена", callback_data="cancel_mailing"
+                    ),
+                ],
+            ]
+        ),
+    )
+
+
+@router.callback_query(MailingSegmentCallback.filter())
+async def process_mailing_segment(
+    callback_query: types.CallbackQuery,
+    callback_data: MailingSegmentCallback,
+    state: FSMContext,
+):
+    """
+    Обрабатывает выбор сегмента рассылки.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+        callback_data (MailingSegmentCallback): Имя выбранного сегмента.
+        state (FSMContext): Контекст состояния для управления состоянием.
+    """
+    await callback_query.answer()
+
+    if "mailing" not in await state.get_data():
+        await callback_query.message.answer("❌ Рассылка не найдена, начните заново")
+        return
+
+    if callback_data.name == "region":
+        await state.set_state(AdminStates.WAITING_SEGMENT_REGION)
+        await callback_query.message.answer("Введите название региона или его часть:")
+        return
+
+    presets = await get_segment_presets()
+    if callback_data.name not in presets:
+        await callback_query.message.answer("❌ Сегмент недоступен")
+        return
+
+    title, segment = presets[callback_data.name]
+    await confirm_mailing_segment(callback_query.message, state, title, segment)
+
+
+@router.message(AdminStates.WAITING_SEGMENT_REGION)
+async def handle_segment_region(message: types.Message, state: FSMContext):
+    """
+    Обрабатывает ввод региона для сегмента рассылки.
+
+    Args:
+        message (types.Message): Сообщение с названием региона.
+        state (FSMContext): Контекст состояния для управления состоянием.
+    """
+    region = (message.text or "").strip()
+    if not region:
+        await message.answer("Введите название региона текстом:")
+        return
+
+    segment = await get_region_segment(region)
+    if segment is None:
+        await message.answer("❌ В опросе нет вопроса о регионе")
+        return
+
+    await confirm_mailing_segment(message, state, f"📍 Регион «{region}»", segment)
+
+
+@router.callback_query(lambda c: c.data == "confirm_mailing")
+async def process_confirm_mailing(
+    callback_query: types.CallbackQuery, state: FSMContext
+):
+    """
+    Запускает рассылку после подтверждения.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+        state (FSMContext): Контекст состояния для управления состоянием.
+    """
+    await callback_query.answer()
+    await callback_query.message.edit_reply_markup(reply_markup=None)
+    await send_mailing(callback_query.message, state)
+
+
+@router.callback_query(lambda c: c.data == "cancel_mailing")
+async def process_cancel_mailing(
+    callback_query: types.CallbackQuery, state: FSMContext
+):
+    """
+    Отменяет рассылку на шаге подтверждения.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+        state (FSMContext): Контекст состояния для управления состоянием.
+    """
+    await state.clear()
+    await callback_query.answer("Рассылка отменена")
+    await callback_query.message.edit_text(
+        "❌ Рассылка отменена", reply_markup=await get_admin_keyboard()
+    )
+
+
+@router.callback_query(lambda c: c.data == "schedule_mailing")
+async def process_schedule_mailing(
+    callback_query: types.CallbackQuery, state: FSMContext
+):
+    """
+    Запрашивает время отложенной или расписание повторяющейся рассылки.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+        state (FSMContext): Контекст состояния для управления состоянием.
+    """
+    await callback_query.answer()
+    await state.set_state(AdminStates.WAITING_SCHEDULE_TIME)
+    await callback_query.message.edit_reply_markup(reply_markup=None)
+    await callback_query.message.answer(
+        f"Введите время рассылки (UTC{settings.config.SCHEDULE_UTC_OFFSET:+d}):\n"
+        "- один раз: ДД.ММ.ГГГГ ЧЧ:ММ, например 25.12.2025 10:00\n"
+        "- регулярно: расписание cron из пяти полей, например 0 10 * * 1 "
+        "(каждый понедельник в 10:00)"
+    )
+
+
+@router.message(AdminStates.WAITING_SCHEDULE_TIME)
+async def handle_schedule_time(message: types.Message, state: FSMContext):
+    """
+    Обрабатывает время или расписание рассылки.
+
+    Args:
+        message (types.Message): Сообщение с датой или выражением cron.
+        state (FSMContext): Контекст состояния для управления состоянием.
+    """
+    text = (message.text or "").strip()
+    cron = None
+    try:
+        run_at = local_to_utc(datetime.strptime(text, "%d.%m.%Y %H:%M"))
+    except ValueError:
+        try:
+            cron = CronSchedule.parse(text).expression
+            run_at = next_cron_run(cron, datetime.utcnow())
+        except ValueError:
+            await message.answer(
+                "❌ Не удалось разобрать время. Пример: 25.12.2025 10:00 или 0 10 * * 1"
             )
+            return
 
-        # Счетчики для статистики
-        successful = 0
-        failed = 0
-
-        # Преобразуем entities в объекты MessageEntity
-        entities = None
-        caption_entities = None
-
-        if "entities" in mailing_data:
-            entities = [
-                MessageEntity(
-                    type=e["type"],
-                    offset=e["offset"],
-                    length=e["length"],
-                    url=e.get("url"),
-                    user=e.get("user"),
-                    language=e.get("language"),
-                    custom_emoji_id=e.get("custom_emoji_id"),
-                )
-                for e in mailing_data["entities"]
+    if run_at <= datetime.utcnow():
+        await message.answer("❌ Это время уже прошло, введите другое")
+        return
+
+    await state.update_data(schedule={"run_at": run_at.isoformat(), "cron": cron})
+    await state.set_state(AdminStates.WAITING_SCHEDULE_SPREAD)
+    await message.answer(
+        "За какое время разослать сообщения? Растянутая рассылка не мешает "
+        "пользователям, которые в это время проходят опрос.",
+        reply_markup=InlineKeyboardMarkup(
+            inline_keyboard=[
+                [
+                    InlineKeyboardButton(text=title, callback_data=f"spread:{minutes}")
+                    for minutes, title in SPREAD_CHOICES
+                ]
             ]
+        ),
+    )
+
+
+@router.callback_query(AdminStates.WAITING_SCHEDULE_SPREAD, F.data.startswith("spread:"))
+async def process_schedule_spread(
+    callback_query: types.CallbackQuery, state: FSMContext
+):
+    """
+    Сохраняет запланированную рассылку.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+        state (FSMContext): Контекст состояния для управления состоянием.
+    """
+    await callback_query.answer()
+    state_data = await state.get_data()
+    schedule = state_data["schedule"]
+
+    try:
+        job = await scheduler.schedule(
+            mailing=state_data["mailing"],
+            segment=state_data.get("segment", {"kind": "all"}),
+            run_at=datetime.fromisoformat(schedule["run_at"]),
+            created_by=callback_query.from_user.id,
+            cron=schedule["cron"],
+            spread_minutes=int(callback_query.data.split(":", 1)[1]),
+        )
+    except Exception as e:
+        await write_logs("error", f"Error scheduling mailing: {str(e)}")
+        await callback_query.message.answer("❌ Не удалось запланировать рассылку")
+        return
+    finally:
+        await state.clear()
+
+    repeat = f"\nПовтор: {job.cron}" if job.cron else ""
+    await callback_query.message.edit_text(
+        f"⏰ Рассылка #{job.id} запланирована на "
+        f"{utc_to_local(job.run_at):%d.%m.%Y %H:%M}{repeat}",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@router.callback_query(lambda c: c.data == "admin_scheduled")
+async def process_scheduled_list(callback_query: types.CallbackQuery):
+    """
+    Показывает активные запланированные рассылки.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+    """
+    if callback_query.from_user.id not in settings.config.admins.admins:
+        await callback_query.answer("У вас нет прав администратора")
+        return
+    await callback_query.answer()
+
+    jobs = scheduler.list_jobs()
+    if not jobs:
+        await callback_query.message.answer(
+            "Запланированных рассылок нет", reply_markup=await get_admin_keyboard()
+        )
+        return
 
-        if "caption_entities" in mailing_data:
-            caption_entities = [
-                MessageEntity(
-                    type=e["type"],
-                    offset=e["offset"],
-                    length=e["length"],
-                    url=e.get("url"),
-                    user=e.get("user"),
-                    language=e.get("language"),
-                    custom_emoji_id=e.get("custom_emoji_id"),
+    lines = []
+    rows = []
+    for job in jobs:
+        repeat = f", повтор {job.cron}" if job.cron else ""
+        lines.append(f"#{job.id}: {utc_to_local(job.run_at):%d.%m.%Y %H:%M}{repeat}")
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=f"🗑 Отменить #{job.id}",
+                    callback_data=ScheduledMailingCallback(
+                        action="cancel", id=job.id
+                    ).pack(),
                 )
-                for e in mailing_data["caption_entities"]
             ]
+        )
 
-        # Отправляем сообщения
-        for user in users:
-            try:
-                if mailing_data["type"] == "text":
-                    await message.bot.send_message(
-                        user.user_id,
-                        mailing_data["content"],
-                        entities=entities,
-                        reply_markup=keyboard,
-                    )
-                elif mailing_data["type"] == "photo":
-                    await message.bot.send_photo(
-                        user.user_id,
-                        mailing_data["content"],
-                        caption=mailing_data.get("caption"),
-                        caption_entities=caption_entities,
-                        reply_markup=keyboard,
-                    )
-                elif mailing_data["type"] == "video":
-                    await message.bot.send_video(
-                        user.user_id,
-                        mailing_data["content"],
-                        caption=mailing_data.get("caption"),
-                        caption_entities=caption_entities,
-                        reply_markup=keyboard,
-                    )
-                elif mailing_data["type"] == "voice":
-                    await message.bot.send_voice(
-                        user.user_id,
-                        mailing_data["content"],
-                        caption=mailing_data.get("caption"),
-                        caption_entities=caption_entities,
-                        reply_markup=keyboard,
-                    )
-                successful += 1
-            except Exception as e:
-                await write_logs(
-                    "error", f"Error sending mailing to user {user.user_id}: {str(e)}"
+    await callback_query.message.answer(
+        "⏰ Запланированные рассылки:\n\n" + "\n".join(lines),
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=rows),
+    )
+
+
+@router.callback_query(ScheduledMailingCallback.filter(F.action == "cancel"))
+async def process_cancel_scheduled(
+    callback_query: types.CallbackQuery, callback_data: ScheduledMailingCallback
+):
+    """
+    Отменяет запланированную рассылку.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+        callback_data (ScheduledMailingCallback): Идентификатор рассылки.
+    """
+    if callback_query.from_user.id not in settings.config.admins.admins:
+        await callback_query.answer("У вас нет прав администратора")
+        return
+
+    if await scheduler.cancel(callback_data.id):
+        await callback_query.answer(f"Рассылка #{callback_data.id} отменена")
+    else:
+        await callback_query.answer("Рассылка уже выполнена или отменена")
+
+
+@router.callback_query(lambda c: c.data == "admin_mailing_reports")
+async def process_mailing_reports(callback_query: types.CallbackQuery):
+    """
+    Показывает последние отчеты о рассылках.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+    """
+    if callback_query.from_user.id not in settings.config.admins.admins:
+        await callback_query.answer("У вас нет прав администратора")
+        return
+    await callback_query.answer()
+
+    reports = await get_recent_mailing_reports()
+    if not reports:
+        await callback_query.message.answer(
+            "Отчетов о рассылках пока нет", reply_markup=await get_admin_keyboard()
+        )
+        return
+
+    rows = [
+        [
+            InlineKeyboardButton(
+                text=(
+                    f"#{report.id} {report.started_at:%d.%m %H:%M} — "
+                    f"✅ {report.successful} ❌ {report.failed + report.blocked}"
+                ),
+                callback_data=MailingReportCallback(
+                    action="summary", id=report.id
+                ).pack(),
+            )
+        ]
+        for report in reports
+    ]
+    await callback_query.message.answer(
+        "📈 Последние рассылки (время UTC):",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=rows),
+    )
+
+
+@router.callback_query(MailingReportCallback.filter())
+async def process_mailing_report(
+    callback_query: types.CallbackQuery, callback_data: MailingReportCallback
+):
+    """
+    Отправляет сводку, график или CSV отчета о рассылке.
+
+    Args:
+        callback_query (types.CallbackQuery): Запрос обратного вызова от пользователя.
+        callback_data (MailingReportCallback): Отчет и формат выгрузки.
+    """
+    if callback_query.from_user.id not in settings.config.admins.admins:
+        await callback_query.answer("У вас нет прав администратора")
+        return
+    await callback_query.answer()
+
+    try:
+        report = await get_mailing_report(callback_data.id)
+        if report is None:
+            await callback_query.message.answer("❌ Отчет не найден")
+            return
+
+        if callback_data.action == "summary":
+            await callback_query.message.answer(
+                format_report_summary(report),
+                reply_markup=get_report_keyboard(report.id),
+            )
+        elif callback_data.action == "png":
+            png = await render_in_process(
+                render_mailing_chart,
+                report.metrics_data,
+                f"Рассылка #{report.id} от {report.started_at:%d.%m.%Y %H:%M} UTC",
+            )
+            await callback_query.message.answer_photo(
+                BufferedInputFile(png, filename=f"mailing_{report.id}.png"),
+                caption=format_report_summary(report),
+            )
+        elif callback_data.action == "csv":
+            await callback_query.message.answer_document(
+                BufferedInputFile(
+                    metrics_to_csv(report), filename=f"mailing_{report.id}.csv"
                 )
-                failed += 1
+            )
+    except Exception as e:
+        await write_logs("error", f"Error exporting mailing report: {str(e)}")
+        await callback_query.message.answer("❌ Не удалось выгрузить отчет")
+
+
+async def send_mailing(message: types.Message, state: FSMContext):
+    """
+    Отправляет рассылку пользователям выбранного сегмента.
+    
+    Args:
+        message (types.Message): Сообщение, в чат которого отправляются итоги.
+        state (FSMContext): Контекст состояния для управления состоянием.
+    """
+    try:
+        state_data = await state.get_data()
+        mailing_data = state_data["mailing"]
+        segment = state_data.get("segment", {"kind": "all"})
+
+        result = await run_mailing(
+            message.bot, mailing_data, segment, created_by=message.chat.id
+        )
 
         # Отправляем статистику
         await message.answer(
             f"📊 Рассылка завершена\n\n"
-            f"✅ Успешно отправлено: {successful}\n"
-            f"❌ Ошибок отправки: {failed}",
-            reply_markup=await get_admin_keyboard(),
+            f"✅ Успешно отправлено: {result.successful}\n"
+            f"🚫 Бот заблокирован: {result.blocked}\n"
+            f"❌ Ошибок отправки: {result.failed}",
+            reply_markup=get_report_keyboard(result.report_id)
+            or await get_admin_keyboard(),
         )
 
     except Exception as e:
         await write_logs("error", f"Error in mailing: {str(e)}")
         await message.answer("❌ Произошла ошибка при рассылке")
     finally:
-        await state.clear()
\ No newline at end of file
+        await state.clear()
@@ -4,22 +4,24 @@ from aiogram.fsm.context import FSMContext
 from src.keyboards.inlinebutton import (
     update_message,
     new_message,
-    get_keyboard,
 )
 from src.utils.localization import get_message
 from src.database.using_data import get_or_create_user
-from src.handlers.survey_questions.questions import QUESTIONS
+from src.handlers.survey_questions.questions import DEFAULT_SURVEY, get_survey
 from src.handlers.survey_questions.survey import SurveyStates
 from src.utils.logging import write_logs
 
 router = Router(name=__name__)
 
 
-@router.callback_query(F.data == "Survey")
+@router.callback_query(F.data.regexp(r"^Survey(:[\w-]+)?$"))
 async def general_main_survey(call: CallbackQuery, state: FSMContext) -> None:
     """
     Обрабатывает запрос на начало опроса.
 
+    Кнопка "Survey" запускает опрос по умолчанию, "Survey:<slug>" — опрос
+    с указанным slug из базы данных.
+
     Args:
         call (CallbackQuery): Объект CallbackQuery, содержащий информацию о нажатой кнопке и пользователе.
         state (FSMContext): Контекст состояния для управления состоянием опроса.
@@ -28,14 +30,17 @@ async def general_main_survey(call: CallbackQuery, state: FSMContext) -> None:
         None: Функция ничего не возвращает, но обновляет сообщение и управляет состоянием опроса.
     """
     try:
+        slug = call.data.partition(":")[2] or DEFAULT_SURVEY
+        survey = await get_survey(slug)
+        if survey is None:
+            raise ValueError(f"Survey '{slug}' not found")
+
         # Получаем первый вопрос
-        first_question = QUESTIONS.get("has_business")
-        if not first_question:
-            raise ValueError("First question not found")
+        first_question = survey.states[0]
 
         # Устанавливаем состояние опроса
         await state.set_state(SurveyStates.ANSWERING)
-        await state.update_data(current_question="has_business")
+        await state.update_data(survey=survey.slug, state=first_question.index)
 
         # Получаем текст вопроса
         question_text = await first_question.get_text()
@@ -51,7 +56,7 @@ async def general_main_survey(call: CallbackQuery, state: FSMContext) -> None:
         await new_message(
             call.message,
             question_text,
-            await get_keyboard(first_question.options),
+            first_question.keyboard,
         )
 
         await call.answer()
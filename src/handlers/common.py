@@ -4,7 +4,7 @@ from src.keyboards.inlinebutton import new_message
 from src.utils.localization import get_message
 from src.keyboards.inlinebutton import get_general_menu
 from src.database.using_data import add_user_if_not_exists
-from aiogram.types import FSInputFile
+from src.utils.assets import assets
 
 router = Router(name=__name__)
 
@@ -21,11 +21,13 @@ async def command_start(message: types.Message) -> None:
         None: Функция ничего не возвращает, но отправляет сообщение пользователю и добавляет его в базу данных, если он новый.
     """
     # Отправляем фото с приветственным сообщением
-    await message.answer_photo(
-        photo=FSInputFile("/app/content/welcome.JPG"),
+    welcome = assets.get("welcome.JPG")
+    sent = await message.answer_photo(
+        photo=welcome.input_file(),
         caption=await get_message("start"),
         reply_markup=await get_general_menu(),
     )
+    welcome.remember(sent)
 
     user_data = {
         "user_id": message.from_user.id,
@@ -1,6 +1,15 @@
 from dataclasses import dataclass
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+import time
+from aiogram.types import InlineKeyboardMarkup
 from src.utils.localization import get_message
+from src.utils.logging import write_logs
+from src.keyboards.inlinebutton import build_options_keyboard
+from src.database.surveys import load_survey_definitions, seed_survey
+from src.database.settings_data import seed_hash, set_schema_meta
+
+DEFAULT_SURVEY = "subsidy"
+SURVEYS_CACHE_TTL = 60  # 1 minute in seconds
 
 
 @dataclass
@@ -8,8 +17,10 @@ class Question:
     key: str  # Ключ для получения текста из БД
     field_name: str
     options: Optional[List[str]] = None
+    weights: Optional[List[int]] = None  # Вес каждого варианта в оценке лида
     next_question: Optional[str] = None
     is_last: bool = False
+    checkpoint_key: Optional[str] = None  # Сообщение промежуточной точки
 
     async def get_text(self) -> str:
         """Получает текст вопроса из базы данных."""
@@ -22,6 +33,7 @@ QUESTIONS: Dict[str, Question] = {
         key="question_has_business",
         field_name="has_business",
         options=["Да", "Нет, но планирую", "Нет и не планирую"],
+        weights=[10, 5, 0],
         next_question="is_under_25",
     ),
     "is_under_25": Question(
@@ -34,6 +46,7 @@ QUESTIONS: Dict[str, Question] = {
         key="question_has_experience",
         field_name="has_experience",
         options=["Да", "Нет"],
+        weights=[5, 0],
         next_question="region",
     ),
     "region": Question(
@@ -48,31 +61,37 @@ QUESTIONS: Dict[str, Question] = {
             "100.000-250.000",
             "250.000+",
         ],
+        weights=[0, 5, 10, 15],
         next_question="work_plan",
     ),
     "work_plan": Question(
         key="question_work_plan",
         field_name="work_plan",
         options=["Один", "Нанимать сотрудников"],
+        weights=[0, 5],
         next_question="subsidy_interest",
+        checkpoint_key="mid_survey",
     ),
     # Block 2: Qualification
     "subsidy_interest": Question(
         key="question_subsidy_interest",
         field_name="subsidy_interest",
         options=["Готов начинать", "Думаю пока", "Просто интересуюсь"],
+        weights=[25, 10, 0],
         next_question="desired_outcome",
     ),
     "desired_outcome": Question(
         key="question_desired_outcome",
         field_name="desired_outcome",
         options=["Пошаговый план", "Готовый бизнес-план", "Сопровождение под ключ"],
+        weights=[5, 10, 20],
         next_question="importance_level",
     ),
     "importance_level": Question(
         key="question_importance_level",
         field_name="importance_level",
         options=["Очень важно", "Не очень", "Пока не уверен"],
+        weights=[15, 0, 5],
         next_question="investment_readiness",
     ),
     "investment_readiness": Question(
@@ -83,11 +102,177 @@ QUESTIONS: Dict[str, Question] = {
             "Готов частично",
             "Нет, хочу только бесплатно",
         ],
+        weights=[25, 15, 0],
         is_last=True,
     ),
 }
 
 
+@dataclass(frozen=True)
+class SurveyState:
+    """Скомпилированный вопрос опроса — одно состояние конечного автомата."""
+
+    index: int
+    key: str
+    field_name: str
+    options: Tuple[str, ...]
+    weights: Tuple[int, ...]  # Таблица весов для оценки лида, индекс — вариант
+    next_state: Optional[int]
+    checkpoint_key: Optional[str]
+    keyboard: Optional[InlineKeyboardMarkup]
+
+    @property
+    def is_last(self) -> bool:
+        return self.next_state is None
+
+    def decode_option(self, option_idx: int) -> Optional[str]:
+        """Возвращает текст варианта по индексу или None, если индекс неверен."""
+        if 0 <= option_idx < len(self.options):
+            return self.options[option_idx]
+        return None
+
+    async def get_text(self) -> str:
+        """Получает текст вопроса из базы данных."""
+        return await get_message(self.key, category="questions")
+
+
+@dataclass(frozen=True)
+class CompiledSurvey:
+    """Неизменяемая таблица переходов опроса, индексируемая номером состояния."""
+
+    id: int
+    slug: str
+    states: Tuple[SurveyState, ...]
+
+
+# Скомпилированные опросы по slug; словарь заменяется целиком при перезагрузке
+_surveys: Dict[str, CompiledSurvey] = {}
+_last_surveys_update = 0
+
+
+def compile_survey(definition, questions, options_by_question) -> CompiledSurvey:
+    """Компилирует определение опроса из БД в таблицу переходов.
+
+    Позиции вопросов переводятся в плотные индексы состояний, клавиатуры
+    строятся один раз здесь же.
+
+    Args:
+        definition (SurveyDefinition): Определение опроса.
+        questions (List[SurveyQuestion]): Вопросы в порядке позиций.
+        options_by_question (Dict[int, List[Tuple[str, int]]]): Варианты
+            ответа с весами по id вопроса.
+
+    Returns:
+        CompiledSurvey: Скомпилированный опрос.
+
+    Raises:
+        ValueError: Если опрос пуст или ссылается на несуществующий вопрос.
+    """
+    if not questions:
+        raise ValueError(f"Survey '{definition.slug}' has no questions")
+
+    index_by_position = {
+        question.position: idx for idx, question in enumerate(questions)
+    }
+
+    states = []
+    for idx, question in enumerate(questions):
+        next_state = None
+        if question.next_position is not None:
+            if question.next_position not in index_by_position:
+                raise ValueError(
+                    f"Survey '{definition.slug}': question {question.position} "
+                    f"points to missing position {question.next_position}"
+                )
+            next_state = index_by_position[question.next_position]
+
+        option_rows = options_by_question.get(question.id, ())
+        options = tuple(text for text, _ in option_rows)
+        states.append(
+            SurveyState(
+                index=idx,
+                key=question.key,
+                field_name=question.field_name,
+                options=options,
+                weights=tuple(weight for _, weight in option_rows),
+                next_state=next_state,
+                checkpoint_key=question.checkpoint_key,
+                keyboard=build_options_keyboard(idx, options) if options else None,
+            )
+        )
+
+    return CompiledSurvey(id=definition.id, slug=definition.slug, states=tuple(states))
+
+
+async def reload_surveys() -> None:
+    """Загружает опросы из БД, компилирует и атомарно подменяет реестр."""
+    global _surveys, _last_surveys_update
+
+    compiled: Dict[str, CompiledSurvey] = {}
+    for definition, questions, options_by_question in await load_survey_definitions():
+        try:
+            compiled[definition.slug] = compile_survey(
+                definition, questions, options_by_question
+            )
+        except ValueError as e:
+            await write_logs("error", f"Error compiling survey: {str(e)}")
+
+    _surveys = compiled
+    _last_surveys_update = time.time()
+
+
+async def get_survey(slug: str = DEFAULT_SURVEY) -> Optional[CompiledSurvey]:
+    """Возвращает скомпилированный опрос по slug.
+
+    Args:
+        slug (str, optional): Короткое имя опроса. Defaults to DEFAULT_SURVEY.
+
+    Returns:
+        Optional[CompiledSurvey]: Опрос или None, если он не найден.
+    """
+    if not _surveys or time.time() - _last_surveys_update > SURVEYS_CACHE_TTL:
+        try:
+            await reload_surveys()
+        except Exception as e:
+            # Продолжаем работать на предыдущей версии опросов
+            await write_logs("error", f"Error reloading surveys: {str(e)}")
+
+    return _surveys.get(slug)
+
+
+async def seed_default_survey(stored_seed_hash: Optional[str] = None) -> None:
+    """Сохраняет опрос по умолчанию из QUESTIONS в БД, если его там нет.
+
+    Опрос в БД является источником правды: правки QUESTIONS (тексты
+    вариантов, веса, переходы) на существующую БД не переносятся. Пока
+    определение в БД отличается от кода, при каждом запуске в лог пишется
+    предупреждение, а новый хэш не сохраняется.
+
+    Args:
+        stored_seed_hash (Optional[str]): Хэш, сохраненный в schema_meta;
+            если он совпадает с текущим, обращения к БД не происходит.
+    """
+    positions = {question_id: idx for idx, question_id in enumerate(QUESTIONS)}
+    questions = [
+        {
+            "key": question.key,
+            "field_name": question.field_name,
+            "options": question.options,
+            "weights": question.weights,
+            "next_position": positions.get(question.next_question),
+            "checkpoint_key": question.checkpoint_key,
+        }
+        for question in QUESTIONS.values()
+    ]
+
+    current_hash = seed_hash({"slug": DEFAULT_SURVEY, "questions": questions})
+    if current_hash == stored_seed_hash:
+        return
+
+    if await seed_survey(DEFAULT_SURVEY, "Оценка шансов на субсидию", questions):
+        await set_schema_meta({"survey_seed": current_hash})
+
+
 async def get_final_message(is_under_25: bool) -> str:
     """Генерирует финальное сообщение в зависимости от возраста пользователя."""
     base_message = await get_message("survey_final_base", category="survey")
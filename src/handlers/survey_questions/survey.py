@@ -1,24 +1,32 @@
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery, User
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from typing import Optional, Tuple
 from src.config.config import settings
 from src.database.using_data import (
     save_survey_answer,
     finalize_survey,
-    get_user_survey,
 )
-from .questions import QUESTIONS, get_final_message
+from .questions import (
+    DEFAULT_SURVEY,
+    CompiledSurvey,
+    SurveyState,
+    get_survey,
+    get_final_message,
+)
 from src.utils.logging import write_logs
+from src.utils.publisher import publisher
+from src.utils.tasks import run_in_background
 from src.keyboards.inlinebutton import (
     get_final_keyboard,
     new_message,
-    get_keyboard,
     get_general_menu,
     get_continue_keyboard,
+    SurveyAnswerCallback,
 )
 from src.utils.localization import get_message
-import os
+from src.utils.assets import assets
 
 
 router = Router()
@@ -29,163 +37,265 @@ class SurveyStates(StatesGroup):
     MID_SURVEY = State()
 
 
-async def get_final_survey_message(user_id: int) -> str:
-    """Получает финальное сообщение на основе ответов пользователя.
+async def get_current_state(
+    state: FSMContext,
+) -> Tuple[Optional[CompiledSurvey], Optional[SurveyState]]:
+    """Возвращает текущий опрос и вопрос пользователя из FSM.
 
     Args:
-        user_id (int): ID пользователя.
+        state (FSMContext): Контекст состояния опроса.
 
     Returns:
-        str: Финальное сообщение.
+        Tuple[Optional[CompiledSurvey], Optional[SurveyState]]: Опрос и текущий
+            вопрос или (None, None), если состояние некорректно.
+    """
+    data = await state.get_data()
+    survey = await get_survey(data.get("survey", DEFAULT_SURVEY))
+    state_idx = data.get("state")
+
+    if survey is None or state_idx is None or not 0 <= state_idx < len(survey.states):
+        return None, None
+
+    return survey, survey.states[state_idx]
+
+
+async def send_question(
+    message: Message, state: FSMContext, survey: CompiledSurvey, state_idx: int
+) -> None:
+    """Переводит пользователя на вопрос state_idx и отправляет его.
+
+    Args:
+        message (Message): Сообщение, в чат которого отправляется вопрос.
+        state (FSMContext): Контекст состояния опроса.
+        survey (CompiledSurvey): Текущий опрос.
+        state_idx (int): Индекс состояния (вопроса) в опросе.
     """
-    survey = await get_user_survey(user_id)
-    if not survey:
-        return await get_final_message(False)
+    question = survey.states[state_idx]
+    await state.update_data(survey=survey.slug, state=state_idx)
+    await message.answer(await question.get_text(), reply_markup=question.keyboard)
 
-    is_under_25 = survey.is_under_25 == "Да"
-    return await get_final_message(is_under_25)
+
+async def remember_answer(state: FSMContext, field_name: str, answer: str) -> None:
+    """Сохраняет ответ в данных FSM, чтобы финальный шаг обходился без БД."""
+    data = await state.get_data()
+    answers = {**data.get("answers", {}), field_name: answer}
+    await state.update_data(answers=answers)
+
+
+async def persist_completed_survey(
+    user: User,
+    survey: CompiledSurvey,
+    question: SurveyState,
+    answer: str,
+    option_idx: Optional[int],
+) -> None:
+    """Сохраняет последний ответ, завершает опрос и ставит пост в канал.
+
+    Выполняется в фоне после того, как пользователь получил финальное сообщение.
+    """
+    await save_survey_answer(
+        user.id,
+        question.field_name,
+        answer,
+        question_idx=question.index,
+        option_idx=option_idx,
+        definition_id=survey.id,
+        include_legacy=survey.slug == DEFAULT_SURVEY,
+    )
+
+    user_results = await finalize_survey(
+        user.id,
+        user.username,
+        survey.states,
+        survey.id,
+        include_legacy=survey.slug == DEFAULT_SURVEY,
+    )
+    if user_results and settings.config.channel_id:
+        await publisher.publish(settings.config.channel_id, user_results)
+
+    await write_logs("info", f"Survey completed successfully for user {user.id}")
+
+
+async def complete_survey(
+    message: Message,
+    user: User,
+    state: FSMContext,
+    survey: CompiledSurvey,
+    question: SurveyState,
+    answer: str,
+    option_idx: Optional[int] = None,
+) -> None:
+    """Отправляет пользователю финальное сообщение, а сохранение уводит в фон.
+
+    Финальное сообщение строится по ответам из FSM, без обращения к БД;
+    сохранение ответа, завершение опроса и пост в канал выполняются
+    фоновой задачей с записью ошибок в лог. Задача запускается до отправки
+    ответа, поэтому лид сохраняется, даже если отправить сообщение не удалось
+    (бот заблокирован, сбой сети, flood wait).
+
+    Args:
+        message (Message): Сообщение, в чат которого отправляется ответ.
+        user (User): Пользователь, прошедший опрос.
+        state (FSMContext): Контекст состояния опроса.
+        survey (CompiledSurvey): Текущий опрос.
+        question (SurveyState): Последний вопрос опроса.
+        answer (str): Ответ на последний вопрос.
+        option_idx (Optional[int]): Индекс выбранного варианта ответа.
+    """
+    data = await state.get_data()
+    answers = {**data.get("answers", {}), question.field_name: answer}
+    run_in_background(
+        persist_completed_survey(user, survey, question, answer, option_idx),
+        name=f"complete-survey-{user.id}",
+    )
+    await state.clear()
+
+    final_message = await get_final_message(answers.get("is_under_25") == "Да")
+
+    # The image is checked and loaded into memory at startup
+    final_image = assets.get("final.JPG")
+    sent = await message.answer_photo(
+        photo=final_image.input_file(),
+        caption=final_message,
+        reply_markup=await get_final_keyboard(),
+    )
+    final_image.remember(sent)
 
 
 @router.message(SurveyStates.ANSWERING)
 async def process_text_answer(message: Message, state: FSMContext):
     """Обрабатывает текстовые ответы на вопросы опроса."""
     try:
-        data = await state.get_data()
-        current_question_id = data.get("current_question")
+        survey, current_question = await get_current_state(state)
 
-        if not current_question_id:
+        if current_question is None:
             await state.clear()
             await message.answer(await get_message("error_survey"))
             return
 
-        current_question = QUESTIONS[current_question_id]
-
         if current_question.options:
             # Повторно отправляем текущий вопрос вместо select_answer
-            question_text = await current_question.get_text()
             await message.answer(
-                question_text,
-                reply_markup=await get_keyboard(current_question.options),
+                await current_question.get_text(),
+                reply_markup=current_question.keyboard,
             )
             return
 
-        await save_survey_answer(
-            message.from_user.id, current_question.field_name, message.text
-        )
-
         if current_question.is_last:
-            user_results = await finalize_survey(
-                message.from_user.id, message.from_user.username
+            await complete_survey(
+                message,
+                message.from_user,
+                state,
+                survey,
+                current_question,
+                message.text,
             )
-            if user_results and settings.config.channel_id:
-                await message.chat.bot.send_message(
-                    settings.config.channel_id, user_results
-                )
-
-            final_message = await get_final_survey_message(message.from_user.id)
-            await message.answer(final_message, reply_markup=await get_final_keyboard())
-            await state.clear()
             return
 
-        next_question = QUESTIONS[current_question.next_question]
-        await state.update_data(current_question=current_question.next_question)
-
-        question_text = await next_question.get_text()
-        await message.answer(
-            question_text, reply_markup=await get_keyboard(next_question.options)
+        await save_survey_answer(
+            message.from_user.id,
+            current_question.field_name,
+            message.text,
+            question_idx=current_question.index,
+            definition_id=survey.id,
+            include_legacy=survey.slug == DEFAULT_SURVEY,
         )
+        await remember_answer(state, current_question.field_name, message.text)
+
+        await send_question(message, state, survey, current_question.next_state)
 
     except Exception as e:
         await write_logs("error", f"Error in process_text_answer: {str(e)}")
         await message.answer(await get_message("error_survey"))
 
 
-@router.callback_query(SurveyStates.ANSWERING)
-async def process_survey_answer(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(SurveyStates.ANSWERING, SurveyAnswerCallback.filter())
+async def process_survey_answer(
+    callback: CallbackQuery, callback_data: SurveyAnswerCallback, state: FSMContext
+):
     """
     Обрабатывает ответы на вопросы опроса, полученные через кнопки.
 
     Args:
         callback (CallbackQuery): Объект CallbackQuery, содержащий информацию о нажатой кнопке и пользователе.
+        callback_data (SurveyAnswerCallback): Индексы вопроса и выбранного варианта.
         state (FSMContext): Контекст состояния для управления состоянием опроса.
 
     Returns:
         None: Функция ничего не возвращает, но обновляет состояние и отправляет сообщения.
     """
     try:
-        data = await state.get_data()
-        current_question_id = data.get("current_question")
+        survey, current_question = await get_current_state(state)
 
-        if not current_question_id:
-            await write_logs("error", "No current question ID found in state")
+        if current_question is None:
+            await write_logs("error", "No current survey state found in FSM")
             await state.clear()
             await callback.message.answer(await get_message("error_survey"))
             return
 
-        current_question = QUESTIONS[current_question_id]
-
-        await save_survey_answer(
-            callback.from_user.id, current_question.field_name, callback.data
-        )
-
-        await callback.message.edit_reply_markup(reply_markup=None)
+        # Кнопка от уже отвеченного вопроса — игнорируем
+        if callback_data.q != current_question.index:
+            await callback.answer()
+            return
 
-        # Check if we're at the mid-point of the survey
-        if current_question_id == "work_plan":  # This is the mid-point question
-            await state.set_state(SurveyStates.MID_SURVEY)
-            await callback.message.answer(
-                await get_message("mid_survey", category="survey"),
-                reply_markup=await get_continue_keyboard(),
+        answer = current_question.decode_option(callback_data.o)
+        if answer is None:
+            await write_logs(
+                "warning", f"Unknown survey option in callback: {callback.data}"
             )
+            await callback.answer()
             return
 
         if current_question.is_last:
             try:
-                user_results = await finalize_survey(
-                    callback.from_user.id, callback.from_user.username
-                )
-                if user_results and settings.config.channel_id:
-                    await callback.message.chat.bot.send_message(
-                        settings.config.channel_id, user_results
-                    )
-
-                final_message = await get_final_survey_message(callback.from_user.id)
-
-                # Check if the final image exists
-                final_image_path = "./content/final.JPG"
-                if not os.path.exists(final_image_path):
-                    await write_logs(
-                        "error", f"Final image not found at {final_image_path}"
-                    )
-                    # Send message without image if image is missing
-                    await callback.message.answer(
-                        "final_message",
-                        reply_markup=await get_final_keyboard(),
-                    )
-                else:
-                    # Send message with image
-                    await callback.message.answer_photo(
-                        photo=FSInputFile(final_image_path),
-                        caption=final_message,
-                        reply_markup=await get_final_keyboard(),
-                    )
-
-                await state.clear()
-                await write_logs(
-                    "info",
-                    f"Survey completed successfully for user {callback.from_user.id}",
+                # Финальное сообщение — первым, остальное после него
+                await complete_survey(
+                    callback.message,
+                    callback.from_user,
+                    state,
+                    survey,
+                    current_question,
+                    answer,
+                    callback_data.o,
                 )
             except Exception as e:
                 await write_logs("error", f"Error in survey completion: {str(e)}")
                 await callback.message.answer(await get_message("error_survey"))
-        else:
-            next_question = QUESTIONS[current_question.next_question]
-            await state.update_data(current_question=current_question.next_question)
+            try:
+                await callback.answer()
+                await callback.message.edit_reply_markup(reply_markup=None)
+            except Exception as e:
+                # Устаревший callback или уже измененное сообщение: опрос
+                # к этому моменту завершен, ошибка только косметическая
+                await write_logs("warning", f"Error closing survey keyboard: {str(e)}")
+            return
+
+        await callback.message.edit_reply_markup(reply_markup=None)
 
-            question_text = await next_question.get_text()
+        await save_survey_answer(
+            callback.from_user.id,
+            current_question.field_name,
+            answer,
+            question_idx=callback_data.q,
+            option_idx=callback_data.o,
+            definition_id=survey.id,
+            include_legacy=survey.slug == DEFAULT_SURVEY,
+        )
+        await remember_answer(state, current_question.field_name, answer)
+
+        # Промежуточная точка опроса задается в его определении
+        if current_question.checkpoint_key:
+            await state.set_state(SurveyStates.MID_SURVEY)
             await callback.message.answer(
-                question_text, reply_markup=await get_keyboard(next_question.options)
+                await get_message(current_question.checkpoint_key, category="survey"),
+                reply_markup=await get_continue_keyboard(),
             )
+            await callback.answer()
+            return
+
+        await send_question(
+            callback.message, state, survey, current_question.next_state
+        )
 
         await callback.answer()
 
@@ -202,28 +312,20 @@ async def continue_survey(callback: CallbackQuery, state: FSMContext):
         # Устанавливаем состояние обратно в ANSWERING
         await state.set_state(SurveyStates.ANSWERING)
 
-        # Получаем следующий вопрос после work_plan (который вызвал mid-survey)
-        # Следующий вопрос после work_plan теперь subsidy_interest
-        next_question_id = QUESTIONS["work_plan"].next_question
+        # В FSM остался вопрос, после которого была промежуточная точка
+        survey, checkpoint_question = await get_current_state(state)
 
-        if next_question_id not in QUESTIONS:
+        if checkpoint_question is None or checkpoint_question.is_last:
             await write_logs(
-                "error",
-                f"Next question ID {next_question_id} not found in QUESTIONS after mid-survey.",
+                "error", "No question to continue with after mid-survey message."
             )
             await callback.message.answer(await get_message("error_survey"))
             await callback.answer()
             return
 
-        next_question = QUESTIONS[next_question_id]
-
-        # Обновляем текущий вопрос в состоянии
-        await state.update_data(current_question=next_question_id)
-
         # Отправляем следующий вопрос
-        question_text = await next_question.get_text()
-        await callback.message.answer(
-            question_text, reply_markup=await get_keyboard(next_question.options)
+        await send_question(
+            callback.message, state, survey, checkpoint_question.next_state
         )
 
         await callback.answer()
@@ -277,19 +379,13 @@ async def send_guide(callback: CallbackQuery):
             f"Attempting to send guide to user {callback.from_user.id} from send_guide handler.",
         )
 
-        # Проверяем существование файла
-        file_path = "./content/guide.pdf"
-        if not os.path.exists(file_path):
-            await write_logs("error", f"Guide file not found at {file_path}")
-            await callback.message.answer("Извините, файл гайда временно недоступен.")
-            await callback.answer()
-            return
-
-        # Отправляем PDF файл
-        await callback.message.answer_document(
-            document=FSInputFile(file_path),
+        # Отправляем PDF файл (наличие проверено при запуске)
+        guide = assets.get("guide.pdf")
+        sent = await callback.message.answer_document(
+            document=guide.input_file(),
             caption="📚 Ваш гайд по получению субсидии",
         )
+        guide.remember(sent)
         await write_logs(
             "info", f"Guide successfully sent to user {callback.from_user.id}"
         )
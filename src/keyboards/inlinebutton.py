@@ -6,18 +6,47 @@ from aiogram.utils.keyboard import (
 from src.utils.logging import write_logs
 from aiogram.types import InlineKeyboardButton as TypesInlineKeyboardButton
 from aiogram.types import Message
-from typing import List, Optional
+from aiogram.filters.callback_data import CallbackData
+from typing import Iterable, List, Optional
 from src.config.config import settings  # Импортируем settings
 
 
-async def get_general_menu() -> InlineKeyboardMarkup:
-    """
-    Создает клавиатуру общего меню с кнопками для прохождения опроса и доступа к FAQ.
+class SurveyAnswerCallback(CallbackData, prefix="sa"):
+    """Компактные данные кнопки ответа: индекс вопроса и индекс варианта.
 
-    Returns:
-        InlineKeyboardMarkup: Клавиатура с кнопками.
+    Упаковывается в строку вида ``sa:3:1`` вместо полного текста варианта,
+    что укладывается в лимит Telegram в 64 байта при любой длине ответов.
     """
-    keyboard = [
+
+    q: int
+    o: int
+
+
+class MailingSegmentCallback(CallbackData, prefix="ms"):
+    """Выбор аудитории рассылки по имени предустановленного сегмента."""
+
+    name: str
+
+
+class ScheduledMailingCallback(CallbackData, prefix="sm"):
+    """Действие с запланированной рассылкой."""
+
+    action: str
+    id: int
+
+
+class MailingReportCallback(CallbackData, prefix="mr"):
+    """Выгрузка отчета о рассылке: action — summary, png или csv."""
+
+    action: str
+    id: int
+
+
+# Реестр клавиатур: разметка строится один раз и затем переиспользуется.
+# Pydantic не перепроверяет уже созданные экземпляры моделей, поэтому
+# повторная отправка одной и той же клавиатуры обходится без валидации.
+_GENERAL_MENU = InlineKeyboardMarkup(
+    inline_keyboard=[
         [
             TypesInlineKeyboardButton(text="📝 Пройти опрос", callback_data="Survey"),
             TypesInlineKeyboardButton(
@@ -25,72 +54,51 @@ async def get_general_menu() -> InlineKeyboardMarkup:
             ),
         ],
     ]
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
-
-
-async def get_mailing_keyboard() -> InlineKeyboardMarkup:
-    """Создает клавиатуру для рассылки."""
-    keyboard = InlineKeyboardMarkup(row_width=1)
-    keyboard.add(
-        InlineKeyboardButton(
-            text="✅ Подтвердить рассылку", callback_data="confirm_mailing"
-        ),
-        InlineKeyboardButton(
-            text="❌ Отменить рассылку", callback_data="cancel_mailing"
-        ),
-    )
-    return keyboard
-
-
-async def get_admin_keyboard() -> InlineKeyboardMarkup:
-    """Создает клавиатуру для администратора.
+)
 
-    Returns:
-        InlineKeyboardMarkup: Клавиатура с кнопками администратора.
-    """
-    keyboard = [
+_ADMIN_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
         [
             TypesInlineKeyboardButton(
                 text="📊 Статистика активности", callback_data="admin_activity_stats"
             )
         ],
+        [
+            TypesInlineKeyboardButton(
+                text="📉 История активности", callback_data="admin_activity_history"
+            )
+        ],
+        [
+            TypesInlineKeyboardButton(
+                text="📆 Когорты и удержание", callback_data="admin_cohorts"
+            )
+        ],
         [
             TypesInlineKeyboardButton(
                 text="👥 Статистика пользователей", callback_data="admin_user_stats"
             )
         ],
+        [
+            TypesInlineKeyboardButton(
+                text="🔥 Лучшие лиды сегодня", callback_data="admin_top_leads"
+            )
+        ],
         [TypesInlineKeyboardButton(text="📨 Рассылка", callback_data="admin_mailing")],
+        [
+            TypesInlineKeyboardButton(
+                text="⏰ Запланированные рассылки", callback_data="admin_scheduled"
+            )
+        ],
+        [
+            TypesInlineKeyboardButton(
+                text="📈 Отчеты о рассылках", callback_data="admin_mailing_reports"
+            )
+        ],
     ]
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
-
-
-async def get_keyboard(options: list[str] | None = None) -> InlineKeyboardMarkup | None:
-    """
-    Создает клавиатуру с кнопками на основе предоставленных вариантов ответов.
-
-    Args:
-        options (list[str] | None): Список вариантов ответов. Если None, возвращает None.
-
-    Returns:
-        InlineKeyboardMarkup | None: Клавиатура с кнопками или None, если вариантов нет.
-    """
-    if not options:
-        return None  # Возвращаем None для вопросов без вариантов ответа
-
-    buttons = [
-        [InlineKeyboardButton(text=option, callback_data=option)] for option in options
-    ]
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-
-async def get_final_keyboard() -> InlineKeyboardMarkup:
-    """
-    Создает финальную клавиатуру с кнопками для завершения опроса.
+)
 
-    Returns:
-        InlineKeyboardMarkup: Клавиатура с финальными кнопками.
-    """
-    keyboard = [
+_FINAL_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
         [
             InlineKeyboardButton(
                 text="1️⃣ Начать подготовку документов",
@@ -105,23 +113,122 @@ async def get_final_keyboard() -> InlineKeyboardMarkup:
         ],
         [InlineKeyboardButton(text="4️⃣ FAQ", url="https://telegra.ph/CHasto-zadavaemye-voprosy-FAQ-06-02")],
     ]
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+)
 
+_CONTINUE_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text="Продолжить оценку шансов", callback_data="continue_survey"
+            )
+        ]
+    ]
+)
 
-async def get_continue_keyboard() -> InlineKeyboardMarkup:
-    """Создает клавиатуру с кнопкой продолжения опроса."""
-    keyboard = InlineKeyboardMarkup(
+def build_options_keyboard(
+    question_idx: int, options: Iterable[str]
+) -> InlineKeyboardMarkup:
+    """
+    Строит клавиатуру с вариантами ответа (по одной кнопке в строке).
+
+    Вызывается при компиляции опроса, после чего обработчики получают
+    готовый экземпляр разметки вместе с вопросом.
+
+    Args:
+        question_idx (int): Индекс вопроса, кодируемый в callback_data кнопок.
+        options (Iterable[str]): Варианты ответа.
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с вариантами ответа.
+    """
+    buttons = [
+        [
+            InlineKeyboardButton(
+                text=option,
+                callback_data=SurveyAnswerCallback(q=question_idx, o=option_idx).pack(),
+            )
+        ]
+        for option_idx, option in enumerate(options)
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_report_keyboard(report_id: Optional[int]) -> Optional[InlineKeyboardMarkup]:
+    """
+    Строит клавиатуру выгрузки отчета о рассылке.
+
+    Args:
+        report_id (Optional[int]): Идентификатор отчета.
+
+    Returns:
+        Optional[InlineKeyboardMarkup]: Клавиатура или None, если отчет не сохранен.
+    """
+    if report_id is None:
+        return None
+    return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text="Продолжить оценку шансов", callback_data="continue_survey"
-                )
+                    text="📈 График",
+                    callback_data=MailingReportCallback(action="png", id=report_id).pack(),
+                ),
+                InlineKeyboardButton(
+                    text="📄 CSV",
+                    callback_data=MailingReportCallback(action="csv", id=report_id).pack(),
+                ),
             ]
         ]
     )
+
+
+async def get_general_menu() -> InlineKeyboardMarkup:
+    """
+    Возвращает клавиатуру общего меню с кнопками для прохождения опроса и доступа к FAQ.
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопками.
+    """
+    return _GENERAL_MENU
+
+
+async def get_mailing_keyboard() -> InlineKeyboardMarkup:
+    """Создает клавиатуру для рассылки."""
+    keyboard = InlineKeyboardMarkup(row_width=1)
+    keyboard.add(
+        InlineKeyboardButton(
+            text="✅ Подтвердить рассылку", callback_data="confirm_mailing"
+        ),
+        InlineKeyboardButton(
+            text="❌ Отменить рассылку", callback_data="cancel_mailing"
+        ),
+    )
     return keyboard
 
 
+async def get_admin_keyboard() -> InlineKeyboardMarkup:
+    """Возвращает клавиатуру для администратора.
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопками администратора.
+    """
+    return _ADMIN_KEYBOARD
+
+
+async def get_final_keyboard() -> InlineKeyboardMarkup:
+    """
+    Возвращает финальную клавиатуру с кнопками для завершения опроса.
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с финальными кнопками.
+    """
+    return _FINAL_KEYBOARD
+
+
+async def get_continue_keyboard() -> InlineKeyboardMarkup:
+    """Возвращает клавиатуру с кнопкой продолжения опроса."""
+    return _CONTINUE_KEYBOARD
+
+
 async def new_message(
     message: Message,
     text: str,
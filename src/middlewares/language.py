@@ -0,0 +1,68 @@
+from dataclasses import replace
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.types import TelegramObject
+
+from src.utils.localization import (
+    current_language,
+    is_snapshot_ready,
+    load_messages,
+    resolve_language,
+)
+from src.utils.logging import write_logs
+
+# Язык хранится под отдельным ключом хранилища FSM, чтобы state.clear()
+# в обработчиках опроса и админки его не стирал
+LANGUAGE_DESTINY = "language"
+
+
+class LanguageMiddleware(BaseMiddleware):
+    """Определяет язык пользователя и делает его текущим для get_message.
+
+    Язык вычисляется из language_code профиля Telegram один раз и
+    сохраняется в хранилище FSM. На время обработки обновления он
+    записывается в current_language, поэтому обработчикам не нужно
+    передавать язык в каждый вызов get_message; он также доступен
+    обработчикам как аргумент language. Язык сохраняется только после
+    загрузки сообщений из БД: до этого поддерживаемые языки неизвестны,
+    и пользователь навсегда получил бы язык по умолчанию.
+    """
+
+    async def _get_language(
+        self, state: Optional[FSMContext], language_code: Optional[str]
+    ) -> str:
+        if state is None:
+            return resolve_language(language_code)
+
+        key = replace(state.key, destiny=LANGUAGE_DESTINY)
+        language = (await state.storage.get_data(key)).get("language")
+        if language is None:
+            # До загрузки сообщений известен только язык по умолчанию
+            try:
+                await load_messages()
+            except Exception as e:
+                await write_logs("warning", f"Error loading messages: {str(e)}")
+            language = resolve_language(language_code)
+            if is_snapshot_ready():
+                await state.storage.set_data(key, {"language": language})
+        return language
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        language = await self._get_language(data.get("state"), user.language_code)
+        data["language"] = language
+        token = current_language.set(language)
+        try:
+            return await handler(event, data)
+        finally:
+            current_language.reset(token)
@@ -0,0 +1,118 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from src.utils.logging import write_logs
+
+# Токенов в секунду и максимальный всплеск на одного пользователя
+USER_RATE = 2.0
+USER_BURST = 5
+# Сколько секунд повторное нажатие той же кнопки считается дублем
+DEDUP_TTL = 3.0
+# Пользователь без активности дольше этого времени удаляется из памяти
+BUCKET_IDLE_TTL = 600.0
+# Жесткие ограничения на размер структур в памяти
+MAX_BUCKETS = 50_000
+MAX_DEDUP_KEYS = 100_000
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Ограничивает частоту обновлений от пользователя и гасит двойные нажатия.
+
+    Регистрируется как outer middleware, поэтому отброшенные обновления не
+    доходят ни до фильтров, ни до обработчиков, ни до базы данных.
+    Повторные callback-запросы подтверждаются, чтобы у пользователя
+    не "крутилась" кнопка.
+    """
+
+    def __init__(
+        self,
+        rate: float = USER_RATE,
+        burst: int = USER_BURST,
+        dedup_ttl: float = DEDUP_TTL,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.dedup_ttl = dedup_ttl
+        # user_id -> (токены, время последнего обновления, ограничен ли сейчас)
+        self._buckets: "OrderedDict[int, Tuple[float, float, bool]]" = OrderedDict()
+        # (user_id, message_id, data) -> время истечения
+        self._seen: "OrderedDict[Tuple[int, int, str], float]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        """Удаляет устаревшие записи; порядок вставки совпадает с порядком времени."""
+        while self._seen and (
+            next(iter(self._seen.values())) <= now or len(self._seen) > MAX_DEDUP_KEYS
+        ):
+            self._seen.popitem(last=False)
+
+        while self._buckets and (
+            now - next(iter(self._buckets.values()))[1] > BUCKET_IDLE_TTL
+            or len(self._buckets) > MAX_BUCKETS
+        ):
+            self._buckets.popitem(last=False)
+
+    def _is_duplicate(self, key: Tuple[int, int, str], now: float) -> bool:
+        expires_at = self._seen.get(key)
+        if expires_at is not None and expires_at > now:
+            return True
+        self._seen[key] = now + self.dedup_ttl
+        self._seen.move_to_end(key)
+        return False
+
+    def _allow(self, user_id: int, now: float) -> Tuple[bool, bool]:
+        """Расходует токен пользователя.
+
+        Returns:
+            Tuple[bool, bool]: Пропускать ли обновление и является ли отказ
+                первым после пропущенного обновления (начало ограничения).
+        """
+        tokens, updated, throttled = self._buckets.pop(
+            user_id, (float(self.burst), now, False)
+        )
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[user_id] = (tokens, now, not allowed)  # В конец: самый свежий
+        return allowed, not allowed and not throttled
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        self._evict(now)
+
+        if isinstance(event, CallbackQuery):
+            message_id = event.message.message_id if event.message else 0
+            if self._is_duplicate((user.id, message_id, event.data or ""), now):
+                await event.answer()
+                return None
+
+        if isinstance(event, Message) and event.media_group_id:
+            # Альбом приходит пачкой сообщений: лимит расходует только первая часть
+            album_key = (user.id, 0, f"album:{event.media_group_id}")
+            if self._is_duplicate(album_key, now):
+                return await handler(event, data)
+
+        allowed, throttling_started = self._allow(user.id, now)
+        if not allowed:
+            # Пишем в лог один раз за серию отброшенных обновлений, иначе
+            # флуд пользователя превращается во флуд логов
+            if throttling_started:
+                await write_logs("warning", f"Throttling updates from user {user.id}")
+            if isinstance(event, CallbackQuery):
+                await event.answer()
+            return None
+
+        return await handler(event, data)
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from src.database.snapshots import get_activity_history, take_activity_snapshots
+from src.utils.charts import render_activity_chart, render_in_process
+from src.utils.logging import write_logs
+
+# Глубина истории на графике, дней
+HISTORY_DAYS = 90
+# Снимок за прошедший день делается с небольшим запасом после полуночи UTC
+SNAPSHOT_DELAY = timedelta(minutes=5)
+
+# (день, PNG): график меняется только после нового снимка
+_chart_cache: Optional[Tuple[date, bytes]] = None
+_chart_lock = asyncio.Lock()
+_snapshot_task: Optional[asyncio.Task] = None
+
+
+async def snapshot_now() -> None:
+    """Сохраняет недостающие снимки и сбрасывает кэш графика, если они появились."""
+    global _chart_cache
+    if await take_activity_snapshots(datetime.utcnow().date()):
+        _chart_cache = None
+
+
+async def _snapshot_loop() -> None:
+    while True:
+        try:
+            await snapshot_now()
+        except Exception as e:
+            await write_logs("error", f"Error taking activity snapshots: {str(e)}")
+
+        now = datetime.utcnow()
+        next_run = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        await asyncio.sleep((next_run + SNAPSHOT_DELAY - now).total_seconds())
+
+
+def start_activity_snapshots() -> None:
+    """Запускает ежедневное сохранение снимков активности."""
+    global _snapshot_task
+    if _snapshot_task is None:
+        _snapshot_task = asyncio.create_task(_snapshot_loop(), name="activity-snapshots")
+
+
+async def stop_activity_snapshots() -> None:
+    """Останавливает сохранение снимков при завершении бота."""
+    global _snapshot_task
+    if _snapshot_task is not None:
+        _snapshot_task.cancel()
+        try:
+            await _snapshot_task
+        except asyncio.CancelledError:
+            pass
+        _snapshot_task = None
+
+
+async def get_activity_chart() -> Optional[bytes]:
+    """Возвращает PNG с историей активности за HISTORY_DAYS дней.
+
+    График строится в отдельном процессе не чаще раза в день; одновременные
+    запросы ждут одну отрисовку.
+
+    Returns:
+        Optional[bytes]: PNG или None, если снимков еще нет.
+    """
+    global _chart_cache
+    today = datetime.utcnow().date()
+
+    async with _chart_lock:
+        if _chart_cache and _chart_cache[0] == today:
+            return _chart_cache[1]
+
+        snapshots = await get_activity_history(HISTORY_DAYS)
+        if not snapshots:
+            return None
+
+        history: Dict[str, list] = {
+            "days": [snapshot.day.isoformat() for snapshot in snapshots],
+            "dau": [snapshot.daily_active_users for snapshot in snapshots],
+            "wau": [snapshot.weekly_active_users for snapshot in snapshots],
+            "mau": [snapshot.monthly_active_users for snapshot in snapshots],
+            "surveys": [snapshot.daily_surveys for snapshot in snapshots],
+            "new_users": [snapshot.new_users for snapshot in snapshots],
+        }
+        png = await render_in_process(
+            render_activity_chart,
+            history,
+            f"Активность за {HISTORY_DAYS} дней (по {snapshots[-1].day:%d.%m.%Y})",
+        )
+        _chart_cache = (today, png)
+        return png
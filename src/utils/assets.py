@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+
+from aiogram.types import BufferedInputFile, FSInputFile, Message
+
+from src.utils.logging import write_logs
+
+# Корень проекта: src/utils/assets.py -> два уровня вверх от src
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+CONTENT_DIR = PROJECT_ROOT / "content"
+# Файлы крупнее этого размера отправляются с диска, а не держатся в памяти
+ASSET_MEMORY_LIMIT = 8 * 1024 * 1024
+# Файлы, без которых обработчики не работают; их отсутствие останавливает запуск
+REQUIRED_ASSETS = ("welcome.JPG", "final.JPG", "guide.pdf")
+
+
+@dataclass
+class Asset:
+    """
+    Файл из каталога content, подготовленный к отправке.
+
+    Атрибуты:
+        name (str): Путь относительно каталога content.
+        path (Path): Абсолютный путь к файлу.
+        size (int): Размер в байтах.
+        sha256 (str): Хэш содержимого.
+        data (Optional[bytes]): Содержимое, если файл меньше ASSET_MEMORY_LIMIT.
+        file_id (Optional[str]): file_id после первой отправки в Telegram.
+    """
+
+    name: str
+    path: Path
+    size: int
+    sha256: str
+    data: Optional[bytes] = None
+    file_id: Optional[str] = None
+
+    def input_file(self) -> Union[str, BufferedInputFile, FSInputFile]:
+        """Возвращает то, что передается в send_photo/send_document.
+
+        После первой отправки используется file_id, и Telegram не загружает
+        файл повторно; до нее — содержимое из памяти или файл с диска.
+        """
+        if self.file_id:
+            return self.file_id
+        if self.data is not None:
+            return BufferedInputFile(self.data, filename=Path(self.name).name)
+        return FSInputFile(self.path)
+
+    def remember(self, message: Optional[Message]) -> None:
+        """Сохраняет file_id из отправленного сообщения с этим файлом."""
+        if self.file_id or message is None:
+            return
+        if message.photo:
+            self.file_id = message.photo[-1].file_id
+        elif message.document:
+            self.file_id = message.document.file_id
+
+
+def _scan(directory: Path, memory_limit: int) -> Dict[str, Asset]:
+    """Читает и хэширует все файлы каталога (выполняется в отдельном потоке)."""
+    assets: Dict[str, Asset] = {}
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file():
+            continue
+        data = path.read_bytes()
+        name = path.relative_to(directory).as_posix()
+        assets[name] = Asset(
+            name=name,
+            path=path,
+            size=len(data),
+            sha256=hashlib.sha256(data).hexdigest(),
+            data=data if len(data) <= memory_limit else None,
+        )
+    return assets
+
+
+class AssetManifest:
+    """Манифест файлов каталога content.
+
+    Собирается один раз при запуске: все файлы проверяются, хэшируются и,
+    если не превышают ASSET_MEMORY_LIMIT, загружаются в память. Обработчики
+    получают готовый Asset по имени без обращений к файловой системе.
+    """
+
+    def __init__(self):
+        self._assets: Dict[str, Asset] = {}
+
+    async def load(
+        self,
+        directory: Path = CONTENT_DIR,
+        required: Sequence[str] = REQUIRED_ASSETS,
+        memory_limit: int = ASSET_MEMORY_LIMIT,
+    ) -> None:
+        """Собирает манифест.
+
+        Args:
+            directory (Path): Каталог с файлами.
+            required (Sequence[str]): Имена обязательных файлов.
+            memory_limit (int): Максимальный размер файла, хранимого в памяти.
+
+        Raises:
+            FileNotFoundError: Если каталога или обязательного файла нет.
+        """
+        if not directory.is_dir():
+            raise FileNotFoundError(f"Content directory not found: {directory}")
+
+        assets = await asyncio.to_thread(_scan, directory, memory_limit)
+        missing = [name for name in required if name not in assets]
+        if missing:
+            raise FileNotFoundError(
+                f"Missing content files in {directory}: {', '.join(missing)}"
+            )
+
+        self._assets = assets
+        in_memory = sum(asset.size for asset in assets.values() if asset.data)
+        await write_logs(
+            "info",
+            f"Loaded {len(assets)} content files ({in_memory / 1024:.0f} KB in memory): "
+            + ", ".join(f"{a.name}={a.sha256[:12]}" for a in assets.values()),
+        )
+
+    def get(self, name: str) -> Asset:
+        """Возвращает файл по имени относительно каталога content.
+
+        Raises:
+            KeyError: Если файла нет в манифесте.
+        """
+        return self._assets[name]
+
+
+assets = AssetManifest()
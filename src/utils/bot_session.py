@@ -0,0 +1,144 @@
+import asyncio
+import json
+import random
+from http import HTTPStatus
+from typing import Optional
+
+from aiohttp import ClientConnectorError, ConnectionTimeoutError
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import InputFile
+
+from src.config.config import settings
+from src.utils.logging import write_logs
+
+
+def _has_upload(method: TelegramMethod) -> bool:
+    """Загружает ли метод файл (в том числе внутри медиагруппы)."""
+    for _, value in method:
+        if isinstance(value, InputFile):
+            return True
+        if isinstance(value, list) and any(
+            isinstance(getattr(item, "media", None), InputFile) for item in value
+        ):
+            return True
+    return False
+
+
+def _is_safe_to_retry(method: TelegramMethod, error: Exception) -> bool:
+    """Можно ли повторить запрос, не рискуя выполнить метод дважды."""
+    # aiogram оборачивает ошибку aiohttp, исходная остается в __context__
+    if isinstance(error.__context__, (ClientConnectorError, ConnectionTimeoutError)):
+        return True  # Соединение не установлено: запрос не дошел до Telegram
+    # После таймаута чтения или 5xx Telegram мог уже выполнить запрос, поэтому
+    # остальные ошибки повторяются только для методов чтения (getMe, getFile, ...)
+    return method.__api_method__.startswith("get")
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """Сессия Bot API с настраиваемым пулом соединений, таймаутами и повторами.
+
+    Соединения с api.telegram.org переиспользуются (keep-alive), DNS
+    кэшируется на dns_ttl секунд, а число одновременных соединений
+    ограничено limit: во время рассылки лишние запросы ждут свободное
+    соединение в пуле, а не открывают новые сокеты. Загрузки файлов
+    получают отдельный, более длинный таймаут, чтобы медленная отправка
+    документа не задерживала обычные сообщения и не обрывалась раньше времени.
+
+    Временные ошибки повторяются до retries раз с экспоненциальной задержкой
+    и случайным разбросом (full jitter), чтобы повторы после сбоя не
+    приходили в Telegram одной волной. Повторяется только то, что нельзя
+    выполнить дважды: неудачная установка соединения для любого метода,
+    а таймауты, обрывы и ответы 5xx — только для методов get*. Отправку
+    сообщений после таких ошибок, как и TelegramRetryAfter, повторяют сами
+    рассылка и очередь публикаций — с учетом своих ограничителей скорости
+    и без дублей в канале.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 30,
+        request_timeout: float = 15,
+        upload_timeout: float = 120,
+        retries: int = 3,
+        backoff: float = 0.5,
+        api: TelegramAPIServer = PRODUCTION,
+    ):
+        """
+        Args:
+            limit (int): Максимум одновременных соединений с Bot API.
+            dns_ttl (int): Время жизни записи в кэше DNS, секунд.
+            keepalive_timeout (float): Сколько простаивающее соединение
+                остается открытым для повторного использования, секунд.
+            request_timeout (float): Таймаут обычного запроса, секунд.
+            upload_timeout (float): Таймаут запроса с загрузкой файла, секунд.
+            retries (int): Сколько раз повторять запрос после временной ошибки.
+            backoff (float): Базовая задержка перед повтором, секунд.
+            api (TelegramAPIServer): Адрес Bot API (для локального сервера и тестов).
+        """
+        super().__init__(limit=limit, api=api, timeout=request_timeout)
+        self._connector_init.update(
+            limit_per_host=limit,
+            ttl_dns_cache=dns_ttl,
+            keepalive_timeout=keepalive_timeout,
+        )
+        self.upload_timeout = upload_timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def check_response(
+        self, bot: Bot, method: TelegramMethod, status_code: int, content: str
+    ):
+        # Прокси и балансировщики отвечают на 502/504 HTML-страницей; без этой
+        # проверки такой ответ превратился бы в ошибку разбора, а не в 5xx
+        if status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            try:
+                json.loads(content)
+            except ValueError:
+                raise TelegramServerError(method=method, message=f"HTTP {status_code}")
+        return super().check_response(bot, method, status_code, content)
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int] = None,
+    ) -> TelegramType:
+        if timeout is None and _has_upload(method):
+            timeout = self.upload_timeout
+
+        attempt = 0
+        while True:
+            try:
+                return await super().make_request(bot, method, timeout)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                if attempt >= self.retries or not _is_safe_to_retry(method, e):
+                    raise
+                delay = random.uniform(0, self.backoff * 2**attempt)
+                attempt += 1
+                await write_logs(
+                    "warning",
+                    f"{type(method).__name__} failed ({e.message}), "
+                    f"retry {attempt}/{self.retries} in {delay:.2f}s",
+                )
+                await asyncio.sleep(delay)
+
+
+def create_bot_session() -> TunedAiohttpSession:
+    """Создает сессию бота с параметрами из настроек."""
+    config = settings.config
+    return TunedAiohttpSession(
+        limit=config.BOT_CONNECTION_LIMIT,
+        dns_ttl=config.BOT_DNS_CACHE_TTL,
+        keepalive_timeout=config.BOT_KEEPALIVE_TIMEOUT,
+        request_timeout=config.BOT_REQUEST_TIMEOUT,
+        upload_timeout=config.BOT_UPLOAD_TIMEOUT,
+        retries=config.BOT_RETRY_ATTEMPTS,
+        backoff=config.BOT_RETRY_BACKOFF,
+    )
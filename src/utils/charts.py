@@ -0,0 +1,158 @@
+"""Построение графиков для администратора.
+
+matplotlib тяжелый при импорте и рисует синхронно, поэтому графики
+строятся в отдельном процессе: функции отрисовки принимают и возвращают
+только простые данные (dict, bytes) и не трогают event loop бота.
+
+Процесс запускается методом spawn, а не fork: копия процесса бота с
+работающим event loop, открытыми соединениями и блокировками потоков
+может зависнуть или унаследовать чужие сокеты. Spawn-процесс стартует
+медленнее, поэтому пул прогревается при запуске бота (start_chart_workers),
+и первый график не ждет импорта matplotlib.
+"""
+
+import asyncio
+import io
+import multiprocessing
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def _warm_up() -> None:
+    """Импортирует matplotlib в процессе отрисовки заранее."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+
+def start_chart_workers() -> None:
+    """Запускает процесс отрисовки и импортирует в нем matplotlib.
+
+    Не ждет завершения: прогрев идет параллельно с запуском бота.
+    """
+    _get_executor().submit(_warm_up)
+
+
+async def render_in_process(func: Callable[..., bytes], *args) -> bytes:
+    """Выполняет функцию отрисовки в пуле процессов.
+
+    Args:
+        func (Callable[..., bytes]): Функция модуля верхнего уровня.
+        *args: Аргументы, которые можно сериализовать pickle.
+
+    Returns:
+        bytes: Результат функции (обычно PNG).
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_executor(), func, *args
+    )
+
+
+def shutdown_chart_workers() -> None:
+    """Останавливает процесс отрисовки при завершении бота."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _figure_to_png(figure) -> bytes:
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=120, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def render_mailing_chart(metrics: Dict, title: str) -> bytes:
+    """Рисует скорость отправки по секундам и гистограмму задержек.
+
+    Args:
+        metrics (Dict): Метрики из MailingMetrics.to_dict().
+        title (str): Заголовок графика.
+
+    Returns:
+        bytes: Изображение PNG.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    figure, (rate_ax, latency_ax) = plt.subplots(2, 1, figsize=(10, 7))
+    figure.suptitle(title)
+
+    seconds = range(len(metrics["sent"]))
+    rate_ax.plot(seconds, metrics["sent"], label="Отправлено", color="tab:green")
+    rate_ax.plot(seconds, metrics["failed"], label="Ошибки", color="tab:red")
+    rate_ax.set_xlabel("Секунда рассылки")
+    rate_ax.set_ylabel("Сообщений в секунду")
+    rate_ax.legend()
+    rate_ax.grid(alpha=0.3)
+
+    bounds = metrics["latency_bounds_ms"]
+    labels = [f"≤{bound}" for bound in bounds] + [f">{bounds[-1]}"]
+    latency_ax.bar(labels, metrics["latency_counts"], color="tab:blue")
+    latency_ax.set_xlabel("Задержка запроса, мс")
+    latency_ax.set_ylabel("Запросов")
+    latency_ax.tick_params(axis="x", rotation=45)
+
+    figure.tight_layout()
+    try:
+        return _figure_to_png(figure)
+    finally:
+        plt.close(figure)
+
+
+def render_activity_chart(history: Dict, title: str) -> bytes:
+    """Рисует DAU/WAU/MAU и число опросов по дням.
+
+    Args:
+        history (Dict): Списки days (ISO-даты), dau, wau, mau, surveys, new_users.
+        title (str): Заголовок графика.
+
+    Returns:
+        bytes: Изображение PNG.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+
+    days = [date.fromisoformat(day) for day in history["days"]]
+    figure, (users_ax, surveys_ax) = plt.subplots(
+        2, 1, figsize=(11, 7), sharex=True, gridspec_kw={"height_ratios": [3, 2]}
+    )
+    figure.suptitle(title)
+
+    users_ax.plot(days, history["mau"], label="MAU (30 дней)", color="tab:purple")
+    users_ax.plot(days, history["wau"], label="WAU (7 дней)", color="tab:blue")
+    users_ax.plot(days, history["dau"], label="DAU", color="tab:green")
+    users_ax.set_ylabel("Пользователей")
+    users_ax.legend(loc="upper left")
+    users_ax.grid(alpha=0.3)
+
+    surveys_ax.bar(days, history["surveys"], label="Опросов за день", color="tab:orange")
+    surveys_ax.plot(days, history["new_users"], label="Новых пользователей", color="tab:gray")
+    surveys_ax.set_ylabel("За день")
+    surveys_ax.legend(loc="upper left")
+    surveys_ax.grid(alpha=0.3)
+    surveys_ax.xaxis.set_major_formatter(mdates.DateFormatter("%d.%m"))
+
+    figure.tight_layout()
+    try:
+        return _figure_to_png(figure)
+    finally:
+        plt.close(figure)
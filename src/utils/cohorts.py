@@ -0,0 +1,298 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional, Tuple
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.formatting.rule import ColorScaleRule
+from openpyxl.styles import Alignment, Font
+from sqlalchemy import select, func
+
+from src.database.replica import create_read_session
+from src.database.settings_data import User, UserSurvey
+from src.utils.logging import write_logs
+
+# Сколько пользователей читается из БД за один запрос
+COHORT_CHUNK_SIZE = 50_000
+# Сколько недель после прихода отслеживается для каждой когорты
+RETENTION_WEEKS = 8
+# Сколько последних недельных когорт попадает в отчет
+COHORT_WEEKS = 26
+
+SECONDS_PER_WEEK = 7 * 24 * 3600
+# 1970-01-05 — первый понедельник эпохи Unix, недели считаются с понедельника
+_MONDAY_OFFSET = 4 * 24 * 3600
+# Значение int64 для NaT (нет даты)
+MISSING = np.iinfo(np.int64).min
+
+Arrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+@dataclass
+class RetentionMatrix:
+    """Недельные когорты и их удержание.
+
+    Атрибуты:
+        first_week (int): Номер первой недели когорт (недели с 1970-01-05).
+        sizes (np.ndarray): Размер каждой когорты, форма (когорты,).
+        returned (np.ndarray): Сколько пользователей когорты были активны
+            в неделю W+k или позже, форма (когорты, RETENTION_WEEKS + 1).
+        completed (np.ndarray): Сколько пользователей когорты завершили опрос
+            к концу недели W+k (нарастающим итогом), та же форма.
+        observed (np.ndarray): Наступила ли уже неделя W+k, та же форма.
+    """
+
+    first_week: int
+    sizes: np.ndarray
+    returned: np.ndarray
+    completed: np.ndarray
+    observed: np.ndarray
+
+    def week_start(self, cohort_idx: int) -> datetime:
+        """Понедельник недели когорты."""
+        seconds = (self.first_week + cohort_idx) * SECONDS_PER_WEEK + _MONDAY_OFFSET
+        return datetime(1970, 1, 1) + timedelta(seconds=int(seconds))
+
+
+def week_index(timestamps: np.ndarray) -> np.ndarray:
+    """Переводит секунды Unix в номера недель, начинающихся с понедельника."""
+    return (timestamps - _MONDAY_OFFSET) // SECONDS_PER_WEEK
+
+
+def to_seconds(values) -> np.ndarray:
+    """Переводит последовательность datetime (или None) в int64 секунд."""
+    return np.array(values, dtype="datetime64[s]").astype(np.int64)
+
+
+def build_retention_matrix(
+    first_seen: np.ndarray,
+    last_activity: np.ndarray,
+    completed_at: np.ndarray,
+    now: int,
+    horizon: int = RETENTION_WEEKS,
+) -> RetentionMatrix:
+    """Строит матрицу удержания векторными операциями NumPy.
+
+    Каждый пользователь превращается в плоский индекс ячейки
+    ``когорта * (horizon + 1) + смещение_недели``, после чего ячейки
+    считаются одним np.bincount без циклов по строкам.
+
+    Для возврата известна только последняя активность, поэтому ячейка
+    W+k показывает пользователей, последний раз активных в W+k или позже.
+
+    Args:
+        first_seen (np.ndarray): Время первого визита, int64 секунд.
+        last_activity (np.ndarray): Время последней активности, int64 секунд.
+        completed_at (np.ndarray): Время первого завершения опроса или MISSING.
+        now (int): Текущее время, секунд Unix.
+        horizon (int): Сколько недель после прихода учитывать.
+
+    Returns:
+        RetentionMatrix: Размеры когорт, возврат и завершение опроса.
+    """
+    width = horizon + 1
+    cohort_week = week_index(first_seen)
+    first_week = int(cohort_week.min())
+    cohort = cohort_week - first_week
+    cohorts = int(cohort.max()) + 1
+    cells = cohorts * width
+
+    sizes = np.bincount(cohort, minlength=cohorts)
+
+    # Некорректные данные (активность раньше первого визита) считаем неделей 0
+    last_offset = np.clip(week_index(last_activity) - cohort_week, 0, horizon)
+    last_hist = np.bincount(cohort * width + last_offset, minlength=cells).reshape(
+        cohorts, width
+    )
+    # Активен в W+k или позже = сумма гистограммы последней активности справа от k
+    returned = np.cumsum(last_hist[:, ::-1], axis=1)[:, ::-1]
+
+    has_completed = completed_at != MISSING
+    completed_offset = (
+        week_index(completed_at[has_completed]) - cohort_week[has_completed]
+    )
+    completed_offset = np.clip(completed_offset, 0, None)
+    in_horizon = completed_offset <= horizon
+    completed_hist = np.bincount(
+        cohort[has_completed][in_horizon] * width + completed_offset[in_horizon],
+        minlength=cells,
+    ).reshape(cohorts, width)
+    completed = np.cumsum(completed_hist, axis=1)
+
+    current_week = int(week_index(np.int64(now)))
+    observed = (
+        first_week + np.arange(cohorts)[:, None] + np.arange(width)[None, :]
+        <= current_week
+    )
+
+    return RetentionMatrix(first_week, sizes, returned, completed, observed)
+
+
+async def _iter_chunks(query, key_column) -> AsyncIterator[list]:
+    """Выполняет запрос страницами по COHORT_CHUNK_SIZE строк (keyset по key_column)."""
+    query = query.order_by(key_column).limit(COHORT_CHUNK_SIZE)
+    last_key = None
+    while True:
+        stmt = query if last_key is None else query.where(key_column > last_key)
+        async with create_read_session() as session:
+            rows = (await session.execute(stmt)).all()
+        if rows:
+            yield rows
+        if len(rows) < COHORT_CHUNK_SIZE:
+            return
+        last_key = rows[-1][0]
+
+
+async def load_cohort_arrays(since: datetime) -> Optional[Arrays]:
+    """Загружает пользователей, пришедших после since, в массивы int64.
+
+    Пользователи и первые завершения опроса читаются двумя потоками
+    страниц, отсортированными по user_id, и сопоставляются через
+    np.searchsorted без словарей и циклов по строкам.
+
+    Args:
+        since (datetime): Нижняя граница first_seen.
+
+    Returns:
+        Optional[Arrays]: first_seen, last_activity и completed_at (MISSING,
+            если опрос не завершен) в секундах Unix или None, если данных нет.
+    """
+    user_ids, first_seen, last_activity = [], [], []
+    users_query = select(User.user_id, User.first_seen, User.last_activity).where(
+        User.first_seen >= since
+    )
+    async for rows in _iter_chunks(users_query, User.user_id):
+        ids, first, last = zip(*rows)
+        user_ids.append(np.array(ids, dtype=np.int64))
+        first_seen.append(to_seconds(first))
+        last_activity.append(to_seconds(last))
+
+    if not user_ids:
+        return None
+
+    user_ids = np.concatenate(user_ids)
+    first_seen = np.concatenate(first_seen)
+    # Пустая last_activity (NaT) не может быть раньше первого визита
+    last_activity = np.maximum(np.concatenate(last_activity), first_seen)
+    completed_at = np.full(len(user_ids), MISSING, dtype=np.int64)
+
+    # Только пользователи когорт: объем чтения зависит от окна, а не от всей
+    # истории. Первое завершение не раньше первого визита, поэтому нижняя
+    # граница completed_at тоже since
+    completions_query = (
+        select(UserSurvey.user_id, func.min(UserSurvey.completed_at))
+        .join(User, User.user_id == UserSurvey.user_id)
+        .where(User.first_seen >= since, UserSurvey.completed_at >= since)
+        .group_by(UserSurvey.user_id)
+    )
+    async for rows in _iter_chunks(completions_query, UserSurvey.user_id):
+        ids, completed = zip(*rows)
+        ids = np.array(ids, dtype=np.int64)
+        positions = np.searchsorted(user_ids, ids)
+        positions = np.minimum(positions, len(user_ids) - 1)
+        found = user_ids[positions] == ids
+        completed_at[positions[found]] = to_seconds(completed)[found]
+
+    return first_seen, last_activity, completed_at
+
+
+async def get_retention_matrix() -> Optional[RetentionMatrix]:
+    """Загружает пользователей последних COHORT_WEEKS недель и строит матрицу.
+
+    Returns:
+        Optional[RetentionMatrix]: Матрица или None, если пользователей нет.
+    """
+    now = datetime.utcnow()
+    since = now - timedelta(weeks=COHORT_WEEKS)
+    since -= timedelta(days=since.weekday())  # С понедельника, без неполной когорты
+    since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    arrays = await load_cohort_arrays(since)
+    if arrays is None:
+        return None
+
+    now_seconds = int((now - datetime(1970, 1, 1)).total_seconds())
+    return build_retention_matrix(*arrays, now=now_seconds)
+
+
+def _write_heatmap(sheet, title: str, matrix: RetentionMatrix, values: np.ndarray):
+    """Записывает одну таблицу когорт в процентах с цветовой шкалой."""
+    width = values.shape[1]
+    sheet.append([title])
+    sheet["A1"].font = Font(bold=True, size=12)
+    sheet.append(
+        ["Неделя прихода", "Пользователей"] + [f"W+{k}" for k in range(width)]
+    )
+    for cell in sheet[2]:
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center")
+
+    share = values / np.maximum(matrix.sizes, 1)[:, None]
+    for cohort_idx, size in enumerate(matrix.sizes):
+        row = [matrix.week_start(cohort_idx).strftime("%d.%m.%Y"), int(size)]
+        for k in range(width):
+            observed = matrix.observed[cohort_idx, k] and size
+            row.append(round(float(share[cohort_idx, k]), 4) if observed else None)
+        sheet.append(row)
+
+    last_row = sheet.max_row
+    first_col, last_col = "C", chr(ord("C") + width - 1)
+    for row in sheet.iter_rows(min_row=3, min_col=3, max_row=last_row):
+        for cell in row:
+            cell.number_format = "0.0%"
+    sheet.conditional_formatting.add(
+        f"{first_col}3:{last_col}{last_row}",
+        ColorScaleRule(
+            start_type="num",
+            start_value=0,
+            start_color="F8696B",
+            mid_type="percentile",
+            mid_value=50,
+            mid_color="FFEB84",
+            end_type="max",
+            end_color="63BE7B",
+        ),
+    )
+    sheet.column_dimensions["A"].width = 16
+    sheet.column_dimensions["B"].width = 15
+    sheet.freeze_panes = "C3"
+
+
+async def generate_cohort_excel() -> Optional[str]:
+    """Генерирует Excel отчет с тепловыми картами удержания когорт.
+
+    Returns:
+        Optional[str]: Путь к сгенерированному файлу или None при ошибке
+    """
+    try:
+        matrix = await get_retention_matrix()
+        if matrix is None:
+            return None
+
+        workbook = Workbook()
+        returned_sheet = workbook.active
+        returned_sheet.title = "Возврат"
+        _write_heatmap(
+            returned_sheet,
+            "Доля когорты, активной в неделю W+k или позже",
+            matrix,
+            matrix.returned,
+        )
+        _write_heatmap(
+            workbook.create_sheet("Опрос"),
+            "Доля когорты, завершившей опрос к неделе W+k",
+            matrix,
+            matrix.completed,
+        )
+
+        filename = f"cohorts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        workbook.save(filename)
+
+        await write_logs(
+            "info", f"Successfully generated cohort report: {filename}"
+        )
+        return filename
+
+    except Exception as e:
+        await write_logs("error", f"Error generating cohort report: {str(e)}")
+        return None
@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import FrozenSet, Tuple
+
+# (минимум, максимум) для полей: минута, час, день месяца, месяц, день недели.
+# День недели принимает 0-7, где 7 — тоже воскресенье (как в cron)
+_FIELD_RANGES: Tuple[Tuple[int, int], ...] = (
+    (0, 59),
+    (0, 23),
+    (1, 31),
+    (1, 12),
+    (0, 7),
+)
+# Дальше этого горизонта выражение считается невыполнимым (например, 31 февраля)
+_SEARCH_DAYS = 366 * 5
+
+
+def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    """Разбирает одно поле cron: *, */n, a, a-b, a-b/n и списки через запятую."""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {field}")
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron value out of range: {field}")
+        values.update(range(start, end + 1, step))
+
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    """Расписание в формате cron из пяти полей: минута час день месяц день_недели.
+
+    День недели: 0 — воскресенье, 7 также означает воскресенье. Если заданы
+    и день месяца, и день недели, срабатывает любое из условий, как в cron.
+    """
+
+    expression: str
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]
+    days_restricted: bool
+    weekdays_restricted: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "CronSchedule":
+        """Разбирает выражение cron.
+
+        Args:
+            expression (str): Выражение из пяти полей, например ``0 10 * * 1``.
+
+        Returns:
+            CronSchedule: Разобранное расписание.
+
+        Raises:
+            ValueError: Если выражение некорректно.
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression}")
+
+        try:
+            parsed = [
+                _parse_field(field, low, high)
+                for field, (low, high) in zip(fields, _FIELD_RANGES)
+            ]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression '{expression}': {e}") from e
+
+        return cls(
+            expression=" ".join(fields),
+            minutes=parsed[0],
+            hours=parsed[1],
+            days=parsed[2],
+            months=parsed[3],
+            # 7 приводится к 0 после раскрытия диапазонов и шагов: 5-7, 1-7, */2
+            weekdays=frozenset(weekday % 7 for weekday in parsed[4]),
+            days_restricted=fields[2] != "*",
+            weekdays_restricted=fields[4] != "*",
+        )
+
+    def _day_matches(self, moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7  # В cron неделя начинается с воскресенья
+        day_ok = moment.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Возвращает ближайший момент срабатывания строго после moment.
+
+        Перебор идет крупными шагами: неподходящий месяц пропускается целиком,
+        затем день и час, поэтому число итераций невелико.
+
+        Args:
+            moment (datetime): Точка отсчета.
+
+        Returns:
+            datetime: Время следующего срабатывания с точностью до минуты.
+
+        Raises:
+            ValueError: Если расписание не срабатывает в обозримом будущем.
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        horizon = moment + timedelta(days=_SEARCH_DAYS)
+
+        while candidate <= horizon:
+            if candidate.month not in self.months:
+                year = candidate.year + candidate.month // 12
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(
+                    year=year, month=month, day=1, hour=0, minute=0
+                )
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+
+        raise ValueError(f"Cron expression never fires: {self.expression}")
@@ -1,11 +1,150 @@
-from src.database.settings_data import UserSurvey
-from src.utils.localization import get_message
-import re
-from aiogram import types
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+from src.utils.lead_scoring import lead_label
+from src.utils.localization import (
+    DEFAULT_LANGUAGE,
+    get_message,
+    get_messages_version,
+)
+
+
+# Порядок вопросов в посте канала, к которому привык отдел продаж: регион
+# первым, затем остальные ответы. Вопросы, которых нет в списке, идут
+# после них в порядке опроса.
+POST_QUESTION_ORDER = (
+    "question_region",
+    "question_has_business",
+    "question_is_under_25",
+    "question_has_experience",
+    "question_official_income",
+    "question_work_plan",
+    "question_subsidy_interest",
+    "question_desired_outcome",
+    "question_importance_level",
+    "question_investment_readiness",
+)
+_POST_RANK = {key: rank for rank, key in enumerate(POST_QUESTION_ORDER)}
+
+
+def _post_order(question_keys: Tuple[str, ...]) -> Tuple[int, ...]:
+    """Возвращает индексы вопросов опроса в порядке их вывода в посте."""
+    return tuple(
+        sorted(
+            range(len(question_keys)),
+            key=lambda idx: _POST_RANK.get(question_keys[idx], len(_POST_RANK)),
+        )
+    )
+
+
+def _escape(text: str) -> str:
+    """Экранирует звездочки для markdown."""
+    return text.replace("*", "\\*")
+
+
+@dataclass(frozen=True)
+class ResultTemplate:
+    """Скомпилированный шаблон поста с результатами опроса.
+
+    Все тексты из локализации подставлены и экранированы заранее, при
+    рендеринге остается один проход по ответам и один join.
+    """
+
+    header: str
+    user_info: str
+    lead_score: str
+    question_prefixes: Tuple[str, ...]
+    order: Tuple[int, ...]
+
+    def render(
+        self,
+        user_id: int,
+        username: str,
+        answers: Sequence[Optional[str]],
+        lead_score: Optional[int] = None,
+    ) -> str:
+        """Рендерит пост по кортежу ответов в порядке вопросов опроса.
+
+        Ответы выводятся в порядке order (см. POST_QUESTION_ORDER).
+        """
+        parts = [self.header]
+        if lead_score is not None:
+            parts.append(
+                self.lead_score.format(score=lead_score, label=lead_label(lead_score))
+            )
+        parts.append(
+            _escape(self.user_info.format(username=username, user_id=user_id))
+        )
+        for prefix, idx in zip(self.question_prefixes, self.order):
+            answer = answers[idx] if idx < len(answers) else None
+            if answer:
+                parts.append(prefix)
+                parts.append(_escape(answer))
+                parts.append("\n\n")
+        return "".join(parts)
+
+
+# Шаблоны по кортежу ключей вопросов; сбрасываются при изменении локализации
+_templates: Dict[Tuple[str, ...], ResultTemplate] = {}
+_templates_version = -1
+
+
+async def _compile_template(question_keys: Tuple[str, ...]) -> ResultTemplate:
+    """Собирает шаблон поста из текстов локализации.
+
+    Пост публикуется в канал, поэтому язык всегда DEFAULT_LANGUAGE,
+    а не язык пользователя, завершившего опрос.
+    """
+    language = DEFAULT_LANGUAGE
+    header = await get_message("survey_result_header", language, "survey")
+    user_info = await get_message("survey_result_user_info", language, "survey")
+    lead_score = await get_message("survey_result_lead_score", language, "survey")
+    answers_header = await get_message(
+        "survey_result_answers_header", language, "survey"
+    )
+
+    order = _post_order(question_keys)
+    prefixes = []
+    for question_key in (question_keys[idx] for idx in order):
+        question_text = await get_message(question_key, language, "questions")
+        prefixes.append(f"❓ {_escape(question_text)}\n✅ ")
+
+    return ResultTemplate(
+        header=f"{_escape(header)}\n",
+        user_info=f"{user_info}\n\n{answers_header}\n\n",
+        lead_score=f"{_escape(lead_score)}\n",
+        question_prefixes=tuple(prefixes),
+        order=order,
+    )
+
+
+async def get_result_template(question_keys: Tuple[str, ...]) -> ResultTemplate:
+    """Возвращает шаблон поста, пересобирая его только при смене локализации.
+
+    Args:
+        question_keys (Tuple[str, ...]): Ключи текстов вопросов в порядке опроса.
+
+    Returns:
+        ResultTemplate: Скомпилированный шаблон.
+    """
+    global _templates_version
+
+    version = await get_messages_version()
+    if version != _templates_version:
+        _templates.clear()
+        _templates_version = version
+
+    template = _templates.get(question_keys)
+    if template is None:
+        template = _templates[question_keys] = await _compile_template(question_keys)
+    return template
 
 
 async def format_user_survey_results(
-    user_id: int, username: str, survey: UserSurvey
+    user_id: int,
+    username: str,
+    question_keys: Tuple[str, ...],
+    answers: Sequence[Optional[str]],
+    lead_score: Optional[int] = None,
 ) -> str:
     """
     Форматирует результаты опроса конкретного пользователя.
@@ -13,45 +152,12 @@ async def format_user_survey_results(
     Args:
         user_id (int): Идентификатор пользователя, который прошел опрос.
         username (str): Имя пользователя в формате @username.
-        survey (UserSurvey): Объект, содержащий результаты опроса пользователя.
+        question_keys (Tuple[str, ...]): Ключи текстов вопросов в порядке опроса.
+        answers (Sequence[Optional[str]]): Ответы в том же порядке, что и вопросы.
+        lead_score (Optional[int]): Оценка лида; если задана, выводится под заголовком.
 
     Returns:
         str: Строка, содержащая отформатированные результаты опроса.
     """
-    header = await get_message("survey_result_header", category="survey")
-    user_info = await get_message("survey_result_user_info", category="survey")
-    answers_header = await get_message(
-        "survey_result_answers_header", category="survey"
-    )
-
-    message = f"{header}\n"
-    message += user_info.format(username=username, user_id=user_id) + "\n\n"
-    message += f"{answers_header}\n\n"
-
-    # Создаем словарь с вопросами и ответами
-    answers = {
-        "region": ("question_region", survey.region),
-        "has_business": ("question_has_business", survey.has_business),
-        "is_under_25": ("question_is_under_25", survey.is_under_25),
-        "has_experience": ("question_has_experience", survey.has_experience),
-        "official_income": ("question_official_income", survey.official_income),
-        "work_plan": ("question_work_plan", survey.work_plan),
-        "micro_result": ("question_micro_result", survey.micro_result),
-        "subsidy_interest": ("question_subsidy_interest", survey.subsidy_interest),
-        "desired_outcome": ("question_desired_outcome", survey.desired_outcome),
-        "importance_level": ("question_importance_level", survey.importance_level),
-        "investment_readiness": (
-            "question_investment_readiness",
-            survey.investment_readiness,
-        ),
-    }
-
-    for question_key, (question_msg_key, answer) in answers.items():
-        if answer:
-            question_text = await get_message(question_msg_key, category="questions")
-            message += f"❓ {question_text}\n"
-            message += f"✅ {answer}\n\n"
-
-    return message.replace(
-        "*", "\\*"
-    )  # Оставляем только экранирование звездочек для markdown
+    template = await get_result_template(question_keys)
+    return template.render(user_id, username, answers, lead_score)
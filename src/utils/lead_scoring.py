@@ -0,0 +1,45 @@
+from typing import Mapping, Optional, Sequence, Tuple
+
+# Нижние границы оценки для категорий лида, от лучшей к худшей
+LEAD_LABELS: Tuple[Tuple[int, str], ...] = (
+    (70, "🔥 горячий"),
+    (40, "🌤 теплый"),
+    (0, "❄️ холодный"),
+)
+
+
+def compute_lead_score(
+    questions: Sequence, selected: Mapping[int, Optional[int]]
+) -> int:
+    """Считает оценку лида по выбранным вариантам ответа.
+
+    Веса вариантов компилируются вместе с опросом в кортежи
+    SurveyState.weights, поэтому расчет — одно обращение по индексу на
+    каждый вопрос.
+
+    Args:
+        questions (Sequence): Скомпилированные вопросы (SurveyState) или
+            другие объекты с атрибутом weights.
+        selected (Mapping[int, Optional[int]]): Индекс варианта по индексу
+            вопроса; для текстовых ответов None.
+
+    Returns:
+        int: Оценка лида.
+    """
+    score = 0
+    for question_idx, option_idx in selected.items():
+        if option_idx is None or not 0 <= question_idx < len(questions):
+            continue
+        # У вопросов без весов (Question.weights по умолчанию None) вклад нулевой
+        weights = getattr(questions[question_idx], "weights", None) or ()
+        if 0 <= option_idx < len(weights):
+            score += weights[option_idx]
+    return score
+
+
+def lead_label(score: int) -> str:
+    """Возвращает категорию лида по оценке."""
+    for threshold, label in LEAD_LABELS:
+        if score >= threshold:
+            return label
+    return LEAD_LABELS[-1][1]
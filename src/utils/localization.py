@@ -1,35 +1,148 @@
-from src.database.settings_data import create_session, Localization
+from src.database.settings_data import (
+    create_session,
+    create_read_only_session,
+    Localization,
+    seed_hash,
+    set_schema_meta,
+)
 from sqlalchemy import select
-from typing import Dict, Optional
+from contextvars import ContextVar
+from typing import Dict, FrozenSet, Optional, Tuple
 from src.utils.logging import write_logs
 import time
 
+DEFAULT_LANGUAGE = "ru"
+# Languages tried in order when a translation is missing; every chain
+# implicitly ends with DEFAULT_LANGUAGE
+LANGUAGE_FALLBACKS: Dict[str, Tuple[str, ...]] = {
+    "uk": ("ru",),
+    "be": ("ru",),
+    "kk": ("ru",),
+    "ky": ("ru",),
+    "uz": ("ru",),
+    "tg": ("ru",),
+    "hy": ("ru",),
+    "az": ("ru",),
+}
+
+# Language of the user whose update is being handled (set by LanguageMiddleware)
+current_language: ContextVar[str] = ContextVar(
+    "current_language", default=DEFAULT_LANGUAGE
+)
+
+Messages = Dict[str, Dict[str, Dict[str, str]]]
+FlatMessages = Dict[Tuple[str, str, str], str]
+
 # Cache for storing messages
-_message_cache: Dict[str, Dict[str, Dict[str, str]]] = {}
+_message_cache: Messages = {}
+# (language, category, key) -> message with fallbacks already applied
+_snapshot: FlatMessages = {}
+_languages: FrozenSet[str] = frozenset({DEFAULT_LANGUAGE})
+_snapshot_ready = False  # Set once messages have been loaded from the database
 _last_cache_update = 0
+_cache_version = 0  # Increments whenever cached messages actually change
 CACHE_TTL = 60  # 1 minute in seconds
 
 
-async def _init_messages():
-    """Initialize messages from the database into cache."""
-    if not _message_cache:
-        async with create_session() as session:
-            result = await session.execute(select(Localization))
-            messages = result.scalars().all()
+def fallback_chain(language: str) -> Tuple[str, ...]:
+    """Get the languages to look a message up in, most specific first.
+
+    Args:
+        language (str): Language code
+
+    Returns:
+        Tuple[str, ...]: The language, its fallbacks and DEFAULT_LANGUAGE
+    """
+    chain = (language, *LANGUAGE_FALLBACKS.get(language, ()), DEFAULT_LANGUAGE)
+    return tuple(dict.fromkeys(chain))
+
+
+def build_snapshot(messages: Messages) -> Tuple[FlatMessages, FrozenSet[str]]:
+    """Flatten messages into (language, category, key) with fallbacks resolved.
+
+    Every supported language gets a full copy of the keys from its fallback
+    chain, so a lookup is a single dict hit regardless of chain length.
+
+    Args:
+        messages (Messages): Messages by language, category and key
+
+    Returns:
+        Tuple[FlatMessages, FrozenSet[str]]: Flat messages and supported languages
+    """
+    languages = frozenset(messages) | frozenset(LANGUAGE_FALLBACKS)
+    languages |= {DEFAULT_LANGUAGE}
+    snapshot: FlatMessages = {}
+    for language in languages:
+        # Least specific first, so the user's own language wins
+        for source in reversed(fallback_chain(language)):
+            for category, texts in messages.get(source, {}).items():
+                for key, text in texts.items():
+                    snapshot[(language, category, key)] = text
+    return snapshot, languages
+
+
+def resolve_language(language_code: Optional[str]) -> str:
+    """Map a Telegram language_code to a supported language.
+
+    Args:
+        language_code (Optional[str]): IETF tag from the user profile, e.g. 'uk' or 'pt-br'
+
+    Returns:
+        str: Supported language code or DEFAULT_LANGUAGE
+    """
+    if not language_code:
+        return DEFAULT_LANGUAGE
+    language = language_code.split("-")[0].lower()
+    return language if language in _languages else DEFAULT_LANGUAGE
+
+
+def is_snapshot_ready() -> bool:
+    """Check whether supported languages are known yet.
+
+    Until messages are loaded from the database only DEFAULT_LANGUAGE is
+    supported, so resolve_language() results must not be stored.
+
+    Returns:
+        bool: True after the first successful load of messages
+    """
+    return _snapshot_ready
+
+
+def _rebuild_snapshot() -> None:
+    global _snapshot, _languages
+    _snapshot, _languages = build_snapshot(_message_cache)
+
+
+async def _load_messages() -> Messages:
+    """Load all messages from the database in one query."""
+    messages_by_language: Messages = {}
+    async with create_read_only_session() as session:
+        result = await session.execute(
+            select(
+                Localization.language,
+                Localization.category,
+                Localization.key,
+                Localization.message,
+            )
+        )
 
-            for msg in messages:
-                if msg.language not in _message_cache:
-                    _message_cache[msg.language] = {}
-                if msg.category not in _message_cache[msg.language]:
-                    _message_cache[msg.language][msg.category] = {}
-                _message_cache[msg.language][msg.category][msg.key] = msg.message
+        for language, category, key, message in result:
+            categories = messages_by_language.setdefault(language, {})
+            categories.setdefault(category, {})[key] = message
+
+    return messages_by_language
 
 
 async def _refresh_cache():
     """Refresh the message cache from database."""
-    global _last_cache_update
-    _message_cache.clear()
-    await _init_messages()
+    global _last_cache_update, _cache_version, _snapshot_ready
+    messages = await _load_messages()
+    if messages != _message_cache or not _snapshot_ready:
+        _message_cache.clear()
+        _message_cache.update(messages)
+        _rebuild_snapshot()
+        _cache_version += 1
+    _snapshot_ready = True
     _last_cache_update = time.time()
 
 
@@ -38,21 +151,47 @@ async def _should_refresh_cache() -> bool:
     return time.time() - _last_cache_update > CACHE_TTL
 
 
-async def get_message(key: str, language: str = "ru", category: str = "system") -> str:
+async def load_messages() -> None:
+    """Load messages from the database if the cache is empty or expired."""
+    if not _snapshot_ready or await _should_refresh_cache():
+        await _refresh_cache()
+
+
+async def get_message(
+    key: str, language: Optional[str] = None, category: str = "system"
+) -> str:
     """Get a localized message by key and language.
 
     Args:
         key (str): Message key
-        language (str, optional): Language code. Defaults to 'ru'.
+        language (Optional[str], optional): Language code. Defaults to the
+            language of the current user (see current_language).
         category (str, optional): Message category. Defaults to 'system'.
 
     Returns:
         str: Localized message or key if not found
     """
-    if not _message_cache or await _should_refresh_cache():
-        await _refresh_cache()
+    await load_messages()
+
+    message = _snapshot.get((language or current_language.get(), category, key))
+    if message is None:
+        # Only an unsupported language passed explicitly gets here
+        message = _snapshot.get((DEFAULT_LANGUAGE, category, key), key)
+    return message
+
 
-    return _message_cache.get(language, {}).get(category, {}).get(key, key)
+async def get_messages_version() -> int:
+    """Get the version of the cached messages.
+
+    The version changes only when localized texts change, so it can be used
+    to invalidate anything precomputed from them.
+
+    Returns:
+        int: Current cache version
+    """
+    await load_messages()
+
+    return _cache_version
 
 
 async def set_message(
@@ -66,6 +205,7 @@ async def set_message(
         message (str): Message text
         category (str, optional): Message category. Defaults to 'system'.
     """
+    global _cache_version
     async with create_session() as session:
         # Check if message exists
         stmt = select(Localization).where(
@@ -87,16 +227,28 @@ async def set_message(
         await session.commit()
 
         # Update cache
+        if _message_cache.get(language, {}).get(category, {}).get(key) != message:
+            _cache_version += 1
         if language not in _message_cache:
             _message_cache[language] = {}
         if category not in _message_cache[language]:
             _message_cache[language][category] = {}
         _message_cache[language][category][key] = message
+        _rebuild_snapshot()
 
 
 # Initialize default messages if they don't exist
-async def init_default_messages():
-    """Initialize default messages in the database."""
+async def init_default_messages(stored_seed_hash: Optional[str] = None):
+    """Initialize default messages in the database.
+
+    Seeding is skipped when the stored hash matches the default messages,
+    so an unchanged seed costs a single query at startup: loading the
+    messages, which builds the snapshot of supported languages before the
+    first update is handled.
+
+    Args:
+        stored_seed_hash (Optional[str]): Seed hash saved in schema_meta.
+    """
     try:
         # System messages
         system_messages = {
@@ -146,6 +298,7 @@ async def init_default_messages():
             "survey_result_header": "📋 Новый пройденный опрос",
             "survey_result_user_info": "👤 Пользователь: @{username}\n👤 Идентификатор: {user_id}",
             "survey_result_answers_header": "📝 Ответы на вопросы:",
+            "survey_result_lead_score": "🎯 Оценка лида: {score} ({label})",
         }
 
         # Questions
@@ -162,19 +315,38 @@ async def init_default_messages():
             "question_investment_readiness": "Вы готовы инвестировать в подготовку, чтобы получить субсидию в 350–500 тыс. руб?",
         }
 
-        # Initialize all messages
-        for key, message in system_messages.items():
-            await set_message(key, "ru", message, "system")
-            await write_logs("info", f"Initialized system message: {key}")
-
-        for key, message in survey_messages.items():
-            await set_message(key, "ru", message, "survey")
-            await write_logs("info", f"Initialized survey message: {key}")
+        default_messages = {
+            "system": system_messages,
+            "survey": survey_messages,
+            "questions": question_messages,
+        }
+        current_hash = seed_hash(default_messages)
+        if current_hash == stored_seed_hash:
+            await write_logs("info", "Default messages are up to date")
+            await _refresh_cache()
+            return
 
-        for key, message in question_messages.items():
-            await set_message(key, "ru", message, "questions")
-            await write_logs("info", f"Initialized question message: {key}")
+        # Initialize all messages in one transaction
+        async with create_session() as session:
+            result = await session.execute(
+                select(Localization).where(Localization.language == "ru")
+            )
+            existing = {(msg.category, msg.key): msg for msg in result.scalars()}
+
+            for category, messages in default_messages.items():
+                for key, message in messages.items():
+                    row = existing.get((category, key))
+                    if row:
+                        row.message = message
+                    else:
+                        session.add(
+                            Localization(
+                                key=key, language="ru", message=message, category=category
+                            )
+                        )
 
+        await _refresh_cache()
+        await set_schema_meta({"localization_seed": current_hash})
         await write_logs("info", "All messages initialized successfully")
 
     except Exception as e:
@@ -0,0 +1,215 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import AsyncIterable, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from src.database.mailing_reports import save_mailing_report
+from src.database.segments import SegmentSpec, iter_segment_user_ids
+from src.utils.logging import write_logs
+from src.utils.mailing_metrics import MailingMetrics
+from src.utils.rate_limiter import RateLimiter
+
+# Telegram допускает около 30 сообщений в секунду разным пользователям
+MAILING_RATE = 25
+# Сколько запросов к Bot API выполняется одновременно
+MAILING_CONCURRENCY = 16
+MAX_SEND_ATTEMPTS = 3
+
+
+@dataclass
+class MailingResult:
+    """Итоги рассылки."""
+
+    successful: int = 0
+    failed: int = 0
+    blocked: int = 0
+    report_id: Optional[int] = None
+
+
+async def copy_mailing(
+    bot: Bot,
+    chat_id: int,
+    from_chat_id: int,
+    message_ids: List[int],
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+) -> None:
+    """Копирует исходное сообщение администратора пользователю.
+
+    copyMessage передает только ссылку на исходное сообщение, поэтому
+    одинаково работает для любого типа контента. Альбом копируется одним
+    вызовом copyMessages; кнопки к альбомам Telegram не прикрепляет.
+
+    Args:
+        bot (Bot): Экземпляр бота.
+        chat_id (int): Получатель.
+        from_chat_id (int): Чат с исходным сообщением.
+        message_ids (List[int]): Идентификаторы исходных сообщений.
+        reply_markup (Optional[InlineKeyboardMarkup]): Клавиатура под сообщением.
+    """
+    if len(message_ids) > 1:
+        await bot.copy_messages(chat_id, from_chat_id, message_ids)
+    else:
+        await bot.copy_message(
+            chat_id, from_chat_id, message_ids[0], reply_markup=reply_markup
+        )
+
+
+async def _send_with_retry(
+    send: Callable[[int], Awaitable],
+    user_id: int,
+    limiter: RateLimiter,
+    metrics: MailingMetrics,
+) -> None:
+    """Отправляет сообщение одному пользователю, соблюдая лимит и RetryAfter."""
+    for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+        await limiter.acquire()
+        started = time.perf_counter()
+        try:
+            await send(user_id)
+            return
+        except TelegramRetryAfter as e:
+            await write_logs(
+                "warning", f"Mailing flood limit, retry after {e.retry_after}s"
+            )
+            metrics.record_retry(flood_wait=e.retry_after)
+            await asyncio.sleep(e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest):
+            raise
+        except Exception:
+            if attempt == MAX_SEND_ATTEMPTS:
+                raise
+            metrics.record_retry()
+            await asyncio.sleep(attempt)
+        finally:
+            metrics.record_latency(time.perf_counter() - started)
+    raise RuntimeError(f"Message to {user_id} was not sent after retries")
+
+
+async def broadcast(
+    user_ids: AsyncIterable[int],
+    send: Callable[[int], Awaitable],
+    rate: float = MAILING_RATE,
+    concurrency: int = MAILING_CONCURRENCY,
+    metrics: Optional[MailingMetrics] = None,
+) -> MailingResult:
+    """Рассылает сообщение получателям из асинхронного источника.
+
+    Несколько воркеров забирают получателей из ограниченной очереди, общий
+    token bucket держит суммарную скорость ниже лимита Telegram.
+
+    Args:
+        user_ids (AsyncIterable[int]): Идентификаторы получателей.
+        send (Callable[[int], Awaitable]): Отправка одному получателю.
+        rate (float): Сообщений в секунду.
+        concurrency (int): Число одновременных запросов.
+        metrics (Optional[MailingMetrics]): Куда записывать метрики доставки.
+
+    Returns:
+        MailingResult: Итоги рассылки.
+    """
+    result = MailingResult()
+    metrics = metrics or MailingMetrics()
+    limiter = RateLimiter(rate, burst=concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker() -> None:
+        while True:
+            user_id = await queue.get()
+            if user_id is None:
+                return
+            try:
+                await _send_with_retry(send, user_id, limiter, metrics)
+                result.successful += 1
+                metrics.record_sent()
+            except TelegramForbiddenError as e:
+                result.blocked += 1
+                metrics.record_failed(e)
+            except Exception as e:
+                metrics.record_failed(e)
+                await write_logs(
+                    "error", f"Error sending mailing to user {user_id}: {str(e)}"
+                )
+                result.failed += 1
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        async for user_id in user_ids:
+            await queue.put(user_id)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        metrics.finish()
+
+    return result
+
+
+def build_button_keyboard(button: Optional[Dict]) -> Optional[InlineKeyboardMarkup]:
+    """Строит клавиатуру с кнопкой-ссылкой рассылки.
+
+    Args:
+        button (Optional[Dict]): Словарь с ключами text и url.
+
+    Returns:
+        Optional[InlineKeyboardMarkup]: Клавиатура или None, если кнопки нет.
+    """
+    if not button:
+        return None
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text=button["text"], url=button["url"])]]
+    )
+
+
+async def run_mailing(
+    bot: Bot,
+    mailing: Dict,
+    segment: SegmentSpec,
+    rate: float = MAILING_RATE,
+    created_by: Optional[int] = None,
+    scheduled_id: Optional[int] = None,
+) -> MailingResult:
+    """Рассылает сохраненное сообщение администратора сегменту пользователей.
+
+    Метрики доставки сохраняются в mailing_reports, идентификатор отчета
+    возвращается в MailingResult.report_id.
+
+    Args:
+        bot (Bot): Экземпляр бота.
+        mailing (Dict): from_chat_id, message_ids и необязательная button.
+        segment (SegmentSpec): Описание сегмента получателей.
+        rate (float): Сообщений в секунду.
+        created_by (Optional[int]): Администратор, запустивший рассылку.
+        scheduled_id (Optional[int]): Запланированная рассылка, если есть.
+
+    Returns:
+        MailingResult: Итоги рассылки.
+    """
+    keyboard = build_button_keyboard(mailing.get("button"))
+
+    async def send(user_id: int) -> None:
+        await copy_mailing(
+            bot,
+            user_id,
+            mailing["from_chat_id"],
+            mailing["message_ids"],
+            reply_markup=keyboard,
+        )
+
+    metrics = MailingMetrics()
+    result = await broadcast(
+        iter_segment_user_ids(segment), send, rate=rate, metrics=metrics
+    )
+    result.report_id = await save_mailing_report(
+        metrics, result, created_by=created_by, scheduled_id=scheduled_id
+    )
+    return result
@@ -0,0 +1,144 @@
+import csv
+import io
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Верхние границы корзин гистограммы задержек, мс; последняя корзина — все, что больше
+LATENCY_BOUNDS_MS = (25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 2000, 5000)
+
+
+class MailingMetrics:
+    """Компактные метрики одной рассылки.
+
+    Вместо записи на каждое сообщение хранятся счетчики по секундам,
+    гистограмма задержек запросов к Bot API, число ошибок по классам
+    исключений, число повторов и суммарное время ожидания flood limit.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._started = time.monotonic()
+        self.sent: List[int] = []
+        self.failed: List[int] = []
+        self.latency_counts: List[int] = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        self.errors: Counter = Counter()
+        self.retries = 0
+        self.flood_wait = 0.0
+
+    def _second(self) -> int:
+        second = int(time.monotonic() - self._started)
+        while len(self.sent) <= second:
+            self.sent.append(0)
+            self.failed.append(0)
+        return second
+
+    def record_latency(self, seconds: float) -> None:
+        """Учитывает длительность одного запроса к Bot API."""
+        self.latency_counts[bisect_left(LATENCY_BOUNDS_MS, seconds * 1000)] += 1
+
+    def record_sent(self) -> None:
+        self.sent[self._second()] += 1
+
+    def record_failed(self, error: BaseException) -> None:
+        self.failed[self._second()] += 1
+        self.errors[type(error).__name__] += 1
+
+    def record_retry(self, flood_wait: float = 0.0) -> None:
+        self.retries += 1
+        self.flood_wait += flood_wait
+
+    def finish(self) -> None:
+        self.finished_at = datetime.utcnow()
+
+    def to_dict(self) -> Dict:
+        """Сериализует метрики для хранения в БД."""
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "latency_bounds_ms": list(LATENCY_BOUNDS_MS),
+            "latency_counts": self.latency_counts,
+            "errors": dict(self.errors),
+        }
+
+
+def latency_percentile(metrics: Dict, q: float) -> Optional[int]:
+    """Оценивает перцентиль задержки по гистограмме.
+
+    Args:
+        metrics (Dict): Метрики из MailingMetrics.to_dict().
+        q (float): Перцентиль от 0 до 1.
+
+    Returns:
+        Optional[int]: Верхняя граница корзины в мс или None, если запросов не было.
+    """
+    counts = metrics["latency_counts"]
+    total = sum(counts)
+    if not total:
+        return None
+
+    bounds = metrics["latency_bounds_ms"]
+    threshold = q * total
+    running = 0
+    for idx, count in enumerate(counts):
+        running += count
+        if running >= threshold:
+            return bounds[idx] if idx < len(bounds) else bounds[-1] * 2
+    return bounds[-1] * 2
+
+
+def format_report_summary(report) -> str:
+    """Формирует текстовую сводку отчета о рассылке.
+
+    Args:
+        report (MailingReport): Отчет из БД.
+
+    Returns:
+        str: Сводка для администратора.
+    """
+    metrics = report.metrics_data
+    duration = max(1, len(metrics["sent"]))
+    lines = [
+        f"📈 Рассылка #{report.id} от {report.started_at:%d.%m.%Y %H:%M} UTC",
+        f"✅ {report.successful}  🚫 {report.blocked}  ❌ {report.failed}",
+        f"⏱ {duration} с, в среднем {report.successful / duration:.1f} сообщ./с",
+    ]
+
+    p50, p95, p99 = (latency_percentile(metrics, q) for q in (0.5, 0.95, 0.99))
+    if p50 is not None:
+        lines.append(f"📶 Задержка: p50 ≤ {p50} мс, p95 ≤ {p95} мс, p99 ≤ {p99} мс")
+
+    lines.append(
+        f"🔁 Повторов: {report.retries}, ожидание flood limit: "
+        f"{report.flood_wait_seconds:.0f} с"
+    )
+    if metrics["errors"]:
+        errors = ", ".join(
+            f"{name}: {count}"
+            for name, count in sorted(metrics["errors"].items(), key=lambda x: -x[1])
+        )
+        lines.append(f"⚠️ Ошибки: {errors}")
+
+    return "\n".join(lines)
+
+
+def metrics_to_csv(report) -> bytes:
+    """Выгружает посекундные счетчики отчета в CSV.
+
+    Args:
+        report (MailingReport): Отчет из БД.
+
+    Returns:
+        bytes: CSV в кодировке UTF-8 с BOM (открывается в Excel).
+    """
+    metrics = report.metrics_data
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["second", "time_utc", "sent", "failed"])
+    for second, (sent, failed) in enumerate(zip(metrics["sent"], metrics["failed"])):
+        moment = report.started_at + timedelta(seconds=second)
+        writer.writerow([second, moment.strftime("%Y-%m-%d %H:%M:%S"), sent, failed])
+    return buffer.getvalue().encode("utf-8-sig")
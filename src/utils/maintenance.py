@@ -0,0 +1,53 @@
+import asyncio
+from datetime import timedelta
+from typing import Optional
+
+from src.config.config import settings
+from src.database.archive import archive_abandoned_surveys
+from src.database.partitions import maintain_all_partitions
+from src.utils.logging import write_logs
+
+# Первый запуск откладывается, чтобы не нагружать БД во время старта бота
+MAINTENANCE_START_DELAY = 600
+# Интервал между запусками обслуживания, секунд
+MAINTENANCE_INTERVAL = 24 * 3600
+
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+async def run_maintenance() -> None:
+    """Выполняет все задачи обслуживания БД по очереди."""
+    await archive_abandoned_surveys(timedelta(days=settings.config.SURVEY_ARCHIVE_DAYS))
+    if settings.config.DATABASE_PARTITIONING:
+        await maintain_all_partitions()
+
+
+async def _maintenance_loop() -> None:
+    await asyncio.sleep(MAINTENANCE_START_DELAY)
+    while True:
+        try:
+            await run_maintenance()
+        except Exception as e:
+            await write_logs("error", f"Error during database maintenance: {str(e)}")
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+
+
+def start_maintenance() -> None:
+    """Запускает периодическое обслуживание БД."""
+    global _maintenance_task
+    if _maintenance_task is None:
+        _maintenance_task = asyncio.create_task(
+            _maintenance_loop(), name="database-maintenance"
+        )
+
+
+async def stop_maintenance() -> None:
+    """Останавливает обслуживание при завершении бота."""
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        try:
+            await _maintenance_task
+        except asyncio.CancelledError:
+            pass
+        _maintenance_task = None
@@ -0,0 +1,278 @@
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from sqlalchemy import select, delete, update
+
+from src.database.settings_data import (
+    create_session,
+    create_read_only_session,
+    ChannelOutbox,
+)
+from src.utils.logging import write_logs
+from src.utils.rate_limiter import RateLimiter
+
+# Telegram ограничивает публикации в канал примерно 20 сообщениями в минуту
+CHANNEL_POSTS_PER_MINUTE = 20
+# Начиная с такой очереди несколько результатов объединяются в один пост
+DIGEST_THRESHOLD = 3
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+MAX_SEND_ATTEMPTS = 5
+# Пауза перед возвратом в очередь поста, не отправленного за MAX_SEND_ATTEMPTS;
+# удваивается при каждой следующей неудаче подряд, но не больше максимума
+REQUEUE_BASE_DELAY = 60
+REQUEUE_MAX_DELAY = 30 * 60
+
+# Ошибки, после которых повтор бесполезен: пост некорректен, канал не найден
+# или бот удален из канала
+REJECTED_ERRORS = (TelegramBadRequest, TelegramForbiddenError)
+
+# (id записи в channel_outbox или None, id канала, текст)
+OutboxItem = Tuple[Optional[int], int, str]
+
+
+def split_post(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Делит пост длиннее limit на части по границам абзацев или строк.
+
+    Args:
+        text (str): Текст поста.
+        limit (int): Максимальная длина части.
+
+    Returns:
+        List[str]: Части поста в исходном порядке.
+    """
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip("\n")
+    parts.append(text)
+    return parts
+
+
+class ChannelPublisher:
+    """Очередь исходящих постов в канал с собственным ограничением скорости.
+
+    Каждый пост сначала сохраняется в таблицу channel_outbox и удаляется из
+    нее только после успешной отправки, поэтому при перезапуске бота
+    неотправленные результаты опросов не теряются. Посты, которые Telegram
+    окончательно отклонил, помечаются failed_at и больше не отправляются.
+    """
+
+    def __init__(
+        self,
+        posts_per_minute: int = CHANNEL_POSTS_PER_MINUTE,
+        digest_threshold: int = DIGEST_THRESHOLD,
+    ):
+        self.digest_threshold = digest_threshold
+        self._limiter = RateLimiter(posts_per_minute, period=60)
+        self._queue: asyncio.Queue[OutboxItem] = asyncio.Queue()
+        self._pending: Optional[OutboxItem] = None
+        self._bot: Optional[Bot] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._requeue_tasks: Set[asyncio.Task] = set()
+        self._failed_rounds = 0
+
+    async def start(self, bot: Bot) -> None:
+        """Загружает неотправленные посты из БД и запускает отправку.
+
+        Args:
+            bot (Bot): Экземпляр бота для отправки сообщений.
+        """
+        self._bot = bot
+
+        async with create_read_only_session() as session:
+            result = await session.execute(
+                select(ChannelOutbox)
+                .where(ChannelOutbox.failed_at.is_(None))
+                .order_by(ChannelOutbox.id)
+            )
+            restored = result.scalars().all()
+
+        for row in restored:
+            self._queue.put_nowait((row.id, row.chat_id, row.text))
+
+        if restored:
+            await write_logs(
+                "info", f"Restored {len(restored)} channel posts from outbox"
+            )
+
+        self._worker = asyncio.create_task(self._run(), name="channel-publisher")
+
+    async def stop(self) -> None:
+        """Останавливает отправку; неотправленные посты остаются в БД."""
+        for task in list(self._requeue_tasks):
+            task.cancel()
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def publish(self, chat_id: int, text: str) -> None:
+        """Ставит пост в очередь на отправку в канал.
+
+        Пост длиннее MAX_MESSAGE_LENGTH делится на несколько сообщений.
+
+        Args:
+            chat_id (int): Идентификатор канала.
+            text (str): Текст поста.
+        """
+        parts = split_post(text)
+        row_ids: List[Optional[int]] = [None] * len(parts)
+        try:
+            async with create_session() as session:
+                rows = [ChannelOutbox(chat_id=chat_id, text=part) for part in parts]
+                session.add_all(rows)
+                await session.flush()
+                row_ids = [row.id for row in rows]
+        except Exception as e:
+            # Пост все равно уйдет, но не переживет перезапуск
+            await write_logs("error", f"Error persisting channel post: {str(e)}")
+
+        for row_id, part in zip(row_ids, parts):
+            self._queue.put_nowait((row_id, chat_id, part))
+
+    def _take_batch(self) -> List[OutboxItem]:
+        """Забирает из очереди пост и, если очередь растет, соседние для дайджеста."""
+        first = self._pending or self._queue.get_nowait()
+        self._pending = None
+        batch = [first]
+
+        if self._queue.qsize() + 1 < self.digest_threshold:
+            return batch
+
+        length = len(first[2])
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            added = len(DIGEST_SEPARATOR) + len(item[2])
+            if item[1] != first[1] or length + added > MAX_MESSAGE_LENGTH:
+                self._pending = item  # Уйдет следующим постом
+                break
+            batch.append(item)
+            length += added
+
+        return batch
+
+    async def _send(self, chat_id: int, text: str) -> None:
+        """Отправляет пост, повторяя попытку при RetryAfter и сбоях сети."""
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            await self._limiter.acquire()
+            try:
+                await self._bot.send_message(chat_id, text)
+                return
+            except TelegramRetryAfter as e:
+                await write_logs(
+                    "warning", f"Channel flood limit, retry after {e.retry_after}s"
+                )
+                await asyncio.sleep(e.retry_after)
+            except REJECTED_ERRORS:
+                raise
+            except Exception as e:
+                if attempt == MAX_SEND_ATTEMPTS:
+                    raise
+                await write_logs(
+                    "warning", f"Error posting to channel (attempt {attempt}): {e}"
+                )
+                await asyncio.sleep(2**attempt)
+        raise RuntimeError("Channel post was not sent after retries")
+
+    async def _requeue(self, batch: List[OutboxItem], delay: float) -> None:
+        """Возвращает посты в конец очереди после паузы."""
+        await asyncio.sleep(delay)
+        for item in batch:
+            self._queue.put_nowait(item)
+
+    def _schedule_requeue(self, batch: List[OutboxItem]) -> float:
+        delay = min(REQUEUE_BASE_DELAY * 2**self._failed_rounds, REQUEUE_MAX_DELAY)
+        self._failed_rounds += 1
+        task = asyncio.create_task(
+            self._requeue(batch, delay), name="channel-publisher-requeue"
+        )
+        self._requeue_tasks.add(task)
+        task.add_done_callback(self._requeue_tasks.discard)
+        return delay
+
+    async def _reject(self, item: OutboxItem, error: Exception) -> None:
+        """Помечает пост, окончательно отклоненный Telegram, и больше его не шлет."""
+        row_id, chat_id, text = item
+        await write_logs(
+            "error",
+            f"Channel post {row_id} rejected by Telegram and not retried: {str(error)}"
+            + ("" if row_id is not None else f"\n{text}"),
+        )
+        if row_id is None:
+            return
+        try:
+            async with create_session() as session:
+                await session.execute(
+                    update(ChannelOutbox)
+                    .where(ChannelOutbox.id == row_id)
+                    .values(failed_at=datetime.utcnow(), error=str(error)[:255])
+                )
+        except Exception as e:
+            await write_logs("error", f"Error marking channel post failed: {str(e)}")
+
+    async def _clear(self, batch: List[OutboxItem]) -> None:
+        row_ids = [item[0] for item in batch if item[0] is not None]
+        if not row_ids:
+            return
+        try:
+            async with create_session() as session:
+                await session.execute(
+                    delete(ChannelOutbox).where(ChannelOutbox.id.in_(row_ids))
+                )
+        except Exception as e:
+            await write_logs("error", f"Error clearing channel outbox: {str(e)}")
+
+    async def _deliver(self, batch: List[OutboxItem]) -> None:
+        """Отправляет пачку одним постом и убирает ее из channel_outbox."""
+        chat_id = batch[0][1]
+        text = DIGEST_SEPARATOR.join(item[2] for item in batch)
+
+        try:
+            await self._send(chat_id, text)
+        except REJECTED_ERRORS as e:
+            if len(batch) == 1:
+                await self._reject(batch[0], e)
+                return
+            # Дайджест мог отклонить один пост: отправляем их по отдельности
+            for item in batch:
+                await self._deliver([item])
+            return
+        except Exception as e:
+            # Записи остаются в channel_outbox, а посты возвращаются в очередь,
+            # чтобы не ждать перезапуска; остальные посты тем временем уходят
+            delay = self._schedule_requeue(batch)
+            await write_logs(
+                "error",
+                f"Error posting to channel, {len(batch)} posts requeued "
+                f"in {delay:.0f}s: {str(e)}",
+            )
+            return
+
+        self._failed_rounds = 0
+        await self._clear(batch)
+
+    async def _run(self) -> None:
+        while True:
+            if self._pending is None:
+                self._pending = await self._queue.get()
+
+            await self._deliver(self._take_batch())
+
+
+publisher = ChannelPublisher()
@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Асинхронный token bucket: не более rate операций за period секунд.
+
+    Допускает всплеск до burst операций, после чего выдает разрешения
+    равномерно.
+    """
+
+    def __init__(self, rate: float, period: float = 1.0, burst: int = 1):
+        self.rate = rate
+        self.period = period
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(
+            self.burst, self._tokens + elapsed * self.rate / self.period
+        )
+
+    async def acquire(self) -> None:
+        """Ждет, пока не появится свободный токен, и забирает его."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep(
+                    (1 - self._tokens) * self.period / self.rate
+                )
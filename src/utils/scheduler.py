@@ -0,0 +1,310 @@
+import asyncio
+import heapq
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from sqlalchemy import select, update
+
+from src.config.config import settings
+from src.keyboards.inlinebutton import get_report_keyboard
+from src.database.segments import SegmentSpec, count_segment
+from src.database.settings_data import (
+    create_session,
+    create_read_only_session,
+    ScheduledMailing,
+)
+from src.utils.cron import CronSchedule
+from src.utils.logging import write_logs
+from src.utils.mailing import MAILING_RATE, run_mailing
+from src.utils.tasks import run_in_background
+
+# Нижняя граница скорости растянутой рассылки, сообщений в секунду
+MIN_SPREAD_RATE = 0.2
+
+
+def schedule_offset() -> timedelta:
+    """Смещение часового пояса, в котором администратор задает время."""
+    return timedelta(hours=settings.config.SCHEDULE_UTC_OFFSET)
+
+
+def local_to_utc(moment: datetime) -> datetime:
+    """Переводит время администратора в UTC для хранения в БД."""
+    return moment - schedule_offset()
+
+
+def utc_to_local(moment: datetime) -> datetime:
+    """Переводит время из БД в часовой пояс администратора."""
+    return moment + schedule_offset()
+
+
+def next_cron_run(expression: str, after: datetime) -> datetime:
+    """Возвращает следующий запуск cron в UTC; выражение задано в местном времени.
+
+    Args:
+        expression (str): Выражение cron.
+        after (datetime): Момент в UTC, после которого ищется запуск.
+
+    Returns:
+        datetime: Время следующего запуска в UTC.
+    """
+    local_next = CronSchedule.parse(expression).next_after(utc_to_local(after))
+    return local_to_utc(local_next)
+
+
+@dataclass
+class ScheduledJob:
+    """Задание рассылки, которое планировщик держит в памяти."""
+
+    id: int
+    mailing: Dict
+    segment: SegmentSpec
+    run_at: datetime
+    cron: Optional[str]
+    spread_minutes: int
+    created_by: int
+
+
+class MailingScheduler:
+    """Планировщик отложенных и повторяющихся рассылок.
+
+    Задания хранятся в таблице scheduled_mailings и загружаются в память
+    одним запросом при старте. Ближайшие запуски лежат в куче, поэтому
+    планировщик спит ровно до следующего срабатывания и не опрашивает БД.
+    При пробуждении состояние всех сработавших заданий сохраняется одним
+    пакетным UPDATE до начала отправки: разовая рассылка после сбоя не
+    повторится.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[int, ScheduledJob] = {}
+        self._heap: List[Tuple[datetime, int]] = []
+        self._changed = asyncio.Event()
+        self._bot: Optional[Bot] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self, bot: Bot) -> None:
+        """Загружает активные задания из БД и запускает планировщик.
+
+        Args:
+            bot (Bot): Экземпляр бота для отправки рассылок.
+        """
+        self._bot = bot
+
+        async with create_read_only_session() as session:
+            result = await session.execute(
+                select(ScheduledMailing).where(ScheduledMailing.status == "active")
+            )
+            rows = result.scalars().all()
+
+        for row in rows:
+            self._add(
+                ScheduledJob(
+                    id=row.id,
+                    mailing=json.loads(row.mailing),
+                    segment=json.loads(row.segment),
+                    run_at=row.next_run_at,
+                    cron=row.cron,
+                    spread_minutes=row.spread_minutes or 0,
+                    created_by=row.created_by,
+                )
+            )
+
+        if rows:
+            await write_logs("info", f"Restored {len(rows)} scheduled mailings")
+
+        self._worker = asyncio.create_task(self._run(), name="mailing-scheduler")
+
+    async def stop(self) -> None:
+        """Останавливает планировщик; задания остаются в БД."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def _add(self, job: ScheduledJob) -> None:
+        self._jobs[job.id] = job
+        heapq.heappush(self._heap, (job.run_at, job.id))
+        self._changed.set()
+
+    async def schedule(
+        self,
+        mailing: Dict,
+        segment: SegmentSpec,
+        run_at: datetime,
+        created_by: int,
+        cron: Optional[str] = None,
+        spread_minutes: int = 0,
+    ) -> ScheduledJob:
+        """Сохраняет задание рассылки и добавляет его в расписание.
+
+        Args:
+            mailing (Dict): Исходное сообщение рассылки.
+            segment (SegmentSpec): Сегмент получателей.
+            run_at (datetime): Время первого запуска в UTC.
+            created_by (int): Администратор, создавший задание.
+            cron (Optional[str]): Выражение cron для повторяющейся рассылки.
+            spread_minutes (int): Окно, на которое растягивается отправка.
+
+        Returns:
+            ScheduledJob: Созданное задание.
+        """
+        async with create_session() as session:
+            row = ScheduledMailing(
+                mailing=json.dumps(mailing),
+                segment=json.dumps(segment),
+                next_run_at=run_at,
+                cron=cron,
+                spread_minutes=spread_minutes,
+                created_by=created_by,
+            )
+            session.add(row)
+            await session.flush()
+            job_id = row.id
+
+        job = ScheduledJob(
+            id=job_id,
+            mailing=mailing,
+            segment=segment,
+            run_at=run_at,
+            cron=cron,
+            spread_minutes=spread_minutes,
+            created_by=created_by,
+        )
+        self._add(job)
+        return job
+
+    async def cancel(self, job_id: int) -> bool:
+        """Отменяет задание.
+
+        Args:
+            job_id (int): Идентификатор задания.
+
+        Returns:
+            bool: True, если задание было активно.
+        """
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return False
+
+        # Запись в куче остается и будет пропущена при пробуждении
+        async with create_session() as session:
+            await session.execute(
+                update(ScheduledMailing)
+                .where(ScheduledMailing.id == job_id)
+                .values(status="cancelled")
+            )
+        return True
+
+    def list_jobs(self) -> List[ScheduledJob]:
+        """Возвращает активные задания в порядке запуска."""
+        return sorted(self._jobs.values(), key=lambda job: job.run_at)
+
+    def _pop_due(self, now: datetime) -> List[ScheduledJob]:
+        """Забирает из кучи все сработавшие задания."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            run_at, job_id = heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            # Отмененные и перенесенные задания оставляют устаревшие записи
+            if job is not None and job.run_at == run_at:
+                due.append(job)
+        return due
+
+    async def _fire_due(self) -> None:
+        now = datetime.utcnow()
+        due = self._pop_due(now)
+        if not due:
+            return
+
+        updates = []
+        for job in due:
+            next_run_at = None
+            if job.cron:
+                try:
+                    next_run_at = next_cron_run(job.cron, now)
+                except ValueError as e:
+                    await write_logs("error", f"Scheduled mailing {job.id}: {str(e)}")
+
+            updates.append(
+                {
+                    "id": job.id,
+                    "last_run_at": now,
+                    "next_run_at": next_run_at or job.run_at,
+                    "status": "active" if next_run_at else "done",
+                }
+            )
+            if next_run_at:
+                job.run_at = next_run_at
+                heapq.heappush(self._heap, (next_run_at, job.id))
+            else:
+                self._jobs.pop(job.id, None)
+
+        try:
+            async with create_session() as session:
+                await session.execute(update(ScheduledMailing), updates)
+        except Exception as e:
+            await write_logs("error", f"Error saving scheduled mailings: {str(e)}")
+
+        for job in due:
+            run_in_background(self._execute(job), name=f"scheduled-mailing-{job.id}")
+
+    async def _execute(self, job: ScheduledJob) -> None:
+        """Выполняет рассылку задания и сообщает итоги администратору."""
+        rate = MAILING_RATE
+        if job.spread_minutes:
+            audience = await count_segment(job.segment, use_cache=False) or 0
+            rate = min(
+                MAILING_RATE,
+                max(MIN_SPREAD_RATE, audience / (job.spread_minutes * 60)),
+            )
+
+        await write_logs(
+            "info", f"Scheduled mailing {job.id} started at {rate:.2f} msg/s"
+        )
+        result = await run_mailing(
+            self._bot,
+            job.mailing,
+            job.segment,
+            rate=rate,
+            created_by=job.created_by,
+            scheduled_id=job.id,
+        )
+
+        try:
+            await self._bot.send_message(
+                job.created_by,
+                f"📊 Запланированная рассылка #{job.id} завершена\n\n"
+                f"✅ Успешно отправлено: {result.successful}\n"
+                f"🚫 Бот заблокирован: {result.blocked}\n"
+                f"❌ Ошибок отправки: {result.failed}",
+                reply_markup=get_report_keyboard(result.report_id),
+            )
+        except Exception as e:
+            await write_logs("warning", f"Error reporting scheduled mailing: {str(e)}")
+
+    async def _run(self) -> None:
+        while True:
+            timeout = None
+            if self._heap:
+                delay = self._heap[0][0] - datetime.utcnow()
+                timeout = max(0.0, delay.total_seconds())
+
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+
+            try:
+                await self._fire_due()
+            except Exception as e:
+                await write_logs("error", f"Mailing scheduler error: {str(e)}")
+
+
+scheduler = MailingScheduler()
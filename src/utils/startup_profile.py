@@ -0,0 +1,97 @@
+"""Профиль холодного старта бота.
+
+Запускает main.py с ``-X importtime`` и флагом ``--profile-startup`` (бот
+выполняет запуск, но не начинает polling), затем печатает самые
+тяжелые импорты и время до первого poll. В этом режиме бот не вызывает
+Bot API, не запускает фоновые задачи и не пишет в БД.
+
+Запуск из корня проекта:
+    python -m src.utils.startup_profile [--top 20]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# import time: self [us] | cumulative | imported package
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int, int]]:
+    """Разбирает вывод -X importtime.
+
+    Args:
+        output (str): Содержимое stderr процесса.
+
+    Returns:
+        List[Tuple[str, int, int, int]]: (модуль, self мкс, cumulative мкс, глубина).
+    """
+    records = []
+    for line in output.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            depth = (len(indent) - 1) // 2
+            records.append((module, int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def summarize_by_package(records: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Суммирует собственное время импорта по корневым пакетам."""
+    totals: Dict[str, int] = defaultdict(int)
+    for module, self_us, _, _ in records:
+        totals[module.split(".")[0]] += self_us
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Профиль холодного старта бота")
+    parser.add_argument("--top", type=int, default=20, help="Сколько строк выводить")
+    args = parser.parse_args()
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", "--profile-startup"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+
+    records = parse_importtime(result.stderr)
+    if not records:
+        print(result.stderr or "No import time data")
+        sys.exit(result.returncode or 1)
+
+    total_us = sum(self_us for _, self_us, _, _ in records)
+    print(f"Imports: {len(records)} modules, {total_us / 1e6:.3f}s in total\n")
+
+    print("Heaviest packages (self time):")
+    totals = summarize_by_package(records)
+    for package, self_us in sorted(totals.items(), key=lambda x: -x[1])[: args.top]:
+        print(f"  {self_us / 1e3:10.1f} ms  {package}")
+
+    print("\nHeaviest top-level imports (cumulative):")
+    top_level = [r for r in records if r[3] == 0]
+    for module, _, cumulative_us, _ in sorted(top_level, key=lambda r: -r[2])[
+        : args.top
+    ]:
+        print(f"  {cumulative_us / 1e3:10.1f} ms  {module}")
+
+    timing = [
+        line for line in result.stdout.splitlines() if line.startswith("time-to-first-poll")
+    ]
+    print()
+    if timing:
+        print(timing[-1])
+    else:
+        print("time-to-first-poll: not reached (see bot output below)")
+        print(result.stdout[-2000:])
+
+
+if __name__ == "__main__":
+    main()
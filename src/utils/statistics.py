@@ -1,9 +1,16 @@
 from datetime import datetime, timedelta
 import pandas as pd
-from sqlalchemy import select, and_, func
-from src.database.settings_data import User, UserSurvey, UserActivity, create_session
+from sqlalchemy import select, and_, or_, func
+from src.database.settings_data import (
+    User,
+    UserSurvey,
+    SurveyAnswer,
+)
+from src.database.replica import create_read_session
+from src.database.using_data import activity_for_day
+from src.handlers.survey_questions.questions import get_survey
 from src.utils.logging import write_logs
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from openpyxl.styles import Font
 
 
@@ -13,16 +20,15 @@ async def get_time_based_statistics() -> Optional[Dict]:
     Returns:
         Optional[Dict]: Словарь со статистикой или None при ошибке
     """
-    async with create_session() as session:
+    async with create_read_session() as session:
         try:
             now = datetime.utcnow()
             today = now.date()
 
             # Получаем статистику за сегодня
-            activity_stmt = select(UserActivity).where(
-                func.date(UserActivity.date) == today
-            )
-            activity = (await session.execute(activity_stmt)).scalar_one_or_none()
+            activity = (
+                await session.execute(activity_for_day(today))
+            ).scalar_one_or_none()
             print(activity)
             if not activity:
                 # Если статистики нет, возвращаем нулевые значения
@@ -67,17 +73,74 @@ async def get_time_based_statistics() -> Optional[Dict]:
             return None
 
 
-async def generate_time_statistics_excel() -> Optional[str]:
+async def get_answer_distribution(
+    definition_id: int,
+) -> Optional[Dict[Tuple[int, int], int]]:
+    """Получает распределение ответов по вариантам для завершенных опросов.
+
+    Один GROUP BY по индексу (question_idx, option_idx) таблицы survey_answers.
+
+    Args:
+        definition_id (int): Идентификатор определения опроса. Опросы,
+            созданные до появления определений, относятся к опросу по умолчанию.
+
+    Returns:
+        Optional[Dict[Tuple[int, int], int]]: Количество ответов по ключу
+            (индекс вопроса, индекс варианта) или None при ошибке
+    """
+    async with create_read_session() as session:
+        try:
+            stmt = (
+                select(
+                    SurveyAnswer.question_idx,
+                    SurveyAnswer.option_idx,
+                    func.count(),
+                )
+                .join(UserSurvey, UserSurvey.id == SurveyAnswer.survey_id)
+                .where(
+                    UserSurvey.survey_completed == True,
+                    or_(
+                        UserSurvey.definition_id == definition_id,
+                        UserSurvey.definition_id.is_(None),
+                    ),
+                    SurveyAnswer.option_idx.is_not(None),
+                )
+                .group_by(SurveyAnswer.question_idx, SurveyAnswer.option_idx)
+            )
+            result = await session.execute(stmt)
+            return {
+                (question_idx, option_idx): count
+                for question_idx, option_idx, count in result.all()
+            }
+
+        except Exception as e:
+            await write_logs("error", f"Error getting answer distribution: {str(e)}")
+            return None
+
+
+async def generate_time_statistics_excel(
+    stats: Optional[Dict] = None,
+) -> Optional[str]:
     """Генерирует Excel отчет со статистикой использования бота.
 
+    Args:
+        stats (Optional[Dict]): Уже посчитанная статистика из
+            get_time_based_statistics; если не передана, считается заново.
+
     Returns:
         Optional[str]: Путь к сгенерированному файлу или None при ошибке
     """
     try:
-        stats = await get_time_based_statistics()
+        if stats is None:
+            stats = await get_time_based_statistics()
         if not stats:
             return None
 
+        survey = await get_survey()
+        distribution = (
+            await get_answer_distribution(survey.id) if survey else None
+        ) or {}
+
         # Создаем данные для сводной информации
         summary_data = {
             "Показатель": [
@@ -146,6 +209,31 @@ async def generate_time_statistics_excel() -> Optional[str]:
                     else:
                         cell.font = regular_font
 
+            # Распределение ответов по вариантам
+            answers_rows = []
+            for question in survey.states if survey else ():
+                for option_idx, option in enumerate(question.options):
+                    answers_rows.append(
+                        {
+                            "Вопрос": question.field_name,
+                            "Ответ": option,
+                            "Количество": distribution.get(
+                                (question.index, option_idx), 0
+                            ),
+                        }
+                    )
+            answers_df = pd.DataFrame(
+                answers_rows, columns=["Вопрос", "Ответ", "Количество"]
+            )
+            answers_df.to_excel(writer, index=False, sheet_name="Ответы")
+
+            answers_sheet = writer.sheets["Ответы"]
+            for idx, col in enumerate(answers_df.columns):
+                max_length = (
+                    max(answers_df[col].astype(str).apply(len).max(), len(col)) + 2
+                )
+                answers_sheet.column_dimensions[chr(65 + idx)].width = max_length
+
         await write_logs(
             "info", f"Successfully generated time statistics Excel report: {filename}"
         )
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+from src.utils.logging import write_logs
+from src.utils.tasks import run_in_background
+
+T = TypeVar("T")
+
+
+class StaleWhileRevalidate(Generic[T]):
+    """Кэш одного значения по схеме stale-while-revalidate.
+
+    Пока значение свежее, оно отдается без обращения к источнику. Устаревшее
+    значение тоже отдается сразу, а обновление запускается в фоне. Ждать
+    приходится только самый первый расчет. Одновременные запросы делят одну
+    задачу обновления, поэтому источник никогда не считается параллельно.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Optional[T]], Awaitable[Optional[T]]],
+        ttl: float,
+        name: str,
+    ):
+        """
+        Args:
+            loader (Callable[[Optional[T]], Awaitable[Optional[T]]]): Функция
+                расчета; получает предыдущее значение, чтобы переиспользовать
+                неизменившиеся части. None означает, что данных нет.
+            ttl (float): Через сколько секунд значение считается устаревшим.
+            name (str): Имя кэша для логов и фоновых задач.
+        """
+        self._loader = loader
+        self._ttl = ttl
+        self._name = name
+        self._value: Optional[T] = None
+        self._loaded_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_stale(self) -> bool:
+        """Истек ли срок жизни значения."""
+        return time.monotonic() - self._loaded_at >= self._ttl
+
+    async def _load(self) -> Optional[T]:
+        try:
+            value = await self._loader(self._value)
+            if value is not None:
+                self._value = value
+                self._loaded_at = time.monotonic()
+        except Exception as e:
+            # Старое значение остается в кэше и будет отдано до следующей попытки
+            await write_logs("error", f"Error refreshing {self._name}: {str(e)}")
+        finally:
+            self._refresh_task = None
+        return self._value
+
+    def _refresh(self) -> asyncio.Task:
+        if self._refresh_task is None:
+            self._refresh_task = run_in_background(
+                self._load(), name=f"refresh-{self._name}"
+            )
+        return self._refresh_task
+
+    async def get(self) -> Optional[T]:
+        """Возвращает значение, при необходимости запуская обновление.
+
+        Returns:
+            Optional[T]: Последнее рассчитанное значение или None, если
+                рассчитать его не удалось ни разу.
+        """
+        if self._value is None:
+            # shield: отмена одного запроса не прерывает общий расчет
+            await asyncio.shield(self._refresh())
+        elif self.is_stale:
+            self._refresh()
+        return self._value
+
+    def invalidate(self) -> None:
+        """Помечает значение устаревшим; следующий запрос запустит обновление."""
+        self._loaded_at = 0.0
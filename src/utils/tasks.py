@@ -0,0 +1,53 @@
+import asyncio
+import traceback
+from typing import Awaitable, Set
+
+from src.utils.logging import write_logs
+
+# Ссылки на запущенные задачи, чтобы сборщик мусора не удалил их до завершения
+_background_tasks: Set[asyncio.Task] = set()
+
+
+async def _supervise(coro: Awaitable, name: str) -> None:
+    """Выполняет корутину и записывает в лог любую ошибку вместе с трассировкой."""
+    try:
+        await coro
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await write_logs(
+            "error",
+            f"Background task {name} failed: {str(e)}\n{traceback.format_exc()}",
+        )
+
+
+def run_in_background(coro: Awaitable, name: str) -> asyncio.Task:
+    """Запускает корутину в фоне под наблюдением.
+
+    Args:
+        coro (Awaitable): Корутина для выполнения.
+        name (str): Имя задачи для логов.
+
+    Returns:
+        asyncio.Task: Запущенная задача.
+    """
+    task = asyncio.create_task(_supervise(coro, name), name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def wait_background_tasks(timeout: float = 10) -> None:
+    """Дожидается завершения фоновых задач при остановке бота.
+
+    Args:
+        timeout (float): Максимальное время ожидания в секундах.
+    """
+    if not _background_tasks:
+        return
+
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    if pending:
+        await write_logs(
+            "warning", f"{len(pending)} background tasks did not finish on shutdown"
+        )
@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta
 import pandas as pd
 from sqlalchemy import select
-from src.database.settings_data import User, create_session
+from src.database.settings_data import User
+from src.database.replica import create_read_session
 from src.utils.logging import write_logs
 from typing import Optional, Dict
 from openpyxl.styles import Font, Alignment
@@ -14,7 +15,7 @@ async def get_user_statistics() -> Optional[Dict]:
     Returns:
         Optional[Dict]: Словарь со статистикой или None при ошибке
     """
-    async with create_session() as session:
+    async with create_read_session() as session:
         try:
             # Получаем всех пользователей
             users_query = await session.execute(select(User))